@@ -0,0 +1,121 @@
+"""Parse time and peak memory with and without column projection.
+
+Builds wide synthetic price lists shaped like the Farr Vintners CSV and the
+hub.wine XLSX exports (their DEFAULT_COLUMN_MAP columns plus filler columns
+for notes, images and internal codes), then times a full read of every column
+against the projected read the normalizers now do.
+
+    python benchmarks/bench_column_projection.py --rows 20000 --extra-columns 45
+"""
+from __future__ import annotations
+import argparse
+import json
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+import pandas as pd
+from corkscrew.models import DownloadConfig, MerchantConfig
+from corkscrew.normalizers.farr_vintners import FarrVintnersNormalizer
+from corkscrew.normalizers.hub_wine import HubWineNormalizer
+
+
+def make_frame(column_map: dict[str, str], rows: int, extra_columns: int) -> pd.DataFrame:
+    rng = random.Random(0)
+    data = {}
+    for col, field in column_map.items():
+        if field in ("price", "stock_quantity", "case_size", "vintage"):
+            data[col] = [str(rng.randint(1, 3000)) for _ in range(rows)]
+        else:
+            data[col] = [f"{field} {rng.randint(0, 500)}" for _ in range(rows)]
+    for i in range(extra_columns):
+        data[f"Internal {i}"] = [f"note {rng.random():.6f}" for _ in range(rows)]
+    return pd.DataFrame(data)
+
+
+def make_merchant(merchant_id: str, fmt: str) -> MerchantConfig:
+    return MerchantConfig(
+        id=merchant_id, name=merchant_id, country="UK", tier=1, enabled=True,
+        discovery_url="https://example.com",
+        downloads=[DownloadConfig(url=f"https://example.com/list.{fmt}", format=fmt, preferred=True)],
+        url_pattern="static",
+    )
+
+
+def measure(fn, repeat: int) -> tuple[float, int]:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    tracemalloc.start()
+    fn()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return best, peak
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=20000)
+    parser.add_argument("--extra-columns", type=int, default=45)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--json", type=Path, default=None, help="Also write results to this file")
+    args = parser.parse_args(argv)
+
+    fixtures = [
+        ("farr-vintners", "csv", FarrVintnersNormalizer),
+        ("bibo-wine", "xlsx", HubWineNormalizer),
+    ]
+    results = []
+    with tempfile.TemporaryDirectory() as tmp:
+        for merchant_id, fmt, normalizer_cls in fixtures:
+            df = make_frame(normalizer_cls.DEFAULT_COLUMN_MAP, args.rows, args.extra_columns)
+            path = Path(tmp) / f"{merchant_id}.{fmt}"
+            if fmt == "csv":
+                df.to_csv(path, index=False)
+                full_read = lambda: pd.read_csv(path, dtype=str)
+            else:
+                df.to_excel(path, index=False)
+                full_read = lambda: pd.read_excel(path, dtype=str, engine="openpyxl")
+            merchant = make_merchant(merchant_id, fmt)
+            normalizer = normalizer_cls()
+
+            # Parse stage only: what the normalizer materializes before mapping rows
+            if fmt == "csv":
+                header = pd.read_csv(path, dtype=str, nrows=0).columns.tolist()
+                _, usecols = normalizer._project(header, merchant, path)
+                projected_read = lambda: pd.read_csv(path, dtype=str, usecols=usecols)
+            else:
+                projected_read = lambda: normalizer._read_xlsx(path, merchant)
+
+            full_s, full_peak = measure(full_read, args.repeat)
+            proj_s, proj_peak = measure(projected_read, args.repeat)
+            results.append({
+                "merchant": merchant_id,
+                "format": fmt,
+                "rows": args.rows,
+                "columns": len(df.columns),
+                "mapped_columns": len(normalizer_cls.DEFAULT_COLUMN_MAP),
+                "full_seconds": round(full_s, 4),
+                "projected_seconds": round(proj_s, 4),
+                "full_peak_bytes": full_peak,
+                "projected_peak_bytes": proj_peak,
+            })
+
+    print(f"{'merchant':16} {'fmt':5} {'cols':>9} {'full s':>8} {'proj s':>8} {'speedup':>8} "
+          f"{'full MB':>8} {'proj MB':>8}")
+    for r in results:
+        print(f"{r['merchant']:16} {r['format']:5} {r['mapped_columns']:>4}/{r['columns']:<4} "
+              f"{r['full_seconds']:8.3f} {r['projected_seconds']:8.3f} "
+              f"{r['full_seconds'] / r['projected_seconds']:7.1f}x "
+              f"{r['full_peak_bytes'] / 1e6:8.1f} {r['projected_peak_bytes'] / 1e6:8.1f}")
+    if args.json:
+        args.json.write_text(json.dumps(results, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
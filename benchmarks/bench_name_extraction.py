@@ -0,0 +1,108 @@
+"""Throughput of extracting vintage, format and colour from wine names.
+
+Generates a synthetic corpus of wine names in the shapes merchants use
+("Château Latour 2010 Magnum 150cl", "Krug Grande Cuvée NV", names with no
+hints at all) and times corkscrew.extract.extract_from_names against the same
+patterns applied row by row in a Python loop. With pyarrow installed both the
+RE2 and the pandas ``str.extract`` paths are timed.
+
+    python benchmarks/bench_name_extraction.py --names 1000000
+"""
+from __future__ import annotations
+import argparse
+import json
+import random
+import sys
+import time
+from pathlib import Path
+import re
+from corkscrew import extract
+from corkscrew.extract import COLOR_PATTERN, COLORS, FORMAT_PATTERN, VINTAGE_PATTERN, extract_from_names
+from corkscrew.models import RecordBatch
+
+PRODUCERS = ["Château Latour", "Domaine Leflaive", "Krug", "Penfolds", "Château Cheval Blanc",
+             "Domaine de la Romanée-Conti", "Giacomo Conterno", "Vega Sicilia", "Egon Müller"]
+WINES = ["Grand Vin", "Puligny-Montrachet", "Grande Cuvée", "Grange", "Monfortino", "Unico",
+         "Scharzhofberger Riesling", "Les Pucelles", "Clos Saint-Jacques"]
+SUFFIXES = ["", "Blanc", "Rouge", "Rosé", "Red", "White"]
+FORMATS = ["", "75cl", "150cl", "Magnum", "1.5L", "Half bottle", "37.5cl", "Jeroboam", "3L"]
+
+
+def make_names(count: int, repeat: float) -> list[str]:
+    """``repeat`` is the share of rows reusing an earlier name (another format of the same wine)."""
+    rng = random.Random(0)
+    names = []
+    for i in range(count):
+        if names and rng.random() < repeat:
+            names.append(rng.choice(names))
+            continue
+        # A lot/cuvée number keeps names distinct, as in real lists
+        parts = [rng.choice(PRODUCERS), rng.choice(WINES), f"Lot {i}", rng.choice(SUFFIXES)]
+        roll = rng.random()
+        if roll < 0.7:
+            parts.append(str(rng.randint(1970, 2023)))
+        elif roll < 0.8:
+            parts.append("NV")
+        parts.append(rng.choice(FORMATS))
+        names.append(" ".join(p for p in parts if p))
+    return names
+
+
+def loop_extract(names: list[str]) -> int:
+    vintage_re, format_re, color_re = (re.compile(p) for p in (VINTAGE_PATTERN, FORMAT_PATTERN, COLOR_PATTERN))
+    filled = 0
+    for name in names:
+        vintage = vintage_re.search(name)
+        fmt = format_re.search(name)
+        color = color_re.search(name)
+        if vintage:
+            filled += 1
+        if fmt:
+            filled += 1
+        if color and COLORS.get(color.group("value").lower()):
+            filled += 1
+    return filled
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--names", type=int, default=1_000_000)
+    parser.add_argument("--repeat", type=float, default=0.2, help="Share of rows repeating an earlier name")
+    parser.add_argument("--json", type=Path, help="Also write results to this file")
+    args = parser.parse_args(argv)
+
+    names = make_names(args.names, args.repeat)
+
+    start = time.perf_counter()
+    loop_extract(names)
+    loop_s = time.perf_counter() - start
+
+    timings = {}
+    engines = {"python": None, "re2": extract.pa} if extract.pa is not None else {"python": None}
+    for engine, module in engines.items():
+        extract.pa = module
+        batch = RecordBatch("bench", "Bench", "https://example.com", "2026-01-01", {"wine_name": names})
+        start = time.perf_counter()
+        extract_from_names(batch)
+        timings[engine] = time.perf_counter() - start
+
+    filled = {f: sum(1 for v in batch.column(f) if v) / args.names for f in ("vintage", "format", "color")}
+    result = {
+        "names": args.names,
+        "repeat": args.repeat,
+        "loop_seconds": round(loop_s, 3),
+        "extract_seconds": {engine: round(t, 3) for engine, t in timings.items()},
+        "fill_rate": {f: round(r, 3) for f, r in filled.items()},
+    }
+    print(f"{args.names:,} names, {args.repeat:.0%} repeated")
+    print(f"  python loop        {loop_s:8.2f} s  {args.names / loop_s:12,.0f} names/s")
+    for engine, t in timings.items():
+        print(f"  extract {engine:10} {t:8.2f} s  {args.names / t:12,.0f} names/s")
+    print("  filled        " + "  ".join(f"{f} {r:.0%}" for f, r in filled.items()))
+    if args.json:
+        args.json.write_text(json.dumps(result, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,196 @@
+"""End-to-end `corkscrew run` benchmark against the local mock merchant server.
+
+For each merchant count it generates a merchants.yaml (gen_merchants.py),
+runs `corkscrew run` in a fresh working directory as a child process and
+records wall time, throughput, the child's peak RSS, and per-stage time taken
+from the run's checkpoint journal:
+
+    download   DownloadResult.elapsed_seconds
+    normalize  journal 'download' entry -> 'normalize' entry (includes queueing)
+    write      'normalize' entry -> 'write' entry
+
+Results go to benchmarks/results/<commit>.json; pass --compare with an older
+result file to print the change.
+
+    python benchmarks/bench_run.py --merchants 40 400 4000 --rows 500 --latency 0.02
+    python benchmarks/bench_run.py --merchants 40 --compare benchmarks/results/abc1234.json
+"""
+from __future__ import annotations
+import argparse
+import json
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+from statistics import median
+from gen_merchants import generate_merchants, write_config
+from mock_server import MockMerchantServer, ServerConfig
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+RESULTS_DIR = Path(__file__).resolve().parent / "results"
+RUN_COMMAND = [sys.executable, "-c", "from corkscrew.cli import cli; cli()", "run"]
+
+
+def git_commit() -> tuple[str, bool]:
+    def git(*args) -> str:
+        return subprocess.run(["git", *args], cwd=REPO_ROOT, capture_output=True, text=True).stdout.strip()
+    return git("rev-parse", "--short", "HEAD") or "unknown", bool(git("status", "--porcelain", "--untracked-files=no"))
+
+
+def run_child(args: list[str], cwd: Path, extra_args: list[str]) -> tuple[float, int, int]:
+    """Run corkscrew in ``cwd``; return (wall seconds, exit code, peak RSS bytes)."""
+    env = {**os.environ, "PYTHONPATH": str(REPO_ROOT)}
+    start = time.perf_counter()
+    proc = subprocess.Popen(args + extra_args, cwd=cwd, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    _, status, usage = os.wait4(proc.pid, 0)
+    wall = time.perf_counter() - start
+    proc.returncode = os.waitstatus_to_exitcode(status)
+    # ru_maxrss is KiB on Linux, bytes on macOS
+    rss = usage.ru_maxrss if sys.platform == "darwin" else usage.ru_maxrss * 1024
+    return wall, proc.returncode, rss
+
+
+def summarize(values: list[float]) -> dict:
+    if not values:
+        return {"count": 0, "total": 0.0, "p50": 0.0, "p95": 0.0, "max": 0.0}
+    ordered = sorted(values)
+    return {
+        "count": len(ordered),
+        "total": round(sum(ordered), 3),
+        "p50": round(median(ordered), 4),
+        "p95": round(ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))], 4),
+        "max": round(ordered[-1], 4),
+    }
+
+
+def stage_times(data_root: Path) -> tuple[dict, dict]:
+    """Per-stage timing summaries and outcome counts from the run journal."""
+    journals = sorted((data_root / "runs").glob("*/journal.jsonl"))
+    entries: dict[str, dict] = {}
+    for journal in journals:
+        for line in journal.read_text().splitlines():
+            entry = json.loads(line)
+            entries.setdefault(entry["merchant_id"], {})[entry["stage"]] = entry
+    stages: dict[str, list[float]] = {"download": [], "normalize": [], "write": []}
+    counts = {"succeeded": 0, "failed": 0, "records": 0}
+    for done in entries.values():
+        download = done.get("download")
+        if download is None:
+            continue
+        stages["download"].append(download["result"].get("elapsed_seconds", 0.0))
+        counts["failed" if download.get("error") else "succeeded"] += 1
+        normalize = done.get("normalize")
+        if normalize:
+            stages["normalize"].append(_seconds_between(download, normalize))
+            counts["records"] += normalize.get("records", 0)
+            write = done.get("write")
+            if write:
+                stages["write"].append(_seconds_between(normalize, write))
+    return {name: summarize(values) for name, values in stages.items()}, counts
+
+
+def _seconds_between(a: dict, b: dict) -> float:
+    return (datetime.fromisoformat(b["at"]) - datetime.fromisoformat(a["at"])).total_seconds()
+
+
+def bench_scale(count: int, base_url: str, server: MockMerchantServer, extra_args: list[str], keep: bool) -> dict:
+    workdir = Path(tempfile.mkdtemp(prefix=f"corkscrew-bench-{count}-"))
+    write_config(workdir / "merchants.yaml", generate_merchants(count, base_url))
+    before = dict(server.stats)
+    wall, code, rss = run_child(RUN_COMMAND + ["--config", "merchants.yaml"], workdir, extra_args)
+    stages, counts = stage_times(workdir / "data")
+    requests = {k: v - before.get(k, 0) for k, v in server.stats.items()}
+    result = {
+        "merchants": count,
+        "exit_code": code,
+        "wall_seconds": round(wall, 3),
+        "merchants_per_second": round(count / wall, 2),
+        "peak_rss_bytes": rss,
+        "stages": stages,
+        **counts,
+        "server": requests,
+    }
+    if keep:
+        result["workdir"] = str(workdir)
+    else:
+        shutil.rmtree(workdir, ignore_errors=True)
+    return result
+
+
+def print_results(results: list[dict], previous: dict | None):
+    prev = {r["merchants"]: r for r in (previous or {}).get("scales", [])}
+    print(f"{'merchants':>9} {'wall s':>8} {'m/s':>7} {'RSS MB':>7} {'dl p50':>7} {'norm p50':>8} "
+          f"{'write p50':>9} {'ok':>5} {'fail':>5} {'records':>9}")
+    for r in results:
+        s = r["stages"]
+        print(f"{r['merchants']:>9} {r['wall_seconds']:>8.1f} {r['merchants_per_second']:>7.1f} "
+              f"{r['peak_rss_bytes'] / 1e6:>7.0f} {s['download']['p50']:>7.3f} {s['normalize']['p50']:>8.3f} "
+              f"{s['write']['p50']:>9.3f} {r['succeeded']:>5} {r['failed']:>5} {r['records']:>9}")
+        old = prev.get(r["merchants"])
+        if old:
+            print(f"{'vs prev':>9} {_delta(old['wall_seconds'], r['wall_seconds']):>8} "
+                  f"{_delta(old['merchants_per_second'], r['merchants_per_second']):>7} "
+                  f"{_delta(old['peak_rss_bytes'], r['peak_rss_bytes']):>7}")
+
+
+def _delta(old: float, new: float) -> str:
+    return f"{(new - old) / old:+.0%}" if old else "n/a"
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--merchants", type=int, nargs="+", default=[40, 400, 4000])
+    parser.add_argument("--rows", type=int, default=ServerConfig.rows, help="Rows per merchant file")
+    parser.add_argument("--latency", type=float, default=0.02)
+    parser.add_argument("--bandwidth", type=int, default=0, help="Bytes/second per response (0 = unlimited)")
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--throttle-rate", type=float, default=0.0)
+    parser.add_argument("--retry-after", type=int, default=1)
+    parser.add_argument("--output", type=Path, help="Result file (default benchmarks/results/<commit>.json)")
+    parser.add_argument("--compare", type=Path, help="Earlier result file to compare against")
+    parser.add_argument("--keep", action="store_true", help="Keep each run's working directory")
+    parser.add_argument("run_args", nargs=argparse.REMAINDER, help="Extra arguments for 'corkscrew run' after --")
+    args = parser.parse_args(argv)
+    extra_args = [a for a in args.run_args if a != "--"]
+
+    config = ServerConfig(
+        rows=args.rows, latency=args.latency, bandwidth=args.bandwidth, error_rate=args.error_rate,
+        throttle_rate=args.throttle_rate, retry_after=args.retry_after,
+    )
+    server = MockMerchantServer(config)
+    base_url = server.start_in_thread()
+    try:
+        results = []
+        for count in args.merchants:
+            print(f"Running {count} merchants...", flush=True)
+            results.append(bench_scale(count, base_url, server, extra_args, args.keep))
+    finally:
+        server.stop_thread()
+
+    commit, dirty = git_commit()
+    report = {
+        "commit": commit,
+        "dirty": dirty,
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "server": vars(config),
+        "run_args": extra_args,
+        "scales": results,
+    }
+    previous = json.loads(args.compare.read_text()) if args.compare else None
+    print_results(results, previous)
+    out = args.output or RESULTS_DIR / f"{commit}{'-dirty' if dirty else ''}.json"
+    out.parent.mkdir(parents=True, exist_ok=True)
+    out.write_text(json.dumps(report, indent=2))
+    print(f"Results written to {out}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
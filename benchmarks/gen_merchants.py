@@ -0,0 +1,69 @@
+"""Generate N fake merchants in merchants.yaml format, pointed at the mock server.
+
+Merchants get a mix of formats and URL patterns (static and dated) roughly
+like the real merchants.yaml, and a column_map matching the files
+mock_server.py serves.
+
+    python benchmarks/gen_merchants.py 400 --base-url http://127.0.0.1:8800 -o /tmp/merchants.yaml
+"""
+from __future__ import annotations
+import argparse
+import random
+import sys
+from pathlib import Path
+import yaml
+from mock_server import COLUMNS
+
+# Share of merchants per download format and URL pattern
+FORMAT_WEIGHTS = {"xlsx": 0.45, "csv": 0.35, "json": 0.1, "pdf": 0.1}
+DATED_SHARE = 0.15
+COUNTRIES = ["UK", "UK", "UK", "FR", "FR", "DE", "CH", "HK", "US", "AT", "AU"]
+
+
+def generate_merchants(count: int, base_url: str, seed: int = 0) -> list[dict]:
+    rng = random.Random(seed)
+    formats = list(FORMAT_WEIGHTS)
+    weights = list(FORMAT_WEIGHTS.values())
+    merchants = []
+    for i in range(1, count + 1):
+        merchant_id = f"bench-{i:05d}"
+        fmt = rng.choices(formats, weights)[0]
+        dated = rng.random() < DATED_SHARE
+        if dated:
+            url = f"{base_url}/dated/{merchant_id}/{{YYYY}}-{{MM}}-{{DD}}.{fmt}"
+        else:
+            url = f"{base_url}/static/{merchant_id}.{fmt}"
+        merchant = {
+            "id": merchant_id,
+            "name": f"Bench Merchant {i}",
+            "country": rng.choice(COUNTRIES),
+            "tier": rng.choice([1, 1, 2, 3]),
+            "enabled": True,
+            "discovery_url": f"{base_url}/",
+            "downloads": [{"url": url, "format": fmt, "preferred": True}],
+            "url_pattern": "dated" if dated else "static",
+        }
+        if fmt != "pdf":
+            merchant["column_map"] = dict(COLUMNS)
+        merchants.append(merchant)
+    return merchants
+
+
+def write_config(path: Path, merchants: list[dict]):
+    path.write_text(yaml.safe_dump({"merchants": merchants}, sort_keys=False, allow_unicode=True))
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("count", type=int)
+    parser.add_argument("--base-url", default="http://127.0.0.1:8800")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("-o", "--output", type=Path, default=Path("merchants.bench.yaml"))
+    args = parser.parse_args(argv)
+    write_config(args.output, generate_merchants(args.count, args.base_url, args.seed))
+    print(f"Wrote {args.count} merchants to {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
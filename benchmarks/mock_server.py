@@ -0,0 +1,260 @@
+"""Local asyncio HTTP server that behaves like a crowd of wine merchants.
+
+Serves synthetic price lists for any merchant id:
+
+    /static/<merchant_id>.<ext>              always available
+    /dated/<merchant_id>/<YYYY-MM-DD>.<ext>  404 unless the date is the
+                                             "published" one (today minus
+                                             ``publish_lag`` days), like a
+                                             merchant that posts a dated file
+                                             every few days
+    /stats                                   request counters as JSON
+
+``ext`` is one of xlsx, csv, json or pdf. Latency, bandwidth, error rate and
+429 + Retry-After throttling are set on ``ServerConfig``. Files are generated
+once per (format, variant) and reused, so thousands of merchants cost a handful
+of generations.
+
+    python benchmarks/mock_server.py --port 8800 --rows 2000 --latency 0.05
+"""
+from __future__ import annotations
+import argparse
+import asyncio
+import hashlib
+import io
+import json
+import random
+import sys
+import threading
+from collections import Counter
+from dataclasses import dataclass
+from datetime import date, timedelta
+from typing import Optional
+from urllib.parse import urlsplit
+import openpyxl
+
+FORMATS = ("xlsx", "csv", "json", "pdf")
+# Column layout of every generated file; gen_merchants.py uses it as column_map
+COLUMNS = {
+    "Wine": "wine_name",
+    "Vintage": "vintage",
+    "Region": "region",
+    "Colour": "color",
+    "Format": "format",
+    "Price": "price",
+    "Currency": "currency",
+    "Stock": "stock_quantity",
+    "Case Size": "case_size",
+}
+CONTENT_TYPES = {
+    "xlsx": "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+    "csv": "text/csv; charset=utf-8",
+    "json": "application/json",
+    "pdf": "application/pdf",
+}
+REASONS = {200: "OK", 404: "Not Found", 429: "Too Many Requests", 500: "Internal Server Error"}
+
+PRODUCERS = ["Château Latour", "Château Margaux", "Domaine Leflaive", "Krug", "Penfolds", "Sassicaia",
+             "Vega Sicilia", "Egon Müller", "Domaine Rousseau", "Ridge", "Dom Pérignon", "Pétrus"]
+REGIONS = ["Bordeaux", "Burgundy", "Champagne", "Tuscany", "Rioja", "Mosel", "Barossa", "Napa"]
+COLOURS = ["Red", "White", "Rosé"]
+BOTTLES = ["75cl", "150cl", "37.5cl", "300cl"]
+
+
+@dataclass
+class ServerConfig:
+    rows: int = 500
+    latency: float = 0.0           # seconds before the response starts
+    bandwidth: int = 0             # bytes/second per response, 0 = unlimited
+    error_rate: float = 0.0        # share of file requests answered 500
+    throttle_rate: float = 0.0     # share answered 429 with Retry-After
+    retry_after: int = 1
+    publish_lag: int = 2           # dated files exist only for today - publish_lag
+    variants: int = 8              # distinct files per format
+    seed: int = 0
+
+
+def make_rows(rows: int, seed: int) -> list[dict]:
+    rng = random.Random(seed)
+    return [
+        {
+            "Wine": f"{rng.choice(PRODUCERS)} Cuvée {rng.randint(1, 999)}",
+            "Vintage": str(rng.randint(1970, 2023)) if rng.random() > 0.05 else "NV",
+            "Region": rng.choice(REGIONS),
+            "Colour": rng.choice(COLOURS),
+            "Format": rng.choice(BOTTLES),
+            "Price": f"{rng.randint(20, 20000)}.{rng.choice(['00', '50', '95'])}",
+            "Currency": "GBP",
+            "Stock": str(rng.randint(0, 120)),
+            "Case Size": rng.choice(["1", "3", "6", "12"]),
+        }
+        for _ in range(rows)
+    ]
+
+
+def render(fmt: str, rows: list[dict]) -> bytes:
+    if fmt == "csv":
+        out = io.StringIO()
+        out.write(",".join(COLUMNS) + "\n")
+        for r in rows:
+            out.write(",".join(f'"{r[c]}"' for c in COLUMNS) + "\n")
+        return out.getvalue().encode()
+    if fmt == "json":
+        return json.dumps({"wines": rows}).encode()
+    if fmt == "xlsx":
+        wb = openpyxl.Workbook(write_only=True)
+        ws = wb.create_sheet("Stock")
+        ws.append(list(COLUMNS))
+        for r in rows:
+            ws.append([r[c] for c in COLUMNS])
+        out = io.BytesIO()
+        wb.save(out)
+        return out.getvalue()
+    if fmt == "pdf":
+        body = "\n".join(f"{r['Wine']} {r['Vintage']} {r['Price']}" for r in rows)
+        return b"%PDF-1.4\n% synthetic price list\n" + body.encode() + b"\n%%EOF\n"
+    raise ValueError(f"Unknown format {fmt}")
+
+
+class MockMerchantServer:
+    def __init__(self, config: Optional[ServerConfig] = None):
+        self.config = config or ServerConfig()
+        self.stats: Counter = Counter()
+        self._files: dict[tuple[str, int], bytes] = {}
+        self._rng = random.Random(self.config.seed)
+        self._server: Optional[asyncio.base_events.Server] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._thread: Optional[threading.Thread] = None
+        self.port = 0
+
+    def file_for(self, merchant_id: str, fmt: str) -> bytes:
+        variant = int(hashlib.sha1(merchant_id.encode()).hexdigest(), 16) % self.config.variants
+        key = (fmt, variant)
+        if key not in self._files:
+            self._files[key] = render(fmt, make_rows(self.config.rows, self.config.seed * 1000 + variant))
+        return self._files[key]
+
+    def route(self, path: str) -> tuple[int, dict, bytes]:
+        if path == "/stats":
+            return 200, {"Content-Type": "application/json"}, json.dumps(dict(self.stats)).encode()
+        parts = path.strip("/").split("/")
+        if len(parts) == 2 and parts[0] == "static":
+            merchant_id, _, fmt = parts[1].rpartition(".")
+        elif len(parts) == 3 and parts[0] == "dated":
+            merchant_id = parts[1]
+            day, _, fmt = parts[2].rpartition(".")
+            published = date.today() - timedelta(days=self.config.publish_lag)
+            if day != published.isoformat():
+                return 404, {}, b"not published"
+        else:
+            return 404, {}, b"unknown path"
+        if fmt not in FORMATS or not merchant_id:
+            return 404, {}, b"unknown file"
+
+        roll = self._rng.random()
+        if roll < self.config.throttle_rate:
+            return 429, {"Retry-After": str(self.config.retry_after)}, b"slow down"
+        if roll < self.config.throttle_rate + self.config.error_rate:
+            return 500, {}, b"upstream error"
+        body = self.file_for(merchant_id, fmt)
+        return 200, {"Content-Type": CONTENT_TYPES[fmt], "ETag": f'"{hashlib.md5(body).hexdigest()}"'}, body
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            request_line = (await reader.readline()).decode("latin-1").strip()
+            while (await reader.readline()) not in (b"\r\n", b"\n", b""):
+                pass
+            if not request_line:
+                return
+            method, target, _ = request_line.split(" ", 2)
+            status, headers, body = self.route(urlsplit(target).path)
+            self.stats["requests"] += 1
+            self.stats[str(status)] += 1
+            if self.config.latency:
+                await asyncio.sleep(self.config.latency)
+            head = [f"HTTP/1.1 {status} {REASONS.get(status, '')}", f"Content-Length: {len(body)}",
+                    "Connection: close", *(f"{k}: {v}" for k, v in headers.items())]
+            writer.write(("\r\n".join(head) + "\r\n\r\n").encode())
+            if method != "HEAD":
+                await self._send(writer, body)
+            await writer.drain()
+            self.stats["bytes_sent"] += 0 if method == "HEAD" else len(body)
+        except (ConnectionError, ValueError):
+            pass
+        finally:
+            writer.close()
+
+    async def _send(self, writer: asyncio.StreamWriter, body: bytes):
+        if not self.config.bandwidth:
+            writer.write(body)
+            return
+        chunk = max(1024, self.config.bandwidth // 20)
+        for start in range(0, len(body), chunk):
+            writer.write(body[start:start + chunk])
+            await writer.drain()
+            await asyncio.sleep(chunk / self.config.bandwidth)
+
+    async def start(self, host: str = "127.0.0.1", port: int = 0) -> str:
+        self._server = await asyncio.start_server(self._handle, host, port, backlog=1024)
+        self.port = self._server.sockets[0].getsockname()[1]
+        return f"http://{host}:{self.port}"
+
+    async def stop(self):
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+
+    def start_in_thread(self) -> str:
+        """Run the server on its own event loop in a daemon thread; returns the base URL."""
+        started = threading.Event()
+        result: dict = {}
+
+        def serve():
+            self._loop = asyncio.new_event_loop()
+            result["url"] = self._loop.run_until_complete(self.start())
+            started.set()
+            self._loop.run_forever()
+
+        self._thread = threading.Thread(target=serve, daemon=True)
+        self._thread.start()
+        started.wait()
+        return result["url"]
+
+    def stop_thread(self):
+        if self._loop is None:
+            return
+        asyncio.run_coroutine_threadsafe(self.stop(), self._loop).result()
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join()
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--port", type=int, default=8800)
+    parser.add_argument("--rows", type=int, default=ServerConfig.rows)
+    parser.add_argument("--latency", type=float, default=0.0)
+    parser.add_argument("--bandwidth", type=int, default=0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--throttle-rate", type=float, default=0.0)
+    parser.add_argument("--retry-after", type=int, default=1)
+    parser.add_argument("--publish-lag", type=int, default=2)
+    args = parser.parse_args(argv)
+    server = MockMerchantServer(ServerConfig(
+        rows=args.rows, latency=args.latency, bandwidth=args.bandwidth, error_rate=args.error_rate,
+        throttle_rate=args.throttle_rate, retry_after=args.retry_after, publish_lag=args.publish_lag,
+    ))
+
+    async def serve():
+        url = await server.start(port=args.port)
+        print(f"Serving mock merchants on {url}")
+        await asyncio.Event().wait()
+
+    try:
+        asyncio.run(serve())
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
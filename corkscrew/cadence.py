@@ -0,0 +1,122 @@
+"""Learn how often a merchant's file changes from its MerchantState history."""
+from __future__ import annotations
+from dataclasses import dataclass
+from datetime import date, datetime, timedelta
+from statistics import median
+from typing import Optional
+from corkscrew.models import MerchantState
+
+DEFAULT_INTERVAL = timedelta(days=1)
+MIN_INTERVAL = timedelta(hours=6)
+MAX_INTERVAL = timedelta(days=7)
+# Without enough observed changes to measure a gap, back off one doubling per
+# this many consecutive unchanged successes.
+BACKOFF_STREAK = 5
+# Smart runs only skip a merchant once this many changes are on record, and
+# treat changes as weekday-bound when they all fell on at most this many weekdays.
+MIN_CHANGE_SAMPLES = 3
+MAX_PATTERN_WEEKDAYS = 2
+
+
+def change_dates(state: MerchantState) -> list[date]:
+    return sorted({date.fromisoformat(h["date"]) for h in state.history if h.get("changed")})
+
+
+def unchanged_streak(state: MerchantState) -> int:
+    streak = 0
+    for h in reversed(state.history):
+        if h.get("status") != "success":
+            continue
+        if h.get("changed"):
+            break
+        streak += 1
+    return streak
+
+
+def refresh_interval(
+    state: MerchantState,
+    default: timedelta = DEFAULT_INTERVAL,
+    minimum: timedelta = MIN_INTERVAL,
+    maximum: timedelta = MAX_INTERVAL,
+) -> timedelta:
+    """How long to wait between polls of a merchant.
+
+    Half the median gap between observed changes, so a merchant that updates
+    weekly is polled about twice a week. Merchants with too few changes on
+    record start at ``default`` and back off as they keep coming back unchanged.
+    """
+    dates = change_dates(state)
+    gaps = [(b - a).days for a, b in zip(dates, dates[1:])]
+    if gaps:
+        interval = timedelta(days=median(gaps)) / 2
+    else:
+        interval = default * (2 ** (unchanged_streak(state) // BACKOFF_STREAK))
+    return max(minimum, min(maximum, interval))
+
+
+@dataclass
+class Cadence:
+    changes: int
+    last_change: Optional[date] = None
+    interval: Optional[timedelta] = None
+    weekdays: Optional[frozenset[int]] = None  # date.weekday() values, if changes cluster on them
+
+    @property
+    def reliable(self) -> bool:
+        return self.changes >= MIN_CHANGE_SAMPLES
+
+
+def estimate_cadence(state: MerchantState) -> Cadence:
+    dates = change_dates(state)
+    if not dates:
+        return Cadence(changes=0)
+    gaps = [(b - a).days for a, b in zip(dates, dates[1:])]
+    weekdays = frozenset(d.weekday() for d in dates)
+    return Cadence(
+        changes=len(dates),
+        last_change=dates[-1],
+        interval=timedelta(days=median(gaps)) if gaps else None,
+        weekdays=weekdays if len(weekdays) <= MAX_PATTERN_WEEKDAYS else None,
+    )
+
+
+def should_fetch(state: MerchantState, today: Optional[date] = None) -> tuple[bool, str]:
+    """Decide whether a smart run should download this merchant, and why.
+
+    Errs towards fetching: only merchants with a reliable change pattern, a
+    clean last run and a recent success are ever skipped.
+    """
+    today = today or date.today()
+    if state.last_success is None:
+        return True, "never downloaded"
+    if state.consecutive_failures:
+        return True, "last run failed"
+    cadence = estimate_cadence(state)
+    if not cadence.reliable:
+        return True, "not enough change history"
+    last_success = datetime.fromisoformat(state.last_success).date()
+    if today - last_success >= MAX_INTERVAL:
+        return True, f"not checked for {(today - last_success).days} days"
+
+    if cadence.weekdays is not None:
+        days_since = [last_success + timedelta(days=i) for i in range(1, (today - last_success).days + 1)]
+        if any(d.weekday() in cadence.weekdays for d in days_since):
+            return True, "usual update day has passed"
+        names = ", ".join(_WEEKDAY_NAMES[w] for w in sorted(cadence.weekdays))
+        return False, f"usually updates on {names}"
+
+    next_change = cadence.last_change + cadence.interval
+    if today >= next_change - timedelta(days=1):
+        return True, "update expected"
+    days = cadence.interval.total_seconds() / 86400
+    return False, f"usually updates every {days:g} days, next around {next_change.isoformat()}"
+
+
+def typical_cost(state: MerchantState) -> tuple[int, float]:
+    """Median (bytes, seconds) of the merchant's recent successful downloads."""
+    sizes = [h["bytes"] for h in state.history if h.get("status") == "success" and "bytes" in h]
+    times = [h["seconds"] for h in state.history if h.get("status") == "success" and "seconds" in h]
+    return int(median(sizes)) if sizes else 0, float(median(times)) if times else 0.0
+
+
+_WEEKDAY_NAMES = ["Mon", "Tue", "Wed", "Thu", "Fri", "Sat", "Sun"]
@@ -0,0 +1,127 @@
+"""Run-level checkpoint journal so an interrupted run can be resumed."""
+from __future__ import annotations
+import json
+import os
+import secrets
+from datetime import date, datetime, timezone
+from pathlib import Path
+from typing import Optional
+
+# Stages a merchant passes through in a run, in order. A merchant is finished
+# once it has a terminal entry (see RunJournal.is_finished).
+STAGES = ("download", "normalize", "write")
+
+
+class RunJournal:
+    """Append-only JSONL journal of completed stages per merchant.
+
+    Lives in ``<runs_root>/<run_id>/`` alongside a ``run.json`` describing the
+    run (merchant list, reference date, finished flag).
+    """
+
+    def __init__(self, run_dir: Path):
+        self.run_dir = run_dir
+        self.run_id = run_dir.name
+        self._meta_path = run_dir / "run.json"
+        self._journal_path = run_dir / "journal.jsonl"
+        self.meta: dict = json.loads(self._meta_path.read_text())
+        self._entries: dict[str, dict[str, dict]] = {}
+        if self._journal_path.exists():
+            for line in self._journal_path.read_text().splitlines():
+                try:
+                    entry = json.loads(line)
+                except json.JSONDecodeError:
+                    # A torn final line from a killed process; everything before it is intact
+                    continue
+                self._entries.setdefault(entry["merchant_id"], {})[entry["stage"]] = entry
+
+    @classmethod
+    def create(cls, runs_root: Path, merchant_ids: list[str], ref_date: Optional[date] = None) -> RunJournal:
+        now = datetime.now(timezone.utc)
+        run_id = f"{now.strftime('%Y%m%dT%H%M%SZ')}-{secrets.token_hex(3)}"
+        run_dir = runs_root / run_id
+        run_dir.mkdir(parents=True, exist_ok=False)
+        meta = {
+            "run_id": run_id,
+            "started": now.isoformat(),
+            "ref_date": (ref_date or now.date()).isoformat(),
+            "merchants": merchant_ids,
+            "finished": None,
+        }
+        (run_dir / "run.json").write_text(json.dumps(meta, indent=2))
+        return cls(run_dir)
+
+    @classmethod
+    def open(cls, runs_root: Path, run_id: str) -> RunJournal:
+        run_dir = runs_root / run_id
+        if not (run_dir / "run.json").exists():
+            raise FileNotFoundError(f"No run '{run_id}' in {runs_root}")
+        return cls(run_dir)
+
+    @classmethod
+    def latest_unfinished(cls, runs_root: Path) -> Optional[RunJournal]:
+        """The most recently started run, unless it finished.
+
+        Older unfinished runs are stale once a newer run has started (their
+        reference date and merchants are out of date), so they are only
+        resumed when named explicitly.
+        """
+        if not runs_root.exists():
+            return None
+        started = {}
+        for run_dir in runs_root.iterdir():
+            meta_path = run_dir / "run.json"
+            if meta_path.exists():
+                started[run_dir] = json.loads(meta_path.read_text()).get("started") or ""
+        if not started:
+            return None
+        journal = cls(max(started, key=started.get))
+        return None if journal.finished else journal
+
+    @property
+    def ref_date(self) -> date:
+        return date.fromisoformat(self.meta["ref_date"])
+
+    @property
+    def merchant_ids(self) -> list[str]:
+        return list(self.meta["merchants"])
+
+    @property
+    def finished(self) -> bool:
+        return bool(self.meta.get("finished"))
+
+    def record(self, merchant_id: str, stage: str, **data):
+        if stage not in STAGES:
+            raise ValueError(f"Unknown stage '{stage}'")
+        entry = {
+            "merchant_id": merchant_id,
+            "stage": stage,
+            "at": datetime.now(timezone.utc).isoformat(),
+            **data,
+        }
+        with open(self._journal_path, "a") as f:
+            f.write(json.dumps(entry) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+        self._entries.setdefault(merchant_id, {})[stage] = entry
+
+    def completed(self, merchant_id: str) -> dict[str, dict]:
+        return dict(self._entries.get(merchant_id, {}))
+
+    def is_finished(self, merchant_id: str) -> bool:
+        done = self._entries.get(merchant_id, {})
+        if "write" in done:
+            return True
+        download = done.get("download")
+        if download is None:
+            return False
+        if download.get("error") or not download.get("changed"):
+            return True
+        normalize = done.get("normalize")
+        return normalize is not None and (bool(normalize.get("error")) or normalize.get("records", 0) == 0)
+
+    def mark_finished(self):
+        self.meta["finished"] = datetime.now(timezone.utc).isoformat()
+        tmp = self._meta_path.with_suffix(".json.tmp")
+        tmp.write_text(json.dumps(self.meta, indent=2))
+        tmp.replace(self._meta_path)
@@ -1,26 +1,48 @@
 # corkscrew/cli.py
+# Heavy modules (pandas, httpx, pydantic, rich) are imported inside the commands
+# that use them, so light commands like 'status --json' start quickly.
 from __future__ import annotations
-import asyncio
+import json
 import sys
-from datetime import date, datetime, timezone
+from collections import defaultdict
+from contextlib import nullcontext
+from datetime import datetime, timezone
 from pathlib import Path
+from typing import TYPE_CHECKING
 import click
-import pandas as pd
-from rich.console import Console
-from rich.table import Table
-from corkscrew.config import load_config, ConfigError
-from corkscrew.downloader import Downloader
-from corkscrew.normalizer import NormalizerRegistry, NormalizationError
-from corkscrew.storage import StorageManager
-
-console = Console()
+from corkscrew.compression import CODEC_SUFFIXES, DEFAULT_CODEC
+from corkscrew.health import build_summary, merchant_health, read_summary, write_summary
+
+if TYPE_CHECKING:
+    from corkscrew.downloader import Downloader
+    from corkscrew.pipeline import MerchantOutcome, RunPipeline
+    from corkscrew.storage import StorageManager
+
 DATA_ROOT = Path("data")
 STATE_FILE = DATA_ROOT / "state.json"
+SUMMARY_FILE = DATA_ROOT / "status.json"
+HISTORY_DB = DATA_ROOT / "history.db"
+FX_RATES = DATA_ROOT / "fx_rates.csv"
+QUEUE_DB = DATA_ROOT / "queue.db"
+RUNS_ROOT = DATA_ROOT / "runs"
+SHARDS_ROOT = DATA_ROOT / "shards"
+CONTROL_SOCKET = DATA_ROOT / "corkscrew.sock"
 DEFAULT_CONFIG = Path("merchants.yaml")
 
-# A merchant is considered stale when its last N consecutive runs produced no
-# changed data; this threshold determines how many unchanged runs trigger STALE.
-STALE_RUN_THRESHOLD = 5
+
+class _Console:
+    """The rich Console, created on first use."""
+
+    _console = None
+
+    def __getattr__(self, name):
+        if _Console._console is None:
+            from rich.console import Console
+            _Console._console = Console()
+        return getattr(_Console._console, name)
+
+
+console = _Console()
 
 
 @click.group()
@@ -32,17 +54,68 @@ def cli():
 @cli.command()
 @click.option("--merchant", default=None, help="Run a single merchant by ID")
 @click.option("--tier", default=None, type=int, help="Run merchants of this tier (default: all tiers)")
+@click.option("--country", default=None, help="Run merchants from this country code (e.g. FR)")
 @click.option("--dry-run", is_flag=True, help="Show what would be downloaded without downloading")
 @click.option("--config", default=None, help="Path to merchants.yaml")
-def run(merchant, tier, dry_run, config):
+@click.option("--resume", "resume", is_flag=True, help="Continue the last interrupted run instead of starting over")
+@click.option("--run-id", default=None, help="With --resume: the run to continue (default: the latest, if unfinished)")
+@click.option("--shard", default=None, help="Only run this worker's share of merchants, as i/N (e.g. 2/4)")
+@click.option("--queue", default=None, help="Claim merchants from a shared SQLite work queue at this path")
+@click.option("--worker-id", default=None, help="Worker name for --shard/--queue partial state (default: derived)")
+@click.option("--smart", is_flag=True, help="Skip merchants whose change history says they haven't updated yet")
+@click.option("--force", "force_ids", multiple=True, help="With --smart: always download this merchant (repeatable)")
+@click.option("--profile", is_flag=True, help="Profile each merchant's stages into the run directory (slower)")
+@click.option("--hedge-after", default=None, type=float,
+              help="Start a merchant's alternate download after this many seconds; keep whichever finishes first")
+@click.option("--precheck", is_flag=True, help="Ask servers for file sizes first (HEAD) to start big files early")
+def run(merchant, tier, country, dry_run, config, resume, run_id, shard, queue, worker_id, smart, force_ids, profile,
+        hedge_after, precheck):
     """Download and normalize wine inventory from merchants."""
+    import asyncio
+    from corkscrew.checkpoint import RunJournal
+    from corkscrew.config import ConfigError, load_config
+    from corkscrew.downloader import Downloader
+    from corkscrew.normalizer import NormalizerRegistry
+    from corkscrew.pipeline import RunPipeline
+    from corkscrew.precheck import history_sizes
+    from corkscrew.profiling import Profiler
+    from corkscrew.shard import LeaseQueue, default_worker_id, parse_shard, partial_state_path, run_from_queue, select_shard
+    from corkscrew.storage import StorageManager
+
     config_path = Path(config) if config else DEFAULT_CONFIG
+    journal = None
+    if resume:
+        try:
+            journal = RunJournal.open(RUNS_ROOT, run_id) if run_id else RunJournal.latest_unfinished(RUNS_ROOT)
+        except FileNotFoundError as e:
+            console.print(f"[red]Error:[/red] {e}")
+            sys.exit(2)
+        if journal is None:
+            console.print("[yellow]The last run finished (or there is none); starting a new run.[/yellow]")
     try:
-        merchants = load_config(config_path, enabled_only=True, tier=tier, merchant_id=merchant)
+        if journal is not None:
+            # A resumed run keeps the merchant selection it was started with
+            merchants = load_config(config_path, enabled_only=True, merchant_ids=journal.merchant_ids)
+        else:
+            merchants = load_config(config_path, enabled_only=True, tier=tier, merchant_id=merchant, country=country)
     except ConfigError as e:
         console.print(f"[red]Config error:[/red] {e}")
         sys.exit(2)
 
+    shard_spec = None
+    if shard:
+        try:
+            shard_spec = parse_shard(shard)
+        except ValueError as e:
+            console.print(f"[red]Error:[/red] {e}")
+            sys.exit(2)
+        merchants = select_shard(merchants, *shard_spec)
+
+    if smart and journal is None:
+        # A merchant asked for by name is always fetched
+        forced = set(force_ids) | ({merchant} if merchant else set())
+        merchants = _smart_select(merchants, StorageManager(STATE_FILE), forced)
+
     if not merchants:
         console.print("[yellow]No merchants matched the filter criteria.[/yellow]")
         sys.exit(0)
@@ -54,64 +127,173 @@ def run(merchant, tier, dry_run, config):
             console.print(f"  {m.id:40} {dl.format:6} {dl.url}")
         sys.exit(0)
 
-    storage = StorageManager(STATE_FILE)
-    downloader = Downloader(output_root=DATA_ROOT / "raw")
+    worker = worker_id or (default_worker_id(shard_spec) if shard_spec or queue else None)
+    if worker:
+        # Workers never write the global state file; 'corkscrew reduce' folds their partials in
+        storage = StorageManager(partial_state_path(SHARDS_ROOT, worker), base_path=STATE_FILE)
+    else:
+        storage = StorageManager(STATE_FILE)
+    downloader = Downloader(output_root=DATA_ROOT / "raw", hedge_after=hedge_after)
     registry = NormalizerRegistry()
+    if journal is None:
+        journal = RunJournal.create(RUNS_ROOT, [m.id for m in merchants])
+        console.print(f"[bold]Starting run for {len(merchants)} merchants[/bold] [dim](run {journal.run_id})[/dim]")
+    else:
+        done = sum(1 for m in merchants if journal.is_finished(m.id))
+        console.print(f"[bold]Resuming run {journal.run_id}:[/bold] {done}/{len(merchants)} merchants already complete")
+    profiler = Profiler(journal.run_dir / "profile") if profile else None
+    downloader.profiler = profiler
+    pipeline = RunPipeline(
+        downloader, storage, registry,
+        normalized_root=DATA_ROOT / "normalized",
+        on_outcome=_print_outcome,
+        journal=journal,
+        profiler=profiler,
+        sizes=history_sizes(merchants, storage),
+    )
+    before = None
+    if precheck:
+        before = _precheck(downloader, [m for m in merchants if not journal.is_finished(m.id)], pipeline)
+
+    with profiler or nullcontext():
+        if queue:
+            # Workers of one run share its reference date, and so its rows in the queue
+            lease_queue = LeaseQueue(Path(queue), journal.ref_date.isoformat())
+            lease_queue.seed([m.id for m in merchants])
+            try:
+                work = run_from_queue(pipeline, lease_queue, worker, merchants)
+                outcomes = asyncio.run(_with_session(downloader, work, before))
+            finally:
+                lease_queue.close()
+        else:
+            outcomes = asyncio.run(_with_session(downloader, pipeline.run(merchants), before))
+    journal.mark_finished()
+    if not worker:
+        # Workers see only part of the state; 'corkscrew reduce' writes the summary
+        # and loads their CSVs for them
+        _write_status_summary(config_path, storage)
+        _load_history([o.out_path for o in outcomes if o.out_path])
+    if profiler is not None:
+        console.print(f"[bold]Profile:[/bold] {profiler.write()}")
+
+    failed = [o.merchant.id for o in outcomes if not o.success]
+    norm_failed = [o.merchant.id for o in outcomes if o.norm_error]
+    quarantined = [o.merchant.id for o in outcomes if o.quarantine]
+    total_wines = sum(o.records for o in outcomes)
+
+    console.print(f"\n[bold]Run complete:[/bold] {len(outcomes)-len(failed)}/{len(outcomes)} succeeded, "
+                  f"{len(failed)} failed, {len(norm_failed)} norm failures, {total_wines} wines normalized")
+    if quarantined:
+        console.print(f"[yellow]{len(quarantined)} quarantined[/yellow] (check data/quarantine/, then "
+                      f"'corkscrew normalize --merchant ID --accept' if the data is right): {', '.join(quarantined)}")
 
-    console.print(f"[bold]Starting run for {len(merchants)} merchants[/bold]")
+    sys.exit(1 if failed or norm_failed or quarantined else 0)
 
-    results = asyncio.run(downloader.download_all(merchants))
 
-    failed = []
-    norm_failed = []
-    total_wines = 0
+@cli.command()
+@click.option("--merchant", "merchant_ids", multiple=True, help="Merchant ID to normalize (repeatable; default: all)")
+@click.option("--since", type=click.DateTime(["%Y-%m-%d"]), default=None, help="Only downloads from this date (YYYY-MM-DD) on")
+@click.option("--until", type=click.DateTime(["%Y-%m-%d"]), default=None, help="Only downloads up to this date (YYYY-MM-DD)")
+@click.option("--all", "all_history", is_flag=True, help="Every download on disk, not just each merchant's latest")
+@click.option("--file", "file_path", default=None, help="Normalize this raw file (needs exactly one --merchant)")
+@click.option("--force", is_flag=True, help="Rebuild CSVs even when they are up to date")
+@click.option("--accept", is_flag=True, help="Write snapshots that failed the quality checks to normalized/ anyway")
+@click.option("--workers", default=None, type=int, help="Worker processes (default: one per CPU)")
+@click.option("--config", default=None, help="Path to merchants.yaml")
+@click.option("--profile", is_flag=True, help="Profile the normalize and write stages (runs in one process)")
+def normalize(merchant_ids, since, until, all_history, file_path, force, accept, workers, config, profile):
+    """Normalize downloaded files again, without downloading."""
+    from corkscrew.config import ConfigError, load_config
+    from corkscrew.profiling import Profiler
+    from corkscrew.renormalize import RawDownload, plan, record_result, run_jobs, scan_raw
+    from corkscrew.storage import NormalizeManifest
 
-    for result, merchant_cfg in zip(results, merchants):
-        if not result.success:
-            console.print(f"  [red]✗[/red] {merchant_cfg.id:40} {result.error}")
-            storage.record_failure(merchant_cfg.id, result.error or "Unknown error")
-            failed.append(merchant_cfg.id)
-            continue
+    config_path = Path(config) if config else DEFAULT_CONFIG
+    try:
+        merchants = {m.id: m for m in load_config(config_path, merchant_ids=merchant_ids or None)}
+    except ConfigError as e:
+        console.print(f"[red]Config error:[/red] {e}")
+        sys.exit(2)
+    unknown = [m for m in merchant_ids if m not in merchants]
+    if unknown:
+        console.print(f"[red]Error:[/red] Not in {config_path}: {', '.join(unknown)}")
+        sys.exit(2)
 
-        changed = storage.is_changed(merchant_cfg.id, result.file_hash)
-        storage.record_success(
-            merchant_cfg.id,
-            hash_val=result.file_hash,
-            filepath=result.filepath,
-            changed=changed,
+    if file_path:
+        if len(merchant_ids) != 1:
+            console.print("[red]Error:[/red] --file needs exactly one --merchant")
+            sys.exit(2)
+        downloads = [RawDownload.from_path(merchant_ids[0], Path(file_path))]
+    else:
+        downloads = scan_raw(
+            DATA_ROOT / "raw", merchants,
+            since=since.date() if since else None,
+            until=until.date() if until else None,
+            all_history=all_history,
         )
+    if not downloads:
+        console.print("[yellow]No downloaded files matched.[/yellow]")
+        sys.exit(0)
 
-        change_label = "changed" if changed else "unchanged"
-        size_kb = result.bytes_downloaded // 1024
-        console.print(f"  [green]✓[/green] {merchant_cfg.id:40} {size_kb:6} KB  {change_label}")
-
-        if changed:
-            filepath = Path(result.filepath)
-            today = date.today().isoformat()
-            out_dir = DATA_ROOT / "normalized" / merchant_cfg.id
-            out_dir.mkdir(parents=True, exist_ok=True)
-            out_path = out_dir / f"{today}.csv"
-            try:
-                records = registry.normalize(filepath, merchant_cfg, download_date=today)
-                if records:
-                    pd.DataFrame([r.to_row() for r in records]).to_csv(out_path, index=False)
-                    console.print(f"    [dim]→ {len(records)} wines normalized[/dim]")
-                    total_wines += len(records)
-            except NormalizationError as e:
-                console.print(f"    [yellow]⚠ Normalization failed:[/yellow] {e}")
-                norm_failed.append(merchant_cfg.id)
-
-    console.print(f"\n[bold]Run complete:[/bold] {len(merchants)-len(failed)}/{len(merchants)} succeeded, "
-                  f"{len(failed)} failed, {len(norm_failed)} norm failures, {total_wines} wines normalized")
-
-    sys.exit(1 if failed or norm_failed else 0)
+    normalized_root = DATA_ROOT / "normalized"
+    manifest = NormalizeManifest(normalized_root)
+    jobs, current = plan(downloads, merchants, normalized_root, manifest, force=force, accept=accept)
+    console.print(f"[bold]Normalizing {len(jobs)} of {len(downloads)} downloads[/bold] "
+                  f"[dim]({current} already up to date)[/dim]")
+
+    profiler = None
+    if profile:
+        stamp = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%SZ")
+        profiler = Profiler(RUNS_ROOT / f"{stamp}-normalize" / "profile")
+    counts: dict[str, int] = defaultdict(int)
+    written = []
+    with profiler or nullcontext(), console.status(f"Normalizing {len(jobs)} downloads...") as status:
+        for done, result in enumerate(run_jobs(jobs, workers, profiler), 1):
+            status.update(f"Normalizing downloads... {done}/{len(jobs)}")
+            record_result(manifest, result)
+            counts[result.status] += 1
+            if result.status == "written":
+                written.append(result.job.out_path)
+            download = result.job.download
+            if result.status == "failed":
+                console.print(f"[red]✗[/red] {download.merchant_id} {download.run_date}: {result.error}")
+            elif result.status == "quarantined":
+                console.print(f"[yellow]⚠[/yellow] {download.merchant_id} {download.run_date} quarantined: "
+                              f"{'; '.join(result.quarantine)}")
+
+    console.print(
+        f"[green]✓[/green] {counts['written']} rewritten, {counts['empty']} with no wines, "
+        f"{counts['unchanged'] + current} up to date, {counts['quarantined']} quarantined, {counts['failed']} failed"
+    )
+    _load_history(written)
+    if profiler is not None:
+        console.print(f"[bold]Profile:[/bold] {profiler.write()}")
+    sys.exit(1 if counts["failed"] or counts["quarantined"] else 0)
 
 
 @cli.command()
 @click.option("--config", default=None, help="Path to merchants.yaml")
-def status(config):
+@click.option("--json", "as_json", is_flag=True, help="Print the summary saved by the last run, as JSON")
+def status(config, as_json):
     """Show last run status for all merchants."""
     config_path = Path(config) if config else DEFAULT_CONFIG
+    if as_json:
+        summary = read_summary(SUMMARY_FILE)
+        if summary is None:
+            # No run has written one yet: build it the slow way, once
+            from corkscrew.config import ConfigError
+            from corkscrew.storage import StorageManager
+            try:
+                summary = _write_status_summary(config_path, StorageManager(STATE_FILE))
+            except ConfigError as e:
+                click.echo(f"Config error: {e}", err=True)
+                sys.exit(2)
+        click.echo(json.dumps(summary, indent=2))
+        return
+
+    from rich.table import Table
+    from corkscrew.config import ConfigError, load_config
+    from corkscrew.storage import StorageManager
     try:
         merchants = load_config(config_path)
     except ConfigError as e:
@@ -128,45 +310,35 @@ def status(config):
     table.add_column("Hash")
     table.add_column("Failures")
 
-    ok = stale = failed_count = 0
+    counts: dict[str, int] = defaultdict(int)
     for m in merchants:
         state = storage.get_merchant_state(m.id)
+        health = merchant_health(state.model_dump())
+        counts[health] += 1
+        status_str = _HEALTH_STYLES[health]
         if state.last_run is None:
             last_run = "never"
-            status_str = "[dim]PENDING[/dim]"
             changed_str = "-"
             hash_str = "-"
         else:
             last_run = _relative_time(state.last_run)
-            failures = state.consecutive_failures
-            if failures >= 7:
-                status_str = "[red]CRITICAL[/red]"
-                failed_count += 1
-            elif failures >= 3:
-                status_str = "[yellow]⚠ WARN[/yellow]"
-                failed_count += 1
-            elif failures > 0:
-                status_str = "[red]FAILED[/red]"
-                failed_count += 1
-            elif not state.changed and len(state.history) > STALE_RUN_THRESHOLD:
-                status_str = "[yellow]STALE[/yellow]"
-                stale += 1
-            else:
-                status_str = "[green]OK[/green]"
-                ok += 1
             changed_str = "Yes" if state.changed else "No"
             hash_str = (state.last_hash or "")[:8]
 
         table.add_row(m.name, last_run, status_str, changed_str, hash_str, str(state.consecutive_failures))
 
     console.print(table)
-    console.print(f"\n{len(merchants)} merchants | {ok} OK | {stale} stale | {failed_count} failed")
+    failed_count = counts["FAILED"] + counts["WARN"] + counts["CRITICAL"]
+    console.print(f"\n{len(merchants)} merchants | {counts['OK']} OK | {counts['STALE']} stale | {failed_count} failed")
 
 
 @cli.command(name="list")
 @click.option("--config", default=None)
 def list_merchants(config):
     """List all configured merchants."""
+    from rich.table import Table
+    from corkscrew.config import ConfigError, load_config
+
     config_path = Path(config) if config else DEFAULT_CONFIG
     try:
         merchants = load_config(config_path)
@@ -187,28 +359,70 @@ def list_merchants(config):
 
 
 @cli.command()
-@click.option("--output", default=None, help="Output path for master CSV")
-def merge(output):
+@click.option("--output", default=None, help="Output path for master file (or directory, with --partitioned)")
+@click.option("--format", "fmt", default="csv", type=click.Choice(["csv", "xlsx"]), show_default=True,
+              help="xlsx: an Excel workbook with a summary sheet and one sheet per merchant")
+@click.option("--partitioned", is_flag=True,
+              help="Write one CSV per country and merchant, plus a catalog, instead of one master CSV")
+@click.option("--config", default=None, help="Path to merchants.yaml (for merchant countries, with --partitioned)")
+@click.option("--fx", "fx_path", default=None, help="Exchange-rate table for price_eur (default: data/fx_rates.csv)")
+def merge(output, fmt, partitioned, config, fx_path):
     """Merge all latest normalized CSVs into a master file."""
-    out_path = Path(output) if output else DATA_ROOT / "master" / "master.csv"
+    import pandas as pd
+    from corkscrew.fx import load_fx_table
+    from corkscrew.models import TYPED_FIELDS
+
+    if partitioned and fmt != "csv":
+        console.print("[red]Error:[/red] --partitioned only writes CSV files")
+        sys.exit(2)
     normalized_root = DATA_ROOT / "normalized"
+    if partitioned:
+        out_path = Path(output) if output else DATA_ROOT / "master" / "partitioned"
+    else:
+        out_path = Path(output) if output else DATA_ROOT / "master" / f"master.{fmt}"
 
     if not normalized_root.exists():
         console.print("[yellow]No normalized directory found. Run 'corkscrew run' first.[/yellow]")
         sys.exit(0)
-
-    all_dfs = []
-    for merchant_dir in sorted(normalized_root.iterdir()):
-        if not merchant_dir.is_dir():
-            continue
-        csvs = sorted(merchant_dir.glob("*.csv"))
-        if csvs:
-            latest = csvs[-1]
+    fx_path = Path(fx_path) if fx_path else FX_RATES
+    try:
+        fx = load_fx_table(fx_path)
+    except ValueError as e:
+        console.print(f"[red]Error:[/red] {e}")
+        sys.exit(2)
+    if not fx:
+        console.print(f"[dim]No exchange rates in {fx_path}: price_eur is only filled for prices in euros[/dim]")
+
+    def latest_csvs():
+        for merchant_dir in sorted(normalized_root.iterdir()):
+            if not merchant_dir.is_dir():
+                continue
+            csvs = sorted(merchant_dir.glob("*.csv"))
+            if csvs:
+                yield merchant_dir.name, csvs[-1]
+
+    if fmt == "xlsx":
+        _merge_xlsx(list(latest_csvs()), out_path, fx)
+        return
+
+    # String fields stay text; the parsed numeric columns keep their nullable int type
+    master_dtypes = defaultdict(lambda: str, {name: "Int64" for name in TYPED_FIELDS})
+
+    def latest_frames():
+        for merchant_id, latest in latest_csvs():
             try:
-                df = pd.read_csv(latest, dtype=str)
-                all_dfs.append(df)
+                df = pd.read_csv(latest, dtype=master_dtypes)
             except Exception as e:
                 console.print(f"[yellow]⚠[/yellow] Could not read {latest}: {e}")
+                continue
+            if {"price_minor", "currency", "download_date"} <= set(df.columns):
+                df["price_eur"] = fx.to_eur(df["price_minor"], df["currency"], df["download_date"])
+            yield merchant_id, df
+
+    if partitioned:
+        _merge_partitioned(latest_frames(), out_path, Path(config) if config else DEFAULT_CONFIG)
+        return
+    all_dfs = [df for _, df in latest_frames()]
     if not all_dfs:
         console.print("[yellow]No normalized files found.[/yellow]")
         sys.exit(0)
@@ -218,6 +432,396 @@ def merge(output):
     console.print(f"[green]✓[/green] Merged {len(all_dfs)} merchants → {out_path} ({len(master)} total records)")
 
 
+def _merge_xlsx(sources: list[tuple[str, Path]], out_path: Path, fx):
+    """Write merge's Excel output, streaming rows from each CSV into the workbook."""
+    from corkscrew.xlsx_writer import write_master_xlsx
+
+    if not sources:
+        console.print("[yellow]No normalized files found.[/yellow]")
+        sys.exit(0)
+    with console.status(f"Writing {len(sources)} merchants to {out_path}..."):
+        written = write_master_xlsx(sources, out_path, fx=fx)
+    total = sum(m.rows for m in written)
+    split = [m.merchant_id for m in written if len(m.sheets) > 1]
+    console.print(f"[green]✓[/green] Merged {len(written)} merchants → {out_path} ({total} total records)")
+    if split:
+        console.print(f"[dim]Split over several sheets (too many rows for one): {', '.join(split)}[/dim]")
+
+
+def _merge_partitioned(frames, out_dir: Path, config_path: Path):
+    """Write merge's partitioned output, one merchant at a time."""
+    from corkscrew.config import ConfigError, load_config
+    from corkscrew.partition import PartitionWriter
+
+    try:
+        countries = {m.id: m.country.upper() for m in load_config(config_path)}
+    except ConfigError as e:
+        console.print(f"[red]Config error:[/red] {e}")
+        sys.exit(2)
+    writer = PartitionWriter(out_dir)
+    try:
+        for merchant_id, df in frames:
+            writer.write(countries.get(merchant_id, "unknown"), merchant_id, df)
+    except BaseException:
+        writer.abort()
+        raise
+    if not writer.partitions:
+        writer.abort()
+        console.print("[yellow]No normalized files found.[/yellow]")
+        sys.exit(0)
+    catalog = writer.commit()
+    console.print(f"[green]✓[/green] Merged {len(catalog['partitions'])} merchants → {out_dir} "
+                  f"({catalog['rows']} total records, catalog in {out_dir / '_catalog.json'})")
+
+
+@cli.command()
+@click.argument("query", required=False)
+@click.option("--sync", "sync_first", is_flag=True, help="First bring the database up to date with the normalized CSVs")
+@click.option("--csv", "as_csv", is_flag=True, help="Print every result row as CSV instead of a table")
+@click.option("--limit", default=100, show_default=True, help="Rows shown in the table")
+def sql(query, sync_first, as_csv, limit):
+    """Query every normalized file ever written with SQL."""
+    import sqlite3
+    from corkscrew.history import HistoryStore
+
+    if sync_first or not HISTORY_DB.exists() or _history_behind():
+        _sync_history()
+        if not HISTORY_DB.exists():
+            sys.exit(0)
+    if not query:
+        if not sync_first:
+            _print_history_tables()
+        sys.exit(0)
+    try:
+        with HistoryStore(HISTORY_DB, readonly=True) as store:
+            columns, rows = store.query(query)
+    except sqlite3.Error as e:
+        console.print(f"[red]Error:[/red] {e}")
+        sys.exit(2)
+
+    if as_csv:
+        import csv
+        writer = csv.writer(sys.stdout)
+        writer.writerow(columns)
+        writer.writerows(rows)
+        sys.exit(0)
+    from rich.table import Table
+    table = Table(show_header=True, header_style="bold")
+    for column in columns:
+        table.add_column(column)
+    for row in rows[:limit]:
+        table.add_row(*("" if v is None else str(v) for v in row))
+    console.print(table)
+    shown = f" (showing the first {limit}; use --csv for all)" if len(rows) > limit else ""
+    console.print(f"[dim]{len(rows)} rows{shown}[/dim]")
+
+
+@cli.command()
+@click.option("--codec", default=DEFAULT_CODEC, type=click.Choice(sorted(CODEC_SUFFIXES)), show_default=True,
+              help="Compression to store raw files with")
+@click.option("--level", default=None, type=int, help="Compression level (default: zstd 9, gzip 6)")
+@click.option("--workers", default=None, type=int, help="Files compressed at once (default: one per CPU)")
+@click.option("--dry-run", is_flag=True, help="List the files that would be compressed")
+def compact(codec, level, workers, dry_run):
+    """Compress the raw download archive in place."""
+    from corkscrew.compression import check_codec, compact as compact_files, compact_candidates
+    from corkscrew.storage import StorageManager
+
+    raw_root = DATA_ROOT / "raw"
+    try:
+        check_codec(codec)
+    except ValueError as e:
+        console.print(f"[red]Error:[/red] {e}")
+        sys.exit(2)
+    paths = compact_candidates(raw_root, codec) if raw_root.exists() else []
+    if not paths:
+        console.print("[green]✓[/green] Nothing to compact.")
+        sys.exit(0)
+    if dry_run:
+        total = sum(p.stat().st_size for p in paths)
+        console.print(f"[bold]Dry run:[/bold] would compress {len(paths)} files ({total / 1e6:.1f} MB)")
+        for p in paths:
+            console.print(f"  {p}")
+        sys.exit(0)
+
+    renamed: dict[str, str] = {}
+    before = after = failed = 0
+    with console.status(f"Compressing {len(paths)} files...") as status:
+        for done, result in enumerate(compact_files(paths, codec, level, workers), 1):
+            status.update(f"Compressing files... {done}/{len(paths)}")
+            if result.error:
+                failed += 1
+                console.print(f"[yellow]⚠[/yellow] {result.source}: {result.error}")
+                continue
+            renamed[str(result.source)] = str(result.target)
+            before += result.before
+            after += result.after
+    if renamed and STATE_FILE.exists():
+        StorageManager(STATE_FILE).rename_files(renamed)
+    ratio = f" ({before / after:.1f}x smaller)" if after else ""
+    console.print(f"[green]✓[/green] Compressed {len(renamed)} files: "
+                  f"{before / 1e6:.1f} MB → {after / 1e6:.1f} MB{ratio}")
+    if failed:
+        console.print(f"[yellow]{failed} files could not be compressed and were left as they were.[/yellow]")
+        sys.exit(1)
+
+
+@cli.command()
+@click.option("--keep-partials", is_flag=True, help="Leave worker state files in place after merging")
+@click.option("--no-merge", is_flag=True, help="Only combine state; don't rebuild the master file")
+@click.option("--queue", default=None, help=f"Work queue to clear for the next run (default: {QUEUE_DB})")
+@click.pass_context
+def reduce(ctx, keep_partials, no_merge, queue):
+    """Combine state from --shard/--queue workers and rebuild the master."""
+    from corkscrew.config import ConfigError
+    from corkscrew.shard import LeaseQueue, reduce_states
+    from corkscrew.storage import StorageManager
+
+    partials = sorted(SHARDS_ROOT.glob("state-*.json")) if SHARDS_ROOT.exists() else []
+    if not partials:
+        console.print("[yellow]No worker state files found in[/yellow] " + str(SHARDS_ROOT))
+    else:
+        updated = reduce_states(STATE_FILE, partials)
+        console.print(f"[green]✓[/green] Combined {len(partials)} worker state files → {STATE_FILE} "
+                      f"({updated} merchant entries updated)")
+        if not keep_partials:
+            for p in partials:
+                p.unlink()
+        try:
+            _write_status_summary(DEFAULT_CONFIG, StorageManager(STATE_FILE))
+        except ConfigError as e:
+            console.print(f"[yellow]Status summary not updated:[/yellow] {e}")
+        _sync_history()
+    queue_path = Path(queue) if queue else QUEUE_DB
+    if queue_path.exists():
+        lease_queue = LeaseQueue(queue_path, "")
+        lease_queue.clear()
+        lease_queue.close()
+        console.print(f"[green]✓[/green] Cleared the work queue {queue_path}")
+    if not no_merge:
+        ctx.invoke(merge, output=None)
+
+
+@cli.command()
+@click.option("--config", default=None, help="Path to merchants.yaml")
+@click.option("--socket", "socket_path", default=None, help=f"Control socket path (default: {CONTROL_SOCKET})")
+@click.option("--port", default=None, type=int, help="Control port on localhost where Unix sockets aren't available")
+def serve(config, socket_path, port):
+    """Run continuously, refreshing each merchant on its own learned interval."""
+    import asyncio
+    import signal
+    from concurrent.futures import ThreadPoolExecutor
+    from corkscrew.config import ConfigError, load_config
+    from corkscrew.downloader import Downloader
+    from corkscrew.normalizer import NormalizerRegistry
+    from corkscrew.pipeline import NORMALIZE_WORKERS, RunPipeline
+    from corkscrew.scheduler import DEFAULT_PORT, Scheduler, has_unix_sockets, start_control_server
+    from corkscrew.storage import StorageManager
+
+    port = port or DEFAULT_PORT
+    config_path = Path(config) if config else DEFAULT_CONFIG
+
+    def load_merchants():
+        return load_config(config_path, enabled_only=True)
+
+    try:
+        merchants = load_merchants()
+    except ConfigError as e:
+        console.print(f"[red]Config error:[/red] {e}")
+        sys.exit(2)
+
+    control_path = Path(socket_path) if socket_path else CONTROL_SOCKET
+
+    async def _serve():
+        storage = StorageManager(STATE_FILE)
+
+        def after_merchant(outcomes):
+            # Keeps 'status --json' and 'sql' current between the merchants' runs
+            try:
+                _write_status_summary(config_path, storage)
+            except ConfigError as e:
+                console.print(f"[yellow]Status summary not updated:[/yellow] {e}")
+            _load_history([o.out_path for o in outcomes if o.out_path])
+
+        async with Downloader(output_root=DATA_ROOT / "raw") as downloader:
+            with ThreadPoolExecutor(max_workers=NORMALIZE_WORKERS) as executor:
+                pipeline = RunPipeline(
+                    downloader, storage, NormalizerRegistry(),
+                    normalized_root=DATA_ROOT / "normalized",
+                    executor=executor,
+                    on_outcome=_print_outcome,
+                )
+                scheduler = Scheduler(merchants, storage, pipeline, reload_config=load_merchants,
+                                      on_finished=after_merchant)
+                server = await start_control_server(scheduler, control_path, port)
+                loop = asyncio.get_running_loop()
+                for sig in (signal.SIGINT, signal.SIGTERM):
+                    try:
+                        loop.add_signal_handler(sig, scheduler.stop)
+                    except NotImplementedError:  # Windows
+                        pass
+                where = control_path if has_unix_sockets() else f"127.0.0.1:{port}"
+                console.print(f"[bold]Serving {len(merchants)} merchants[/bold] [dim](control: {where})[/dim]")
+                try:
+                    await scheduler.run_forever()
+                finally:
+                    server.close()
+                    await server.wait_closed()
+                    if has_unix_sockets():
+                        control_path.unlink(missing_ok=True)
+
+    asyncio.run(_serve())
+    console.print("Stopped.")
+
+
+@cli.command()
+@click.argument("command", nargs=-1, required=True)
+@click.option("--socket", "socket_path", default=None, help=f"Control socket path (default: {CONTROL_SOCKET})")
+@click.option("--port", default=None, type=int, help="Control port on localhost where Unix sockets aren't available")
+def ctl(command, socket_path, port):
+    """Talk to a running 'corkscrew serve': status | run ID | reload | stop."""
+    from corkscrew.scheduler import DEFAULT_PORT, send_command
+    try:
+        reply = send_command(" ".join(command), Path(socket_path) if socket_path else CONTROL_SOCKET, port or DEFAULT_PORT)
+    except OSError as e:
+        console.print(f"[red]Could not reach corkscrew serve:[/red] {e}")
+        sys.exit(1)
+    click.echo(json.dumps(reply, indent=2))
+    sys.exit(0 if reply.get("ok") else 1)
+
+
+async def _with_session(downloader: Downloader, work, before=None):
+    # One connection pool for the whole run instead of a client per download
+    async with downloader:
+        if before is not None:
+            await before
+        return await work
+
+
+async def _precheck(downloader: Downloader, merchants: list, pipeline: RunPipeline):
+    console.print(f"[dim]Checking file sizes for {len(merchants)} merchants...[/dim]")
+    announced = await downloader.precheck(merchants, pipeline.ref_date)
+    pipeline.sizes.update(announced)
+    total = sum(announced.values())
+    console.print(f"[bold]Precheck:[/bold] {len(announced)}/{len(merchants)} servers reported a size "
+                  f"({total / 1_048_576:.1f} MB); largest files start first")
+
+
+def _smart_select(merchants: list, storage: StorageManager, forced: set[str]) -> list:
+    from corkscrew.cadence import should_fetch, typical_cost
+    selected, skipped = [], []
+    saved_bytes = 0
+    saved_seconds = 0.0
+    for m in merchants:
+        state = storage.get_merchant_state(m.id)
+        fetch, reason = should_fetch(state)
+        if fetch or m.id in forced:
+            selected.append(m)
+            continue
+        size, seconds = typical_cost(state)
+        saved_bytes += size
+        saved_seconds += seconds
+        skipped.append((m.id, reason))
+    for merchant_id, reason in skipped:
+        console.print(f"  [dim]- {merchant_id:40} skipped: {reason}[/dim]")
+    if skipped:
+        console.print(f"[bold]Smart run:[/bold] skipping {len(skipped)}/{len(merchants)} merchants, "
+                      f"saving ~{saved_bytes / 1_048_576:.1f} MB and ~{saved_seconds:.0f}s of downloads")
+    return selected
+
+
+def _write_status_summary(config_path: Path, storage: StorageManager) -> dict:
+    """Save the summary 'status --json' prints. Raises ConfigError."""
+    from corkscrew.config import load_config
+    merchants = load_config(config_path)
+    states = {m.id: storage.get_merchant_state(m.id).model_dump() for m in merchants}
+    summary = build_summary(((m.id, m.name) for m in merchants), states)
+    write_summary(SUMMARY_FILE, summary)
+    return summary
+
+
+def _load_history(csv_paths: list[Path]):
+    """Add freshly written normalized CSVs to the history database."""
+    import sqlite3
+    from corkscrew.history import HistoryStore
+    if not csv_paths:
+        return
+    try:
+        with HistoryStore(HISTORY_DB) as store:
+            for path in csv_paths:
+                store.load(path.parent.name, path.stem, path)
+    except (OSError, sqlite3.Error) as e:
+        # The CSVs are written either way; 'sql' catches the database up
+        console.print(f"[yellow]History database not updated:[/yellow] {e}")
+
+
+def _sync_history():
+    import sqlite3
+    from corkscrew.history import HistoryStore
+    normalized_root = DATA_ROOT / "normalized"
+    if not normalized_root.is_dir():
+        console.print("[yellow]No normalized directory found. Run 'corkscrew run' first.[/yellow]")
+        return
+    try:
+        with console.status("Loading normalized files into the history database..."):
+            with HistoryStore(HISTORY_DB) as store:
+                loaded, current, removed = store.sync(normalized_root)
+    except (OSError, sqlite3.Error) as e:
+        console.print(f"[yellow]History database not updated:[/yellow] {e}")
+        return
+    console.print(f"[green]✓[/green] History database: {loaded} files loaded, {current} already up to date, "
+                  f"{removed} removed")
+
+
+def _history_behind() -> bool:
+    """Whether the history database is missing normalized CSVs, or has ones since deleted."""
+    import sqlite3
+    from corkscrew.history import HistoryStore
+    try:
+        with HistoryStore(HISTORY_DB, readonly=True) as store:
+            return store.behind(DATA_ROOT / "normalized")
+    except (OSError, sqlite3.Error):
+        # Let the sync try, and report what is wrong
+        return True
+
+
+def _print_history_tables():
+    from corkscrew.history import HistoryStore
+    with HistoryStore(HISTORY_DB, readonly=True) as store:
+        for name in ("wines", "latest", "snapshots"):
+            columns, _ = store.query(f"SELECT * FROM {name} LIMIT 0")
+            console.print(f"[bold]{name}[/bold]: {', '.join(columns)}")
+
+
+_HEALTH_STYLES = {
+    "PENDING": "[dim]PENDING[/dim]",
+    "OK": "[green]OK[/green]",
+    "STALE": "[yellow]STALE[/yellow]",
+    "FAILED": "[red]FAILED[/red]",
+    "WARN": "[yellow]⚠ WARN[/yellow]",
+    "CRITICAL": "[red]CRITICAL[/red]",
+}
+
+
+def _print_outcome(outcome: MerchantOutcome):
+    merchant_id = outcome.merchant.id
+    result = outcome.result
+    if not outcome.success:
+        console.print(f"  [red]✗[/red] {merchant_id:40} {result.error}")
+        return
+    change_label = "changed" if outcome.changed else "unchanged"
+    size_kb = result.bytes_downloaded // 1024
+    console.print(f"  [green]✓[/green] {merchant_id:40} {size_kb:6} KB  {change_label}")
+    if outcome.warning:
+        console.print(f"    [yellow]⚠ {outcome.warning}[/yellow]")
+    if outcome.norm_error:
+        console.print(f"    [yellow]⚠ Normalization failed:[/yellow] {outcome.norm_error}")
+    elif outcome.quarantine:
+        console.print(f"    [yellow]⚠ Quarantined {outcome.records} wines:[/yellow] {'; '.join(outcome.quarantine)}")
+    elif outcome.records:
+        console.print(f"    [dim]→ {outcome.records} wines normalized[/dim]")
+
+
 def _relative_time(iso_str: str) -> str:
     try:
         dt = datetime.fromisoformat(iso_str)
@@ -0,0 +1,191 @@
+# corkscrew/compression.py
+"""Compressed storage for raw downloads.
+
+Text-like downloads (csv, json, txt, xls) are kept as ``<name>.zst`` (zstd,
+needs the optional ``zstandard`` package) or ``<name>.gz``. Formats that are
+already zip containers (xlsx, zip) or usually compressed inside (pdf) are left
+alone. File hashes are always taken over the uncompressed bytes, so change
+detection does not depend on how a file is stored.
+
+``RawFile`` lets the normalizers read a compressed file through a streaming
+decompressor as if it were the original.
+"""
+from __future__ import annotations
+import gzip
+import hashlib
+import os
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import IO, Iterator, NamedTuple, Optional, Union
+
+try:
+    import zstandard
+except ImportError:  # optional: pip install "corkscrew[fast]"
+    zstandard = None
+
+CODEC_SUFFIXES = {"zstd": ".zst", "gzip": ".gz"}
+SUFFIX_CODECS = {suffix: codec for codec, suffix in CODEC_SUFFIXES.items()}
+COMPRESSIBLE = frozenset({".csv", ".json", ".txt", ".xls"})
+DEFAULT_CODEC = "zstd" if zstandard is not None else "gzip"
+DEFAULT_LEVELS = {"zstd": 9, "gzip": 6}
+CHUNK_SIZE = 1 << 20
+
+
+def codec_of(path: Path) -> Optional[str]:
+    """Codec a stored file is compressed with, or None for a plain file."""
+    return SUFFIX_CODECS.get(path.suffix.lower())
+
+
+def logical_path(path: Path) -> Path:
+    """The path without its compression suffix ("list.csv.zst" → "list.csv")."""
+    return path.with_suffix("") if codec_of(path) else path
+
+
+def should_compress(path: Path) -> bool:
+    return codec_of(path) is None and path.suffix.lower() in COMPRESSIBLE
+
+
+def check_codec(codec: str):
+    if codec not in CODEC_SUFFIXES:
+        raise ValueError(f"Unknown codec {codec!r}; use one of {sorted(CODEC_SUFFIXES)}")
+    if codec == "zstd" and zstandard is None:
+        raise ValueError("zstd needs the zstandard package (pip install \"corkscrew[fast]\")")
+
+
+def open_raw(path: Path, codec: Optional[str] = None) -> IO[bytes]:
+    """Open a stored file for reading, decompressing on the fly.
+
+    ``codec`` defaults to the one the file's suffix names.
+    """
+    codec = codec or codec_of(path)
+    if codec == "gzip":
+        return gzip.open(path, "rb")
+    if codec == "zstd":
+        if zstandard is None:
+            raise ValueError(f"{path.name} is zstd-compressed but zstandard is not installed")
+        return zstandard.ZstdDecompressor().stream_reader(open(path, "rb"), closefd=True)
+    return open(path, "rb")
+
+
+def hash_raw(path: Path, codec: Optional[str] = None) -> str:
+    """SHA-256 of the uncompressed contents."""
+    sha256 = hashlib.sha256()
+    with open_raw(path, codec) as f:
+        for chunk in iter(lambda: f.read(CHUNK_SIZE), b""):
+            sha256.update(chunk)
+    return sha256.hexdigest()
+
+
+def compress_file(path: Path, codec: str = DEFAULT_CODEC, level: Optional[int] = None) -> Path:
+    """Store ``path`` compressed with ``codec``; return the new path.
+
+    A file already in another codec is recompressed. The result is checked
+    against the original's hash before the original is removed, and written
+    through a temporary file, so an interrupted run never loses data.
+    """
+    check_codec(codec)
+    target = logical_path(path).with_name(logical_path(path).name + CODEC_SUFFIXES[codec])
+    if target == path:
+        return path
+    level = DEFAULT_LEVELS[codec] if level is None else level
+    tmp = target.with_name(f".{target.name}.tmp")
+    try:
+        with open_raw(path) as src, open(tmp, "wb") as raw_out:
+            if codec == "zstd":
+                out = zstandard.ZstdCompressor(level=level).stream_writer(raw_out, closefd=False)
+            else:
+                # mtime=0 keeps the output identical for identical input
+                out = gzip.GzipFile(filename="", mode="wb", fileobj=raw_out, compresslevel=level, mtime=0)
+            original = hashlib.sha256()
+            with out:
+                for chunk in iter(lambda: src.read(CHUNK_SIZE), b""):
+                    original.update(chunk)
+                    out.write(chunk)
+        if hash_raw(tmp, codec) != original.hexdigest():
+            raise OSError(f"Compressed copy of {path} does not match the original")
+        os.replace(tmp, target)
+    finally:
+        tmp.unlink(missing_ok=True)
+    path.unlink()
+    return target
+
+
+def find_raw(path: Path) -> Path:
+    """``path`` as stored now: a file recorded before it was compressed may have gained a suffix."""
+    if path.exists():
+        return path
+    for suffix in CODEC_SUFFIXES.values():
+        candidate = path.with_name(path.name + suffix)
+        if candidate.exists():
+            return candidate
+    return path
+
+
+class RawFile:
+    """A compressed download, readable like the original Path.
+
+    Offers the slice of the Path API the format normalizers use (``name``,
+    ``suffix``, ``open``, ``read_bytes``), decompressing as it reads.
+    """
+
+    def __init__(self, path: Path):
+        self.path = path
+        original = logical_path(path)
+        self.name = original.name
+        self.suffix = original.suffix
+
+    def open(self, mode: str = "rb") -> IO[bytes]:
+        if mode != "rb":
+            raise ValueError("Raw files are read-only binary files")
+        return open_raw(self.path)
+
+    def read_bytes(self) -> bytes:
+        with open_raw(self.path) as f:
+            return f.read()
+
+    def __str__(self) -> str:
+        return str(self.path)
+
+
+def readable(path: Path) -> Union[Path, RawFile]:
+    """What a normalizer should be handed for a stored file."""
+    path = find_raw(path)
+    return RawFile(path) if codec_of(path) else path
+
+
+class Compacted(NamedTuple):
+    source: Path
+    target: Optional[Path]
+    before: int
+    after: int
+    error: Optional[str] = None
+
+
+def compact_candidates(root: Path, codec: str) -> list[Path]:
+    """Stored files under ``root`` that are uncompressed, or in a different codec."""
+    target_suffix = CODEC_SUFFIXES[codec]
+    return sorted(
+        p for p in root.rglob("*")
+        if p.is_file() and not p.name.startswith(".")
+        and (should_compress(p) or (codec_of(p) and p.suffix.lower() != target_suffix))
+    )
+
+
+def compact(paths: list[Path], codec: str = DEFAULT_CODEC, level: Optional[int] = None,
+            workers: Optional[int] = None) -> Iterator[Compacted]:
+    """Compress ``paths`` in parallel, yielding results as files finish.
+
+    Threads are enough: zlib and zstd release the GIL while they work.
+    """
+    check_codec(codec)
+
+    def one(path: Path) -> Compacted:
+        before = path.stat().st_size
+        try:
+            target = compress_file(path, codec, level)
+        except (OSError, ValueError, EOFError, gzip.BadGzipFile) as e:
+            return Compacted(path, None, before, before, str(e))
+        return Compacted(path, target, before, target.stat().st_size)
+
+    with ThreadPoolExecutor(max_workers=workers or os.cpu_count() or 1) as pool:
+        yield from pool.map(one, paths)
@@ -1,11 +1,26 @@
 # corkscrew/config.py
-"""YAML config loader: parses merchants.yaml into validated MerchantConfig objects."""
+"""YAML config loader: parses merchants.yaml into validated MerchantConfig objects.
+
+merchants.yaml may list merchants directly and/or pull them in from other files:
+
+    include:
+      - merchants.d/*.yaml
+    merchants: [...]
+
+Globs are relative to the including file. When includes are used, an
+id/tier/country index of every merchant is cached next to the root file, so a
+filtered load (one merchant, one tier) only reads the files holding matches.
+"""
+import json
 from pathlib import Path
-from typing import Optional
+from typing import Iterable, Optional
 import yaml
 from pydantic import ValidationError
 from corkscrew.models import MerchantConfig
 
+INDEX_VERSION = 1
+_Loader = getattr(yaml, "CSafeLoader", yaml.SafeLoader)
+
 
 class ConfigError(Exception):
     pass
@@ -16,30 +31,157 @@ def load_config(
     enabled_only: bool = False,
     tier: Optional[int] = None,
     merchant_id: Optional[str] = None,
+    country: Optional[str] = None,
+    merchant_ids: Optional[Iterable[str]] = None,
 ) -> list[MerchantConfig]:
+    """Load merchants, validating only the entries that pass the filters."""
     if not path.exists():
         raise ConfigError(f"Config file not found: {path}")
+    root = _read_merchant_file(path, allow_include=True)
+    files = [path] + _expand_includes(path, root.get("include") or [])
+    wanted = set(merchant_ids) if merchant_ids is not None else None
+
+    def selected(item: dict) -> bool:
+        return (
+            (not enabled_only or bool(item.get("enabled")))
+            and (tier is None or item.get("tier") == tier)
+            and (merchant_id is None or item.get("id") == merchant_id)
+            and (country is None or str(item.get("country", "")).upper() == country.upper())
+            and (wanted is None or item.get("id") in wanted)
+        )
+
+    filtered = any(f is not None for f in (tier, merchant_id, country, wanted))
+    if len(files) > 1 and filtered:
+        index = MerchantIndex.load(path, files, root)
+        files = index.files_matching(selected)
+
+    merchants = []
+    for file in files:
+        items = root["merchants"] if file == path else _read_merchant_file(file)["merchants"]
+        for item in items:
+            if not isinstance(item, dict):
+                raise ConfigError(f"Invalid merchant entry in {file}: {item!r}")
+            if selected(item):
+                merchants.append(_validate(item, file))
+    if not filtered:
+        _check_unique(merchants)
+    return merchants
+
+
+class MerchantIndex:
+    """Cached id → (file, tier, country, enabled) map for an include-based config.
+
+    Stored as ``.<config name>.index.json`` beside the root file and rebuilt
+    whenever the set of included files or any file's size/mtime changes.
+    """
+
+    def __init__(self, files: dict[str, list[int]], merchants: dict[str, dict]):
+        self.files = files
+        self.merchants = merchants
+
+    @staticmethod
+    def path_for(config_path: Path) -> Path:
+        return config_path.with_name(f".{config_path.stem}.index.json")
+
+    @classmethod
+    def load(cls, config_path: Path, files: list[Path], root: dict) -> "MerchantIndex":
+        stamps = {str(f): _stamp(f) for f in files}
+        index_path = cls.path_for(config_path)
+        try:
+            cached = json.loads(index_path.read_text())
+            if cached.get("version") == INDEX_VERSION and cached.get("files") == stamps:
+                return cls(cached["files"], cached["merchants"])
+        except (OSError, ValueError):
+            pass
+        index = cls.build(config_path, files, root, stamps)
+        index.save(index_path)
+        return index
 
+    @classmethod
+    def build(cls, config_path: Path, files: list[Path], root: dict, stamps: dict[str, list[int]]) -> "MerchantIndex":
+        merchants: dict[str, dict] = {}
+        for file in files:
+            items = root["merchants"] if file == config_path else _read_merchant_file(file)["merchants"]
+            for item in items:
+                merchant_id = item.get("id") if isinstance(item, dict) else None
+                if merchant_id is None:
+                    raise ConfigError(f"Merchant without an id in {file}")
+                if merchant_id in merchants:
+                    raise ConfigError(f"Duplicate merchant id '{merchant_id}' in {file} and {merchants[merchant_id]['file']}")
+                merchants[merchant_id] = {
+                    "file": str(file),
+                    "tier": item.get("tier"),
+                    "country": item.get("country"),
+                    "enabled": bool(item.get("enabled")),
+                }
+        return cls(stamps, merchants)
+
+    def save(self, index_path: Path):
+        tmp = index_path.with_suffix(".json.tmp")
+        try:
+            tmp.write_text(json.dumps({"version": INDEX_VERSION, "files": self.files, "merchants": self.merchants}))
+            tmp.replace(index_path)
+        except OSError:
+            # A read-only checkout still works, just without the cache
+            tmp.unlink(missing_ok=True)
+
+    def files_matching(self, selected) -> list[Path]:
+        """Files, in config order, holding at least one merchant that passes ``selected``."""
+        hits = {entry["file"] for merchant_id, entry in self.merchants.items() if selected({"id": merchant_id, **entry})}
+        return [Path(f) for f in self.files if f in hits]
+
+
+def _read_merchant_file(path: Path, allow_include: bool = False) -> dict:
     try:
-        raw = yaml.safe_load(path.read_text())
+        raw = yaml.load(path.read_text(), Loader=_Loader)
     except yaml.YAMLError as e:
         raise ConfigError(f"Invalid YAML in {path}: {e}")
-
-    if not isinstance(raw, dict) or "merchants" not in raw or not isinstance(raw["merchants"], list):
+    except OSError as e:
+        raise ConfigError(f"Cannot read {path}: {e}")
+    if not isinstance(raw, dict):
         raise ConfigError(f"Config missing or invalid 'merchants' list: {path}")
+    if "include" in raw and not allow_include:
+        raise ConfigError(f"Only the root config may use 'include': {path}")
+    include = raw.get("include")
+    if include is not None and not (isinstance(include, list) and all(isinstance(p, str) for p in include)):
+        raise ConfigError(f"'include' must be a list of paths or globs: {path}")
+    merchants = raw.setdefault("merchants", [] if include else None)
+    if not isinstance(merchants, list):
+        raise ConfigError(f"Config missing or invalid 'merchants' list: {path}")
+    return raw
 
-    merchants = []
-    for item in raw["merchants"]:
-        try:
-            merchants.append(MerchantConfig(**item))
-        except ValidationError as e:
-            raise ConfigError(f"Invalid merchant config for {item.get('id', '?')}: {e}")
 
-    if enabled_only:
-        merchants = [m for m in merchants if m.enabled]
-    if tier is not None:
-        merchants = [m for m in merchants if m.tier == tier]
-    if merchant_id is not None:
-        merchants = [m for m in merchants if m.id == merchant_id]
+def _expand_includes(config_path: Path, patterns: list[str]) -> list[Path]:
+    base = config_path.parent
+    files: list[Path] = []
+    for pattern in patterns:
+        if any(ch in pattern for ch in "*?["):
+            matches = sorted(base.glob(pattern))
+        else:
+            matches = [base / pattern]
+            if not matches[0].exists():
+                raise ConfigError(f"Included file not found: {matches[0]} (from {config_path})")
+        for match in matches:
+            if match.resolve() != config_path.resolve() and match not in files:
+                files.append(match)
+    return files
 
-    return merchants
+
+def _validate(item: dict, file: Path) -> MerchantConfig:
+    try:
+        return MerchantConfig(**item)
+    except ValidationError as e:
+        raise ConfigError(f"Invalid merchant config for {item.get('id', '?')} in {file}: {e}")
+
+
+def _check_unique(merchants: list[MerchantConfig]):
+    seen = set()
+    for m in merchants:
+        if m.id in seen:
+            raise ConfigError(f"Duplicate merchant id '{m.id}'")
+        seen.add(m.id)
+
+
+def _stamp(path: Path) -> list[int]:
+    st = path.stat()
+    return [st.st_mtime_ns, st.st_size]
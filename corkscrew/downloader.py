@@ -1,30 +1,163 @@
 # corkscrew/downloader.py
 """Async HTTP downloader: fetches wine inventory files with retry and URL pattern routing."""
 import asyncio
+import hashlib
+import json
+import time
+from contextlib import asynccontextmanager
 from datetime import date
 from pathlib import Path
-from typing import Optional
+from typing import Container, Optional
 import httpx
-from corkscrew.models import MerchantConfig, DownloadResult
+from corkscrew.compression import DEFAULT_CODEC, check_codec, compress_file, should_compress
+from corkscrew.models import DownloadConfig, MerchantConfig, DownloadResult
 from corkscrew.url_resolver import resolve_url
 from corkscrew.storage import compute_hash
 
 BROWSER_UA = "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/121.0.0.0 Safari/537.36"
 MIN_FILE_SIZE = 100  # bytes
 RETRY_DELAYS = [1, 4, 16]  # 1 initial attempt + up to 3 retries = 4 total attempts per URL
+CHUNK_SIZE = 65536
+# Relative cost of parsing each format; a merchant's cheapest healthy download is tried first
+FORMAT_COST = {"csv": 0, "txt": 0, "json": 1, "zip": 2, "xls": 3, "xlsx": 3, "xlsm": 3, "pdf": 5}
+# How long a download that failed stays at the back of its merchant's chain
+DEMOTE_SECONDS = 3600
 
 
 class Downloader:
-    def __init__(self, output_root: Path, concurrency: int = 10):
+    """Fetches merchant files.
+
+    Used as ``async with Downloader(...)`` it keeps one connection pool open
+    for every request (what a long-lived process wants); otherwise each fetch
+    opens and closes its own client.
+
+    A merchant's downloads are tried in ``download_chain`` order until one
+    succeeds. With ``hedge_after`` set, the next download in the chain is
+    started once the first has run that many seconds, and whichever finishes
+    first wins.
+    """
+
+    def __init__(self, output_root: Path, concurrency: int = 10, compression: Optional[str] = DEFAULT_CODEC,
+                 hedge_after: Optional[float] = None):
         self.output_root = output_root
+        self.hedge_after = hedge_after
+        # Codec for storing text-like downloads (see corkscrew.compression); None keeps them as sent
+        if compression is not None:
+            check_codec(compression)
+        self.compression = compression
+        # Set by `run --profile` (corkscrew.profiling) to profile hashing/compression
+        self.profiler = None
         self.semaphore = asyncio.Semaphore(concurrency)
+        self._client: Optional[httpx.AsyncClient] = None
+        # Download URL → when it last failed (time.monotonic)
+        self._failed_at: dict[str, float] = {}
+        # Resolved URL → size its server announced to a HEAD (see precheck)
+        self.expected_sizes: dict[str, int] = {}
+
+    async def __aenter__(self) -> "Downloader":
+        self._client = httpx.AsyncClient(**_client_kwargs())
+        return self
+
+    async def __aexit__(self, *exc):
+        client, self._client = self._client, None
+        if client is not None:
+            await client.aclose()
+
+    @asynccontextmanager
+    async def _session(self):
+        if self._client is not None:
+            yield self._client
+            return
+        async with httpx.AsyncClient(**_client_kwargs()) as client:
+            yield client
 
     async def download(self, merchant: MerchantConfig, ref_date: Optional[date] = None) -> DownloadResult:
         async with self.semaphore:
-            return await self._download_with_retry(merchant, ref_date)
+            started = time.monotonic()
+            result = await self._download_with_retry(merchant, ref_date)
+            result.elapsed_seconds = round(time.monotonic() - started, 3)
+            return result
+
+    async def precheck(self, merchants: list[MerchantConfig], ref_date: Optional[date] = None) -> dict[str, int]:
+        """HEAD every merchant's first-choice download at once; return the sizes servers announced.
+
+        Merchants whose server gives no usable Content-Length are left out.
+        """
+        async def one(merchant: MerchantConfig) -> tuple[str, Optional[int]]:
+            async with self.semaphore:
+                return merchant.id, await self._head_size(merchant, ref_date)
+
+        results = await asyncio.gather(*(one(m) for m in merchants))
+        return {merchant_id: size for merchant_id, size in results if size is not None}
+
+    async def _head_size(self, merchant: MerchantConfig, ref_date: Optional[date]) -> Optional[int]:
+        dl = download_chain(merchant, self._demoted())[0]
+        candidates = resolve_url(merchant.url_pattern, dl.url, reference_date=ref_date,
+                                 google_drive_id=merchant.google_drive_id)
+        for url in candidates:
+            try:
+                async with self._session() as client:
+                    resp = await client.head(url)
+            except httpx.HTTPError:
+                return None
+            if resp.status_code == 404:
+                continue  # next dated candidate
+            size = _declared_size(resp.headers) if resp.status_code == 200 else None
+            if size is not None:
+                self.expected_sizes[url] = size
+            return size
+        return None
+
+    def _demoted(self) -> set[str]:
+        now = time.monotonic()
+        return {url for url, at in self._failed_at.items() if now - at < DEMOTE_SECONDS}
 
     async def _download_with_retry(self, merchant: MerchantConfig, ref_date: Optional[date]) -> DownloadResult:
-        dl = merchant.preferred_download
+        chain = download_chain(merchant, self._demoted())
+        if self.hedge_after is None or len(chain) == 1:
+            return await self._fallback(merchant, chain, ref_date)
+        return await self._hedged(merchant, chain, ref_date)
+
+    async def _fallback(self, merchant: MerchantConfig, chain: list[DownloadConfig], ref_date: Optional[date]) -> DownloadResult:
+        result = None
+        for dl in chain:
+            result = await self._download_one(merchant, dl, ref_date)
+            if result.success:
+                self._failed_at.pop(dl.url, None)
+                return result
+            self._failed_at[dl.url] = time.monotonic()
+        return result
+
+    async def _hedged(self, merchant: MerchantConfig, chain: list[DownloadConfig], ref_date: Optional[date]) -> DownloadResult:
+        primary = asyncio.create_task(self._fallback(merchant, chain[:1], ref_date))
+        done, _ = await asyncio.wait({primary}, timeout=self.hedge_after)
+        if done:
+            result = primary.result()
+            return result if result.success else await self._fallback(merchant, chain[1:], ref_date)
+
+        # The first choice is slow: race it against the rest of the chain
+        pending = {primary, asyncio.create_task(self._fallback(merchant, chain[1:], ref_date))}
+        winner = result = None
+        try:
+            while pending and winner is None:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    result = task.result()
+                    if not result.success:
+                        continue
+                    if winner is None:
+                        winner = result
+                    else:
+                        # Both finished together; keep one file for the day
+                        Path(result.filepath).unlink(missing_ok=True)
+        finally:
+            for task in pending:
+                task.cancel()
+            await asyncio.gather(*pending, return_exceptions=True)
+        return winner or result
+
+    async def _download_one(self, merchant: MerchantConfig, dl: DownloadConfig, ref_date: Optional[date]) -> DownloadResult:
+        """Fetch one configured download, with retries and dated-URL candidates."""
         candidates = resolve_url(
             merchant.url_pattern,
             dl.url,
@@ -67,34 +200,82 @@ class Downloader:
         )
 
     async def _fetch(self, merchant: MerchantConfig, url: str, fmt: str, ref_date: Optional[date] = None) -> DownloadResult:
-        async with httpx.AsyncClient(
-            headers={"User-Agent": BROWSER_UA},
-            follow_redirects=True,
-            timeout=60.0,
-        ) as client:
-            resp = await client.get(url)
-
-        if resp.status_code != 200:
+        run_date = (ref_date or date.today()).isoformat()
+        out_dir = self.output_root / merchant.id / run_date
+        part_path = out_dir / f".{hashlib.sha1(url.encode()).hexdigest()[:12]}.part"
+        offset, validator = _resumable_part(part_path)
+        # Range offsets count the bytes as sent, but the .part file holds the
+        # decoded body; only an unencoded transfer keeps the two in step.
+        headers = {"Accept-Encoding": "identity"}
+        if offset:
+            # If-Range makes the server send the whole file (200) instead of a
+            # 206 if it changed since the partial download started.
+            headers.update({"Range": f"bytes={offset}-", "If-Range": validator})
+
+        async with self._session() as client:
+            async with client.stream("GET", url, headers=headers) as resp:
+                if resp.status_code not in (200, 206):
+                    if resp.status_code == 416:
+                        _discard_part(part_path)
+                    return DownloadResult(
+                        merchant_id=merchant.id,
+                        status_code=resp.status_code,
+                        bytes_downloaded=0,
+                        changed=False,
+                        error=f"HTTP {resp.status_code}",
+                    )
+
+                encoded = resp.headers.get("content-encoding", "identity") != "identity"
+                start = _range_start(resp.headers.get("content-range", ""))
+                if resp.status_code == 206 and (encoded or start != offset):
+                    _discard_part(part_path)
+                    return DownloadResult(
+                        merchant_id=merchant.id,
+                        status_code=206,
+                        bytes_downloaded=0,
+                        changed=False,
+                        error="Server returned an unexpected byte range",
+                    )
+
+                out_dir.mkdir(parents=True, exist_ok=True)
+                mode = "ab" if resp.status_code == 206 else "wb"
+                new_validator = resp.headers.get("etag") or resp.headers.get("last-modified")
+                if mode == "wb":
+                    # A server that encodes anyway can't be resumed byte-for-byte
+                    _write_part_meta(part_path, None if encoded else new_validator)
+                with open(part_path, mode) as f:
+                    async for chunk in resp.aiter_bytes(CHUNK_SIZE):
+                        f.write(chunk)
+                declared = _declared_size(resp.headers)
+                if declared is not None and resp.status_code == 206:
+                    declared += offset
+
+                # Determine filename
+                content_disp = resp.headers.get("content-disposition", "")
+
+        size = part_path.stat().st_size
+        expected = declared if declared is not None else self.expected_sizes.get(url)
+        if expected is not None and size < expected:
+            # Keep the partial file: the retry resumes it when the server allows.
+            # Forget the HEAD size in case the file was replaced since.
+            self.expected_sizes.pop(url, None)
             return DownloadResult(
                 merchant_id=merchant.id,
-                status_code=resp.status_code,
-                bytes_downloaded=0,
+                status_code=0,
+                bytes_downloaded=size,
                 changed=False,
-                error=f"HTTP {resp.status_code}",
+                error=f"Truncated download ({size} of {expected} bytes)",
             )
-
-        content = resp.content
-        if len(content) < MIN_FILE_SIZE:
+        if size < MIN_FILE_SIZE:
+            _discard_part(part_path)
             return DownloadResult(
                 merchant_id=merchant.id,
                 status_code=200,
-                bytes_downloaded=len(content),
+                bytes_downloaded=size,
                 changed=False,
-                error=f"File too small ({len(content)} bytes)",
+                error=f"File too small ({size} bytes)",
             )
 
-        # Determine filename
-        content_disp = resp.headers.get("content-disposition", "")
         if "filename=" in content_disp:
             fname = content_disp.split("filename=")[-1].strip('" ')
         else:
@@ -102,22 +283,110 @@ class Downloader:
         if "." not in fname:
             fname = f"{fname}.{fmt}"
 
-        run_date = (ref_date or date.today()).isoformat()
-        out_dir = self.output_root / merchant.id / run_date
-        out_dir.mkdir(parents=True, exist_ok=True)
         filepath = out_dir / fname
-        filepath.write_bytes(content)
+        part_path.replace(filepath)
+        _part_meta_path(part_path).unlink(missing_ok=True)
 
-        file_hash = compute_hash(filepath)
+        store = self._store if self.profiler is None else self.profiler.wrap(merchant.id, "hash", self._store)
+        storing = asyncio.ensure_future(asyncio.to_thread(store, filepath))
+        try:
+            file_hash, filepath = await asyncio.shield(storing)
+        except asyncio.CancelledError:
+            # Lost a hedged race: the thread can't be stopped, so let it finish
+            # and remove what it leaves, keeping one download for the day
+            await asyncio.wait({storing})
+            filepath.unlink(missing_ok=True)
+            if not storing.cancelled() and storing.exception() is None:
+                storing.result()[1].unlink(missing_ok=True)
+            raise
         return DownloadResult(
             merchant_id=merchant.id,
             filepath=str(filepath),
             file_hash=file_hash,
             changed=True,  # caller compares with state.json for real change detection
             status_code=200,
-            bytes_downloaded=len(content),
+            bytes_downloaded=size,
         )
 
+    def _store(self, filepath: Path) -> tuple[str, Path]:
+        """Hash the download, then compress it if its format compresses well."""
+        file_hash = compute_hash(filepath)
+        if self.compression and should_compress(filepath):
+            filepath = compress_file(filepath, self.compression)
+        return file_hash, filepath
+
     async def download_all(self, merchants: list[MerchantConfig], ref_date: Optional[date] = None) -> list[DownloadResult]:
         tasks = [self.download(m, ref_date) for m in merchants]
         return await asyncio.gather(*tasks)
+
+
+def download_chain(merchant: MerchantConfig, demoted: Container[str] = frozenset()) -> list[DownloadConfig]:
+    """A merchant's downloads in the order to try them.
+
+    Cheapest format to parse first, then the preferred download, then config
+    order. Downloads whose URL is in ``demoted`` (failed recently) go last.
+    """
+    return sorted(
+        merchant.downloads,
+        key=lambda d: (d.url in demoted, FORMAT_COST.get(d.format, max(FORMAT_COST.values())), not d.preferred),
+    )
+
+
+def _declared_size(headers) -> Optional[int]:
+    """Content-Length of the body as we will store it, if the server sent one."""
+    length = headers.get("content-length", "")
+    if not length.isdigit() or headers.get("content-encoding", "identity") != "identity":
+        # An encoded body's length says nothing about the decoded file
+        return None
+    return int(length)
+
+
+def _client_kwargs() -> dict:
+    return {
+        "headers": {"User-Agent": BROWSER_UA},
+        "follow_redirects": True,
+        "timeout": 60.0,
+    }
+
+
+def _part_meta_path(part_path: Path) -> Path:
+    return part_path.with_suffix(".part.json")
+
+
+def _write_part_meta(part_path: Path, validator: Optional[str]):
+    meta_path = _part_meta_path(part_path)
+    if validator:
+        meta_path.write_text(json.dumps({"validator": validator}))
+    else:
+        meta_path.unlink(missing_ok=True)
+
+
+def _resumable_part(part_path: Path) -> tuple[int, Optional[str]]:
+    """Return (offset, validator) for a partial download we can safely continue.
+
+    Without an ETag/Last-Modified to send as If-Range we can't tell whether the
+    file changed underneath us, so such partials are restarted from zero.
+    """
+    meta_path = _part_meta_path(part_path)
+    if not part_path.exists() or not meta_path.exists():
+        return 0, None
+    try:
+        validator = json.loads(meta_path.read_text()).get("validator")
+    except (json.JSONDecodeError, OSError):
+        return 0, None
+    if not validator:
+        return 0, None
+    return part_path.stat().st_size, validator
+
+
+def _discard_part(part_path: Path):
+    part_path.unlink(missing_ok=True)
+    _part_meta_path(part_path).unlink(missing_ok=True)
+
+
+def _range_start(content_range: str) -> Optional[int]:
+    # "bytes 500-999/1000"
+    try:
+        return int(content_range.split()[1].split("-")[0])
+    except (IndexError, ValueError):
+        return None
@@ -0,0 +1,101 @@
+"""Fill vintage, format and colour from free-text wine names.
+
+Runs on whole columns with precompiled patterns and only ever fills fields the
+normalizer left empty, so a column_map value always wins over what the name
+suggests. With pyarrow installed the patterns run in RE2 over Arrow arrays
+(``pyarrow.compute.extract_regex``); otherwise ``Series.str.extract`` is used.
+The patterns avoid lookarounds so both engines accept them.
+"""
+from __future__ import annotations
+import numpy as np
+import pandas as pd
+from corkscrew.models import RecordBatch
+from corkscrew.typed import NAMED_FORMATS
+
+try:
+    import pyarrow as pa
+    import pyarrow.compute as pc
+except ImportError:
+    pa = None
+
+# Tokens must be delimited by these (or the ends of the name) on both sides
+_BEFORE = r"(?:^|[\s(,;])"
+_AFTER = r"(?:$|[\s),;.])"
+
+VINTAGE_PATTERN = rf"(?i){_BEFORE}(?P<value>19\d{{2}}|20\d{{2}}|N\.?V)\.?{_AFTER}"
+FORMAT_PATTERN = (
+    rf"(?i){_BEFORE}(?P<value>\d+(?:[.,]\d+)?\s?(?:ml|cl|ltr|l)|"
+    + "|".join(sorted(NAMED_FORMATS, key=len, reverse=True)).replace(" ", r"\s+")
+    + rf"){_AFTER}"
+)
+COLOR_PATTERN = (
+    rf"(?i){_BEFORE}(?P<value>red|rouge|rosso|tinto|rot|white|blanc|bianco|blanco|weiss|weiß|rosé|rose|rosato|rosado)"
+    rf"{_AFTER}"
+)
+COLORS = {
+    "red": "Red", "rouge": "Red", "rosso": "Red", "tinto": "Red", "rot": "Red",
+    "white": "White", "blanc": "White", "bianco": "White", "blanco": "White", "weiss": "White", "weiß": "White",
+    "rosé": "Rosé", "rose": "Rosé", "rosato": "Rosé", "rosado": "Rosé",
+}
+# Estates whose name contains a colour word that is not the wine's colour
+# (Cheval Blanc is red). Names like Haut-Brion Blanc really are white.
+COLOR_EXCEPTIONS = r"(?i)cheval blanc"
+
+
+def _extract(names: np.ndarray, pattern: str) -> pd.Series:
+    """The ``value`` group of ``pattern`` for each name, None where it does not match."""
+    if pa is not None:
+        matched = pc.struct_field(pc.extract_regex(pa.array(names, type=pa.string()), pattern), "value")
+        return pd.Series(matched.to_numpy(zero_copy_only=False), dtype=object)
+    found = pd.Series(names, dtype=object).str.extract(pattern, expand=False)
+    return found.where(found.notna(), None)
+
+
+def _contains(names: np.ndarray, pattern: str) -> np.ndarray:
+    if pa is not None:
+        return pc.match_substring_regex(pa.array(names, type=pa.string()), pattern).to_numpy(zero_copy_only=False)
+    return pd.Series(names, dtype=object).str.contains(pattern, regex=True).to_numpy(dtype=bool)
+
+
+def _vintage(found: pd.Series) -> pd.Series:
+    return found.where(found.str[0].str.isdigit(), "NV")
+
+
+def _format(found: pd.Series) -> pd.Series:
+    return found.str.replace(r"\s+", " ", regex=True)
+
+
+def _color(found: pd.Series) -> pd.Series:
+    return found.str.lower().map(COLORS)
+
+
+def extract_from_names(batch: RecordBatch) -> RecordBatch:
+    """Fill empty vintage, format and color fields from wine_name, in place."""
+    if not len(batch) or "wine_name" not in batch.columns:
+        return batch
+    # Price lists repeat names (one row per format or pack size), so match each
+    # distinct name once and broadcast back
+    codes, distinct = pd.factorize(np.asarray(batch.column("wine_name"), dtype=object))
+
+    for field, pattern, convert in (
+        ("vintage", VINTAGE_PATTERN, _vintage),
+        ("format", FORMAT_PATTERN, _format),
+        ("color", COLOR_PATTERN, _color),
+    ):
+        current = np.asarray(batch.column(field), dtype=object)
+        empty = current == ""
+        if not empty.any():
+            continue
+        found = _extract(distinct, pattern)
+        if field == "color":
+            found[_contains(distinct, COLOR_EXCEPTIONS)] = None
+        matched = found.notna().to_numpy()
+        # Matches are low-cardinality ("2010", "Magnum", "blanc"), so convert each once
+        match_codes, match_values = pd.factorize(found[matched].to_numpy())
+        found[matched] = convert(pd.Series(match_values, dtype=object)).to_numpy()[match_codes]
+        values = found.to_numpy()[codes]
+        fill = empty & matched[codes]
+        if fill.any():
+            current[fill] = values[fill]
+            batch.set_column(field, current.tolist())
+    return batch
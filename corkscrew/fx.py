@@ -0,0 +1,152 @@
+# corkscrew/fx.py
+"""Currencies: filling in each wine's currency, and converting prices to euros.
+
+Merchants often leave the currency out, or give it as a symbol. While
+normalizing, ``infer_currency`` turns the currency field into an ISO code,
+from the field itself, else from a symbol in the price ("£1,250"), else
+from the merchant's country.
+
+``merge`` then adds ``price_eur`` using a local, dated table of exchange
+rates (``data/fx_rates.csv``). The rows are ``date,currency,per_eur``, and
+``per_eur`` is how much of the currency one euro buys, as in the ECB's daily
+reference rates. A price converts at the newest rate on or before its
+download date. Dates before the table starts use its first rate. The table
+is read once per process, and each date's rates are worked out once.
+"""
+from __future__ import annotations
+import csv
+import functools
+import re
+from bisect import bisect_right
+from datetime import date
+from pathlib import Path
+from typing import Optional
+import pandas as pd
+from corkscrew.models import RecordBatch
+from corkscrew.typed import CURRENCY_EXPONENTS
+
+EURO_COUNTRIES = frozenset({
+    "AT", "BE", "CY", "DE", "EE", "ES", "FI", "FR", "GR", "HR", "IE", "IT", "LT", "LU", "LV", "MT", "NL", "PT",
+    "SI", "SK",
+})
+COUNTRY_CURRENCIES = {
+    **{country: "EUR" for country in EURO_COUNTRIES},
+    "UK": "GBP", "GB": "GBP", "CH": "CHF", "US": "USD", "CA": "CAD", "AU": "AUD", "NZ": "NZD",
+    "HK": "HKD", "SG": "SGD", "JP": "JPY", "SE": "SEK", "DK": "DKK", "NO": "NOK",
+}
+# Symbols and names as merchants write them; "$" and "kr" mean the local
+# dollar or krone and are resolved with the merchant's country
+CURRENCY_SYMBOLS = {
+    "£": "GBP", "STG": "GBP", "€": "EUR", "EURO": "EUR", "EUROS": "EUR",
+    "US$": "USD", "C$": "CAD", "CA$": "CAD", "A$": "AUD", "AU$": "AUD", "NZ$": "NZD", "HK$": "HKD", "S$": "SGD",
+    "SFR": "CHF", "FR.": "CHF", "¥": "JPY", "$": "$", "KR": "KR",
+}
+KNOWN_CURRENCIES = frozenset(COUNTRY_CURRENCIES.values())
+_DOLLARS = frozenset({"USD", "CAD", "AUD", "NZD", "HKD", "SGD"})
+_KRONER = frozenset({"SEK", "DKK", "NOK"})
+
+_TOKENS = {**{code: code for code in KNOWN_CURRENCIES}, **CURRENCY_SYMBOLS}
+_TOKEN_PATTERN = "|".join(
+    # Letter tokens must stand alone, so "EUR" isn't read out of "EUROPE"
+    rf"(?<![A-Z]){re.escape(t)}(?![A-Z])" if t[0].isalpha() else re.escape(t)
+    for t in sorted(_TOKENS, key=len, reverse=True)
+)
+
+
+def currency_codes(values, country_currency: str = "") -> pd.Series:
+    """ISO code named in each text ("£", "eur", "CHF 45"), or NaN if none is."""
+    text = pd.Series(values, dtype=object).fillna("").astype(str).str.upper()
+    unique = text.unique()
+    found = pd.Series(unique, dtype=object).str.extract(f"({_TOKEN_PATTERN})", expand=False).map(_TOKENS)
+    found = found.mask(found == "$", country_currency if country_currency in _DOLLARS else "USD")
+    found = found.mask(found == "KR", country_currency if country_currency in _KRONER else None)
+    return text.map(dict(zip(unique, found)))
+
+
+def infer_currency(batch: RecordBatch, country: str) -> RecordBatch:
+    """Fill ``currency`` with ISO codes; text naming no known currency is kept as it was."""
+    if not len(batch):
+        return batch
+    default = COUNTRY_CURRENCIES.get(country.upper(), "")
+    given = pd.Series(batch.column("currency"), dtype=object)
+    codes = currency_codes(given, default).fillna(given.where(given != ""))
+    missing = codes.isna()
+    if missing.any() and "price" in batch.columns:
+        prices = pd.Series(batch.columns["price"], dtype=object)[missing]
+        codes = codes.fillna(currency_codes(prices, default))
+    batch.set_column("currency", codes.fillna(default).tolist())
+    return batch
+
+
+class FxTable:
+    """Exchange rates as units of each currency per euro, by the date they took effect."""
+
+    def __init__(self, rates: Optional[dict[str, list[tuple[str, float]]]] = None):
+        self._rates = {c: sorted(history) for c, history in (rates or {}).items()}
+        self._dates = {c: [d for d, _ in history] for c, history in self._rates.items()}
+        self._on: dict[str, dict[str, float]] = {}
+
+    @classmethod
+    def from_csv(cls, path: Path) -> FxTable:
+        rates: dict[str, list[tuple[str, float]]] = {}
+        with open(path, newline="", encoding="utf-8") as f:
+            for line, row in enumerate(csv.DictReader(f), 2):
+                try:
+                    day = date.fromisoformat(row["date"].strip()).isoformat()
+                    per_eur = float(row["per_eur"])
+                    currency = row["currency"].strip().upper()
+                except (AttributeError, KeyError, ValueError) as e:
+                    raise ValueError(f"{path} line {line}: expected date,currency,per_eur ({e})")
+                if per_eur <= 0:
+                    raise ValueError(f"{path} line {line}: rate must be positive")
+                rates.setdefault(currency, []).append((day, per_eur))
+        return cls(rates)
+
+    def __bool__(self) -> bool:
+        return bool(self._rates)
+
+    def rates_on(self, day: str) -> dict[str, float]:
+        """The rate of every currency in effect on ``day`` (YYYY-MM-DD)."""
+        if day not in self._on:
+            rates = {"EUR": 1.0}
+            for currency, history in self._rates.items():
+                i = bisect_right(self._dates[currency], day)
+                rates[currency] = history[max(i - 1, 0)][1]
+            self._on[day] = rates
+        return self._on[day]
+
+    def to_eur(self, price_minor, currency, dates) -> pd.Series:
+        """Euro amounts of prices in minor units; NaN when there is no rate for the currency."""
+        minor = pd.Series(price_minor).astype("Float64")
+        currency = pd.Series(currency, dtype=object, index=minor.index).fillna("").astype(str).str.upper()
+        dates = pd.Series(dates, dtype=object, index=minor.index).fillna("").astype(str)
+        keys = dates + "|" + currency
+        lookup = {f"{d}|{c}": r for d in dates.unique() for c, r in self.rates_on(d).items()}
+        rate = keys.map(lookup).astype("Float64")
+        exponent = currency.map(CURRENCY_EXPONENTS).fillna(2)
+        return (minor / 10 ** exponent / rate).round(2)
+
+    def convert(self, amount_minor: Optional[int], currency: str, day: str) -> Optional[float]:
+        """One price in euros, as ``to_eur`` computes it for a column."""
+        rate = self.rates_on(day).get(currency.upper())
+        if amount_minor is None or rate is None:
+            return None
+        return round(amount_minor / 10 ** CURRENCY_EXPONENTS.get(currency.upper(), 2) / rate, 2)
+
+
+def load_fx_table(path: Path) -> FxTable:
+    """The table in ``path``, read once per process (and again if the file changes).
+
+    A missing file gives an empty table, which only converts euros. Raises
+    ValueError for a malformed file.
+    """
+    try:
+        mtime = path.stat().st_mtime_ns
+    except OSError:
+        return FxTable()
+    return _load_fx_table(str(path.resolve()), mtime)
+
+
+@functools.lru_cache(maxsize=4)
+def _load_fx_table(path: str, mtime_ns: int) -> FxTable:
+    return FxTable.from_csv(Path(path))
@@ -0,0 +1,84 @@
+# corkscrew/health.py
+"""Merchant health labels and the precomputed status summary.
+
+Runs write a small summary of every merchant's health to ``data/status.json``
+when they finish, and ``corkscrew status --json`` just prints it. This module
+only uses the standard library so that path never imports pandas, httpx or
+pydantic, and answers fast enough to poll every minute.
+"""
+from __future__ import annotations
+import json
+import os
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Iterable, Optional
+
+SUMMARY_VERSION = 1
+# A merchant is considered stale when its last N consecutive runs produced no
+# changed data; this threshold determines how many unchanged runs trigger STALE.
+STALE_RUN_THRESHOLD = 5
+# Consecutive failures at which a merchant is WARN, then CRITICAL
+WARN_FAILURES = 3
+CRITICAL_FAILURES = 7
+HEALTH_LABELS = ("PENDING", "OK", "STALE", "FAILED", "WARN", "CRITICAL")
+
+
+def merchant_health(state: dict) -> str:
+    """Health label for one merchant's state.json entry."""
+    if state.get("last_run") is None:
+        return "PENDING"
+    failures = state.get("consecutive_failures", 0)
+    if failures >= CRITICAL_FAILURES:
+        return "CRITICAL"
+    if failures >= WARN_FAILURES:
+        return "WARN"
+    if failures > 0:
+        return "FAILED"
+    if not state.get("changed") and len(state.get("history", [])) > STALE_RUN_THRESHOLD:
+        return "STALE"
+    return "OK"
+
+
+def build_summary(merchants: Iterable[tuple[str, str]], states: dict[str, dict]) -> dict:
+    """Summary of the (id, name) ``merchants`` from their state.json entries."""
+    counts = dict.fromkeys(HEALTH_LABELS, 0)
+    rows = {}
+    last_run = None
+    for merchant_id, name in merchants:
+        state = states.get(merchant_id) or {}
+        health = merchant_health(state)
+        counts[health] += 1
+        rows[merchant_id] = {
+            "name": name,
+            "status": health,
+            "last_run": state.get("last_run"),
+            "last_success": state.get("last_success"),
+            "failure_streak": state.get("consecutive_failures", 0),
+            "changed": bool(state.get("changed")),
+        }
+        if state.get("last_run") and (last_run is None or state["last_run"] > last_run):
+            last_run = state["last_run"]
+    return {
+        "version": SUMMARY_VERSION,
+        "generated_at": datetime.now(timezone.utc).isoformat(),
+        "last_run": last_run,
+        "total": len(rows),
+        "counts": counts,
+        "merchants": rows,
+    }
+
+
+def write_summary(path: Path, summary: dict):
+    """Replace the summary file in one step, so a reader never sees half of it."""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(f".{path.name}.tmp")
+    tmp.write_text(json.dumps(summary, indent=2))
+    os.replace(tmp, path)
+
+
+def read_summary(path: Path) -> Optional[dict]:
+    try:
+        summary = json.loads(path.read_text())
+    except (OSError, ValueError):
+        return None
+    return summary if isinstance(summary, dict) and summary.get("version") == SUMMARY_VERSION else None
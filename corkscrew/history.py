@@ -0,0 +1,194 @@
+# corkscrew/history.py
+"""Every normalized CSV in one SQLite database, for questions across merchants and dates.
+
+``data/history.db`` holds a ``wines`` table with one row per wine per
+snapshot (a merchant's CSV for one download date) and a ``snapshots`` table
+saying which CSVs were loaded. ``run``, ``normalize`` and ``serve`` load the
+CSVs they write as they go, and ``sync`` picks up any others by their
+size/mtime stamp, so loading stays incremental as history grows. It also
+drops snapshots whose CSV has been deleted.
+
+Indexes cover the usual questions (one merchant over time, one wine across
+merchants, one date) and the ``latest`` view holds each merchant's newest
+snapshot. ``wine_name`` compares case-insensitively, so ``LIKE 'dom%'``
+uses its index.
+"""
+from __future__ import annotations
+import csv
+import sqlite3
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Iterable, Optional
+from corkscrew.models import TYPED_FIELDS, WINE_FIELDS
+
+TEXT_COLUMNS = WINE_FIELDS
+INTEGER_COLUMNS = tuple(TYPED_FIELDS)
+COLUMNS = TEXT_COLUMNS + INTEGER_COLUMNS
+# Rows inserted per executemany call while loading a CSV
+INSERT_CHUNK = 10_000
+
+_SCHEMA = (
+    "CREATE TABLE IF NOT EXISTS snapshots ("
+    " merchant_id TEXT NOT NULL,"
+    " download_date TEXT NOT NULL,"
+    " file TEXT NOT NULL,"
+    " mtime_ns INTEGER NOT NULL,"
+    " size INTEGER NOT NULL,"
+    " records INTEGER NOT NULL,"
+    " loaded_at TEXT NOT NULL,"
+    " PRIMARY KEY (merchant_id, download_date))",
+    "CREATE TABLE IF NOT EXISTS wines ("
+    + ", ".join(
+        f"{c} TEXT COLLATE NOCASE" if c == "wine_name" else f"{c} TEXT" for c in TEXT_COLUMNS
+    )
+    + ", " + ", ".join(f"{c} INTEGER" for c in INTEGER_COLUMNS) + ")",
+    "CREATE INDEX IF NOT EXISTS wines_snapshot ON wines (merchant_id, download_date)",
+    "CREATE INDEX IF NOT EXISTS wines_name ON wines (wine_name, download_date)",
+    "CREATE INDEX IF NOT EXISTS wines_date ON wines (download_date)",
+    "CREATE INDEX IF NOT EXISTS wines_vintage ON wines (vintage_year)",
+    "CREATE VIEW IF NOT EXISTS latest AS"
+    " SELECT wines.* FROM wines JOIN"
+    " (SELECT merchant_id, MAX(download_date) AS download_date FROM snapshots GROUP BY merchant_id)"
+    " USING (merchant_id, download_date)",
+)
+
+
+class HistoryStore:
+    """The SQLite history database at ``db_path``.
+
+    Opened ``readonly`` (as ``corkscrew sql`` does) the database is never
+    written, so a query can't change it and can run while a run is loading.
+    """
+
+    def __init__(self, db_path: Path, readonly: bool = False):
+        self.db_path = db_path
+        if readonly:
+            self._conn = sqlite3.connect(f"file:{db_path}?mode=ro", uri=True, timeout=30)
+            return
+        db_path.parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(db_path, timeout=30, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        for statement in _SCHEMA:
+            self._conn.execute(statement)
+
+    def __enter__(self) -> HistoryStore:
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        self._conn.close()
+
+    def load(self, merchant_id: str, download_date: str, csv_path: Path) -> int:
+        """Replace one snapshot with the rows of ``csv_path``. Returns the row count."""
+        st = csv_path.stat()
+        self._conn.execute("BEGIN IMMEDIATE")
+        try:
+            self._conn.execute("DELETE FROM wines WHERE merchant_id = ? AND download_date = ?",
+                               (merchant_id, download_date))
+            records = 0
+            insert = f"INSERT INTO wines ({', '.join(COLUMNS)}) VALUES ({', '.join('?' * len(COLUMNS))})"
+            for chunk in _read_rows(csv_path, merchant_id, download_date):
+                self._conn.executemany(insert, chunk)
+                records += len(chunk)
+            self._conn.execute(
+                "INSERT OR REPLACE INTO snapshots VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (merchant_id, download_date, str(csv_path), st.st_mtime_ns, st.st_size, records,
+                 datetime.now(timezone.utc).isoformat()),
+            )
+            self._conn.execute("COMMIT")
+        except BaseException:
+            self._conn.execute("ROLLBACK")
+            raise
+        return records
+
+    def sync(self, normalized_root: Path) -> tuple[int, int, int]:
+        """Bring the database in line with the CSVs under ``normalized_root``.
+
+        Loads every CSV that is new or changed since it was loaded, and drops
+        snapshots whose CSV is gone. Returns (loaded, already current, removed).
+        """
+        changed, current, gone = self._compare(normalized_root)
+        for key, csv_path in changed:
+            self.load(*key, csv_path)
+        for key in gone:
+            self.remove(*key)
+        return len(changed), current, len(gone)
+
+    def behind(self, normalized_root: Path) -> bool:
+        """Whether ``sync`` would change anything."""
+        changed, _, gone = self._compare(normalized_root)
+        return bool(changed or gone)
+
+    def remove(self, merchant_id: str, download_date: str):
+        """Drop one snapshot and its rows."""
+        self._conn.execute("BEGIN IMMEDIATE")
+        try:
+            for table in ("wines", "snapshots"):
+                self._conn.execute(f"DELETE FROM {table} WHERE merchant_id = ? AND download_date = ?",
+                                   (merchant_id, download_date))
+            self._conn.execute("COMMIT")
+        except BaseException:
+            self._conn.execute("ROLLBACK")
+            raise
+
+    def _compare(self, normalized_root: Path) -> tuple[list, int, list]:
+        # ([(key, CSV to load)], number already current, [key of a snapshot whose CSV is gone])
+        known = {
+            (m, d): (mtime, size)
+            for m, d, mtime, size in self._conn.execute(
+                "SELECT merchant_id, download_date, mtime_ns, size FROM snapshots")
+        }
+        changed = []
+        current = 0
+        on_disk = set()
+        if normalized_root.is_dir():
+            for csv_path in sorted(normalized_root.glob("*/*.csv")):
+                key = (csv_path.parent.name, csv_path.stem)
+                on_disk.add(key)
+                st = csv_path.stat()
+                if known.get(key) == (st.st_mtime_ns, st.st_size):
+                    current += 1
+                else:
+                    changed.append((key, csv_path))
+        return changed, current, sorted(known.keys() - on_disk)
+
+    def query(self, sql: str, params: Iterable = ()) -> tuple[list[str], list[tuple]]:
+        """Run ``sql`` and return (column names, rows)."""
+        cursor = self._conn.execute(sql, tuple(params))
+        columns = [d[0] for d in cursor.description] if cursor.description else []
+        return columns, cursor.fetchall()
+
+
+def _read_rows(csv_path: Path, merchant_id: str, download_date: str) -> Iterable[list[tuple]]:
+    # CSVs written before a column existed simply leave it empty (NULL for integers)
+    with open(csv_path, newline="", encoding="utf-8") as f:
+        reader = csv.reader(f)
+        header = next(reader, None)
+        if header is None:
+            return
+        position = {name: i for i, name in enumerate(header)}
+        text_at = [position.get(c) for c in TEXT_COLUMNS]
+        int_at = [position.get(c) for c in INTEGER_COLUMNS]
+        constants = {
+            TEXT_COLUMNS.index("merchant_id"): merchant_id,
+            TEXT_COLUMNS.index("download_date"): download_date,
+        }
+        chunk: list[tuple] = []
+        for row in reader:
+            values = [row[i] if i is not None and i < len(row) else "" for i in text_at]
+            for i, value in constants.items():
+                values[i] = value
+            values += [_integer(row[i]) if i is not None and i < len(row) else None for i in int_at]
+            chunk.append(tuple(values))
+            if len(chunk) >= INSERT_CHUNK:
+                yield chunk
+                chunk = []
+        if chunk:
+            yield chunk
+
+
+def _integer(value: str) -> Optional[int]:
+    return int(value) if value else None
@@ -1,6 +1,7 @@
 # corkscrew/models.py
 from __future__ import annotations
-from typing import Optional, Literal
+import sys
+from typing import Iterable, Iterator, Optional, Literal, Union
 from pydantic import BaseModel, Field
 
 
@@ -26,6 +27,10 @@ class MerchantConfig(BaseModel):
     google_drive_id: Optional[str] = None
     hub_wine_slug: Optional[str] = None
     column_map: Optional[dict[str, str]] = None
+    json_path: Optional[str] = None
+    archive_members: Optional[list[str]] = None
+    # Workbook sheets to read: "all", a list of sheet names, or a regex (default: first sheet)
+    sheets: Optional[Union[str, list[str]]] = None
     notes: Optional[str] = None
 
     @property
@@ -35,6 +40,13 @@ class MerchantConfig(BaseModel):
                 return d
         return self.downloads[0]
 
+    def download_for(self, fmt: str) -> DownloadConfig:
+        """The download that yields ``fmt`` files (the preferred one if several do)."""
+        matching = [d for d in self.downloads if d.format == fmt]
+        if not matching:
+            return self.preferred_download
+        return next((d for d in matching if d.preferred), matching[0])
+
 
 class WineRecord(BaseModel):
     merchant_id: str
@@ -53,6 +65,7 @@ class WineRecord(BaseModel):
     score: str = ""
     scorer: str = ""
     condition_notes: str = ""
+    sheet: str = ""
     source_url: str
     download_date: str
 
@@ -60,6 +73,139 @@ class WineRecord(BaseModel):
         return self.model_dump()
 
 
+WINE_FIELDS: tuple[str, ...] = tuple(WineRecord.model_fields)
+# Fields that hold one value for a whole normalized file
+BATCH_CONSTANTS = ("merchant_id", "merchant_name", "source_url", "download_date")
+COLUMN_FIELDS = tuple(f for f in WINE_FIELDS if f not in BATCH_CONSTANTS)
+# Typed column → string field it is parsed from (see corkscrew.typed)
+TYPED_FIELDS = {
+    "price_minor": "price",
+    "vintage_year": "vintage",
+    "stock_int": "stock_quantity",
+    "case_size_int": "case_size",
+    "format_ml": "format",
+}
+# Low-cardinality columns; their values are interned so rows share one str object
+INTERNED_FIELDS = frozenset({"currency", "color", "format", "case_size", "scorer", "sheet"})
+
+
+class RecordBatch:
+    """Column-oriented WineRecords from one merchant file.
+
+    Per-file constants (merchant, source URL, download date) are stored once and
+    every other field as a list with one str per row; a field with no column is
+    empty for every row. Rows only become WineRecords or dicts at the edges
+    (indexing, iteration, ``to_rows``); ``to_frame`` builds a DataFrame straight
+    from the columns. ``typed`` holds parsed numeric columns (see
+    corkscrew.typed), written after the string fields.
+    """
+
+    __slots__ = ("merchant_id", "merchant_name", "source_url", "download_date", "columns", "typed", "_length")
+
+    def __init__(
+        self,
+        merchant_id: str,
+        merchant_name: str,
+        source_url: str,
+        download_date: str,
+        columns: Optional[dict[str, list[str]]] = None,
+        length: Optional[int] = None,
+    ):
+        columns = columns or {}
+        unknown = set(columns) - set(COLUMN_FIELDS)
+        if unknown:
+            raise ValueError(f"Unknown WineRecord column(s): {sorted(unknown)}")
+        lengths = {len(values) for values in columns.values()}
+        if length is None:
+            length = lengths.pop() if len(lengths) == 1 else 0
+        if lengths - {length}:
+            raise ValueError(f"Column lengths {sorted(lengths)} do not match batch length {length}")
+        self.merchant_id = sys.intern(merchant_id)
+        self.merchant_name = sys.intern(merchant_name)
+        self.source_url = sys.intern(source_url)
+        self.download_date = sys.intern(download_date)
+        self.columns: dict[str, list[str]] = {}
+        self.typed: dict = {}
+        self._length = length
+        for field, values in columns.items():
+            self.set_column(field, values)
+
+    @classmethod
+    def from_records(cls, records: Iterable[WineRecord]) -> RecordBatch:
+        records = list(records)
+        if not records:
+            raise ValueError("Cannot infer batch constants from no records")
+        first = records[0]
+        return cls(
+            first.merchant_id, first.merchant_name, first.source_url, first.download_date,
+            {field: [getattr(r, field) for r in records] for field in COLUMN_FIELDS},
+            length=len(records),
+        )
+
+    @classmethod
+    def concat(cls, batches: list[RecordBatch]) -> RecordBatch:
+        """Join batches end to end; constants come from the first batch."""
+        if not batches:
+            raise ValueError("Cannot infer batch constants from no batches")
+        first = batches[0]
+        fields = [f for f in COLUMN_FIELDS if any(f in b.columns for b in batches)]
+        columns = {}
+        for field in fields:
+            values: list[str] = []
+            for b in batches:
+                values += b.columns.get(field) or [""] * len(b)
+            columns[field] = values
+        return cls(
+            first.merchant_id, first.merchant_name, first.source_url, first.download_date,
+            columns, length=sum(len(b) for b in batches),
+        )
+
+    def __len__(self) -> int:
+        return self._length
+
+    def __getitem__(self, index: int) -> WineRecord:
+        if index < 0:
+            index += self._length
+        if not 0 <= index < self._length:
+            raise IndexError("RecordBatch index out of range")
+        return WineRecord(**self._row(index))
+
+    def __iter__(self) -> Iterator[WineRecord]:
+        for i in range(self._length):
+            yield WineRecord(**self._row(i))
+
+    def column(self, field: str) -> list[str]:
+        if field in BATCH_CONSTANTS:
+            return [getattr(self, field)] * self._length
+        if field not in WINE_FIELDS:
+            raise KeyError(field)
+        return self.columns.get(field) or [""] * self._length
+
+    def set_column(self, field: str, values: list[str]):
+        if field not in COLUMN_FIELDS:
+            raise ValueError(f"Unknown WineRecord column: {field}")
+        if len(values) != self._length:
+            raise ValueError(f"Column length {len(values)} does not match batch length {self._length}")
+        self.columns[field] = [sys.intern(v) for v in values] if field in INTERNED_FIELDS else list(values)
+
+    def _row(self, index: int) -> dict:
+        return {
+            field: getattr(self, field) if field in BATCH_CONSTANTS
+            else (self.columns[field][index] if field in self.columns else "")
+            for field in WINE_FIELDS
+        }
+
+    def to_rows(self) -> list[dict]:
+        return [self._row(i) for i in range(self._length)]
+
+    def to_frame(self):
+        import pandas as pd
+        df = pd.DataFrame({field: self.column(field) for field in WINE_FIELDS}, columns=list(WINE_FIELDS))
+        for name, values in self.typed.items():
+            df[name] = pd.array(values, dtype="Int64")
+        return df
+
+
 class DownloadResult(BaseModel):
     merchant_id: str
     filepath: Optional[str] = None
@@ -68,6 +214,7 @@ class DownloadResult(BaseModel):
     status_code: int
     bytes_downloaded: int
     error: Optional[str] = None
+    elapsed_seconds: float = 0.0
 
     @property
     def success(self) -> bool:
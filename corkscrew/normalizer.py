@@ -1,119 +1,488 @@
 # corkscrew/normalizer.py
 """Normalizer registry and per-format base normalizers for wine inventory data."""
 from __future__ import annotations
+import csv
+import hashlib
+import io
+import json
 import logging
+import os
+import re
+import zipfile
+from concurrent.futures import ThreadPoolExecutor
 from decimal import Decimal, InvalidOperation
-from pathlib import Path
+from fnmatch import fnmatch
+from itertools import islice
+from pathlib import Path, PurePosixPath
+from typing import IO, Iterable, Iterator, Union
 import chardet
+import ijson
 import pandas as pd
-from corkscrew.models import MerchantConfig, WineRecord
+from corkscrew.compression import RawFile, readable
+from corkscrew.extract import extract_from_names
+from corkscrew.fx import infer_currency
+from corkscrew.models import MerchantConfig, RecordBatch
+from corkscrew.typed import DECIMAL_COMMA_COUNTRIES, typed_columns
+from corkscrew.xlsx_reader import XLSXReader
 
 logger = logging.getLogger(__name__)
 
+# Bump whenever a change here (or in extract/typed/fx) alters normalized output,
+# so 'corkscrew normalize' knows existing CSVs need rebuilding.
+NORMALIZER_VERSION = 3
+# MerchantConfig fields the normalized output depends on
+NORMALIZER_FIELDS = frozenset({"id", "name", "country", "column_map", "json_path", "archive_members", "sheets"})
+# Items mapped per step when normalizing record lists (JSON)
+ITEM_BATCH_SIZE = 10_000
+# Upper bounds on archive members / workbook sheets parsed at once
+ARCHIVE_WORKERS = min(8, os.cpu_count() or 1)
+SHEET_WORKERS = ARCHIVE_WORKERS
+
 
 class NormalizationError(Exception):
     pass
 
 
+def normalizer_version(merchant: MerchantConfig) -> str:
+    """NORMALIZER_VERSION plus a digest of the merchant's normalization settings.
+
+    Editing a merchant's column_map (say) changes this just like a code change.
+    """
+    settings = json.dumps(merchant.model_dump(include=NORMALIZER_FIELDS), sort_keys=True)
+    return f"{NORMALIZER_VERSION}:{hashlib.sha1(settings.encode()).hexdigest()[:12]}"
+
+
 class BaseNormalizer:
-    def normalize(self, filepath: Path, merchant: MerchantConfig, download_date: str) -> list[WineRecord]:
+    # Source column → WineRecord field map used when the merchant's config has
+    # no column_map. A default map is a best guess at a layout, so columns it
+    # names may be absent; a configured column_map must match the file exactly.
+    DEFAULT_COLUMN_MAP: dict[str, str] = {}
+
+    def normalize(self, filepath: Path, merchant: MerchantConfig, download_date: str) -> RecordBatch:
         raise NotImplementedError
 
-    def _map_row(self, row: dict, column_map: dict[str, str], merchant: MerchantConfig, download_date: str) -> WineRecord:
-        kwargs: dict = {
-            "merchant_id": merchant.id,
-            "merchant_name": merchant.name,
-            "wine_name": "",
-            "source_url": merchant.preferred_download.url,
-            "download_date": download_date,
-        }
-        for src_col, dest_field in column_map.items():
-            val = row.get(src_col, "")
-            if val is None or (isinstance(val, float) and pd.isna(val)):
-                val = ""
-            str_val = str(val).strip()
-            # Normalise decimal numeric strings to strip trailing zeros from prices like
-            # "4500.00" -> "4500". Using Decimal.normalize() avoids float precision loss
-            # and scientific notation issues (e.g. float("0.000001") -> "1e-06").
-            if "." in str_val:
-                try:
-                    str_val = format(Decimal(str_val).normalize(), "f")
-                except InvalidOperation:
-                    pass
-            kwargs[dest_field] = str_val
-        return WineRecord(**kwargs)
+    def _column_map(self, merchant: MerchantConfig) -> tuple[dict[str, str], bool]:
+        """Return (column_map, strict) for this merchant."""
+        if merchant.column_map:
+            return merchant.column_map, True
+        return self.DEFAULT_COLUMN_MAP, False
+
+    def _project(self, available: list[str], merchant: MerchantConfig, filepath: Path) -> tuple[dict[str, str], list]:
+        """Check the header against the column map and pick the columns to read.
+
+        Returns the column map restricted to columns present in the file, and
+        the columns the reader should materialize. With no column map at all we
+        still read one column so the row count is preserved.
+        """
+        column_map, strict = self._column_map(merchant)
+        missing = [c for c in column_map if c not in available]
+        if missing and strict:
+            raise NormalizationError(
+                f"{filepath.name}: column_map column(s) {missing} not found for {merchant.id}; "
+                f"file has {available}"
+            )
+        present = {src: dest for src, dest in column_map.items() if src in available}
+        usecols = list(present) or available[:1]
+        return present, usecols
+
+    def _batch(self, merchant: MerchantConfig, download_date: str, columns: dict[str, list[str]], length: int) -> RecordBatch:
+        return RecordBatch(
+            merchant.id, merchant.name, merchant.preferred_download.url, download_date,
+            columns, length=length,
+        )
+
+    def _map_frame(self, df: pd.DataFrame, column_map: dict[str, str], merchant: MerchantConfig, download_date: str) -> RecordBatch:
+        decimals = _uses_decimal_point(merchant)
+        columns = {dest: _clean_column(df[src], decimals) for src, dest in column_map.items()}
+        return self._batch(merchant, download_date, columns, len(df))
+
+    def _map_items(self, items: Iterable[dict], column_map: dict[str, str], merchant: MerchantConfig, download_date: str) -> RecordBatch:
+        """Map dict items into columns, ITEM_BATCH_SIZE at a time.
+
+        ``items`` may be a generator; only one batch of raw items is alive at
+        once, so streamed input is never held in full.
+        """
+        decimals = _uses_decimal_point(merchant)
+        columns: dict[str, list[str]] = {dest: [] for dest in column_map.values()}
+        length = 0
+        items = iter(items)
+        while batch := list(islice(items, ITEM_BATCH_SIZE)):
+            for src, dest in column_map.items():
+                columns[dest] += [_clean_value(item.get(src, ""), decimals) for item in batch]
+            length += len(batch)
+        return self._batch(merchant, download_date, columns, length)
+
+def _uses_decimal_point(merchant: MerchantConfig) -> bool:
+    # In "1.250,00" locales a dot is a thousands separator, so "1.250" must not
+    # be trimmed to "1.25"
+    return merchant.country.upper() not in DECIMAL_COMMA_COUNTRIES
+
+
+def _normalize_decimal(value: str) -> str:
+    # Normalise decimal numeric strings to strip trailing zeros from prices like
+    # "4500.00" -> "4500". Using Decimal.normalize() avoids float precision loss
+    # and scientific notation issues (e.g. float("0.000001") -> "1e-06").
+    try:
+        return format(Decimal(value).normalize(), "f")
+    except InvalidOperation:
+        return value
+
+
+def _clean_value(val, normalize_decimals: bool = True) -> str:
+    if isinstance(val, str):
+        str_val = val.strip()
+    elif val is None or (isinstance(val, float) and pd.isna(val)):
+        return ""
+    elif isinstance(val, Decimal):
+        # Streamed JSON numbers arrive as Decimal; keep "1E+3" out of the output
+        str_val = format(val, "f")
+    else:
+        str_val = str(val).strip()
+    return _normalize_decimal(str_val) if normalize_decimals and "." in str_val else str_val
+
+
+def _clean_column(series: pd.Series, normalize_decimals: bool = True) -> list[str]:
+    values = series.astype(object).where(series.notna(), "").astype(str).str.strip()
+    if not normalize_decimals:
+        return values.tolist()
+    has_dot = values.str.contains(".", regex=False)
+    if has_dot.any():
+        values[has_dot] = values[has_dot].map(_normalize_decimal)
+    return values.tolist()
 
 
 class CSVNormalizer(BaseNormalizer):
-    def normalize(self, filepath: Path, merchant: MerchantConfig, download_date: str) -> list[WineRecord]:
+    SEPARATOR = ","
+
+    def normalize(self, filepath: Path, merchant: MerchantConfig, download_date: str) -> RecordBatch:
         raw = filepath.read_bytes()
         detected = chardet.detect(raw)
         encoding = detected.get("encoding") or "utf-8"
+        options = self._read_options(raw, encoding)
         try:
-            df = pd.read_csv(filepath, encoding=encoding, dtype=str)
+            header = pd.read_csv(io.BytesIO(raw), encoding=encoding, dtype=str, nrows=0, **options).columns.tolist()
         except Exception as e:
             raise NormalizationError(f"CSV read failed for {filepath}: {e}")
-        df = df.fillna("")
-        column_map = merchant.column_map or {}
-        return [self._map_row(row, column_map, merchant, download_date) for _, row in df.iterrows()]
+        column_map, usecols = self._project(header, merchant, filepath)
+        try:
+            df = pd.read_csv(io.BytesIO(raw), encoding=encoding, dtype=str, usecols=usecols, **options)
+        except Exception as e:
+            raise NormalizationError(f"CSV read failed for {filepath}: {e}")
+        return self._map_frame(df, column_map, merchant, download_date)
+
+    def _read_options(self, raw: bytes, encoding: str) -> dict:
+        return {"sep": self.SEPARATOR}
+
+
+class TXTNormalizer(CSVNormalizer):
+    """Text lists: delimited by tab, semicolon, comma or pipe, or one wine per line."""
+
+    # Only real delimiters; left to itself the sniffer picks letters out of a one-column list
+    DELIMITERS = "\t;,|"
+    SNIFF_BYTES = 64 * 1024
+
+    def _read_options(self, raw: bytes, encoding: str) -> dict:
+        sample = raw[:self.SNIFF_BYTES].decode(encoding, errors="ignore")
+        try:
+            return {"sep": csv.Sniffer().sniff(sample, delimiters=self.DELIMITERS).delimiter}
+        except csv.Error:
+            # No delimiter: every line is one value, quotes and all
+            return {"sep": "\x1f", "quoting": csv.QUOTE_NONE}
 
 
 class XLSXNormalizer(BaseNormalizer):
-    def normalize(self, filepath: Path, merchant: MerchantConfig, download_date: str) -> list[WineRecord]:
+    """Reads the merchant's chosen sheets (``sheets`` in merchants.yaml).
+
+    The workbook is opened once; with several sheets, .xlsx sheets are parsed
+    concurrently. Each record carries its sheet name in ``sheet``.
+    """
+
+    def normalize(self, filepath: Path, merchant: MerchantConfig, download_date: str) -> RecordBatch:
+        if filepath.suffix.lower() == ".xls":
+            frames = self._read_xls(filepath, merchant)
+        else:
+            frames = self._read_xlsx(filepath, merchant)
+        batches = []
+        for sheet, df, column_map in frames:
+            batch = self._map_frame(df, column_map, merchant, download_date)
+            batch.set_column("sheet", [sheet] * len(batch))
+            batches.append(batch)
+        return RecordBatch.concat(batches)
+
+    def _read_xls(self, filepath: Path, merchant: MerchantConfig) -> list[tuple[str, pd.DataFrame, dict[str, str]]]:
+        try:
+            book = pd.ExcelFile(_seekable(filepath), engine="xlrd")
+        except Exception as e:
+            raise NormalizationError(f"Excel read failed for {filepath}: {e}")
+        frames = []
+        with book:
+            # xlrd parses the whole workbook on open, so per-sheet work is cheap
+            for sheet in _select_sheets(book.sheet_names, merchant, filepath):
+                try:
+                    header = book.parse(sheet, dtype=str, nrows=0).columns.tolist()
+                    column_map, usecols = self._project(header, merchant, filepath)
+                    frames.append((sheet, book.parse(sheet, dtype=str, usecols=usecols), column_map))
+                except NormalizationError:
+                    raise
+                except Exception as e:
+                    raise NormalizationError(f"Excel read failed for {filepath} sheet {sheet!r}: {e}")
+        return frames
+
+    def _read_xlsx(self, filepath: Path, merchant: MerchantConfig) -> list[tuple[str, pd.DataFrame, dict[str, str]]]:
         try:
-            engine = "xlrd" if filepath.suffix.lower() == ".xls" else "openpyxl"
-            df = pd.read_excel(filepath, dtype=str, engine=engine)
+            with XLSXReader(_seekable(filepath)) as reader:
+                sheets = _select_sheets(reader.sheet_names, merchant, filepath)
+                if len(sheets) == 1:
+                    return [self._read_sheet(reader, sheets[0], merchant, filepath)]
+                with ThreadPoolExecutor(max_workers=min(len(sheets), SHEET_WORKERS)) as pool:
+                    return list(pool.map(lambda sheet: self._read_sheet(reader, sheet, merchant, filepath), sheets))
+        except NormalizationError:
+            raise
         except Exception as e:
             raise NormalizationError(f"Excel read failed for {filepath}: {e}")
-        df = df.fillna("")
-        column_map = merchant.column_map or {}
-        return [self._map_row(row, column_map, merchant, download_date) for _, row in df.iterrows()]
+
+    def _read_sheet(self, reader: XLSXReader, sheet: str, merchant: MerchantConfig, filepath: Path) -> tuple[str, pd.DataFrame, dict[str, str]]:
+        # Only the mapped columns are decoded; see corkscrew.xlsx_reader
+        rows = reader.iter_rows(sheet)
+        header_row = next(rows, {})
+        rows.close()
+        width = max(header_row, default=-1) + 1
+        header = [str(header_row[i]) if i in header_row else f"Unnamed: {i}" for i in range(width)]
+        column_map, usecols = self._project(header, merchant, filepath)
+        indices = [header.index(c) for c in usecols]
+        data = []
+        rows = reader.iter_filled_rows(sheet, columns=set(indices))
+        next(rows, None)  # header
+        # Blank rows are skipped, judged on the whole row so the count doesn't
+        # depend on which columns are mapped
+        for row, filled in rows:
+            if filled:
+                data.append([str(row[i]) if i in row else None for i in indices])
+        return sheet, pd.DataFrame(data, columns=usecols, dtype=object), column_map
+
+
+def _select_sheets(names: list[str], merchant: MerchantConfig, filepath: Path) -> list[str]:
+    """Sheets named by the merchant's ``sheets`` setting, in workbook order."""
+    wanted = merchant.sheets
+    if not names:
+        raise NormalizationError(f"{filepath.name}: workbook has no sheets")
+    if wanted is None:
+        return names[:1]
+    if wanted == "all":
+        return names
+    if isinstance(wanted, list):
+        missing = [name for name in wanted if name not in names]
+        if missing:
+            raise NormalizationError(f"{filepath.name}: sheet(s) {missing} not found for {merchant.id}; workbook has {names}")
+        return [name for name in names if name in wanted]
+    try:
+        pattern = re.compile(wanted)
+    except re.error as e:
+        raise NormalizationError(f"Invalid sheets pattern {wanted!r} for {merchant.id}: {e}")
+    selected = [name for name in names if pattern.search(name)]
+    if not selected:
+        raise NormalizationError(f"{filepath.name}: no sheet matches {wanted!r} for {merchant.id}; workbook has {names}")
+    return selected
 
 
 class JSONNormalizer(BaseNormalizer):
-    def normalize(self, filepath: Path, merchant: MerchantConfig, download_date: str) -> list[WineRecord]:
-        import json
+    """Streams records out of a JSON document without loading it.
+
+    The records are the array at the merchant's ``json_path`` (dot-separated
+    keys, e.g. ``data.products``). Without one, a top-level array is used, or
+    else the first list-valued key of the top-level object. Finding that key
+    takes an extra pass over the file, so large payloads should set
+    ``json_path``.
+    """
+
+    def normalize(self, filepath: Path, merchant: MerchantConfig, download_date: str) -> RecordBatch:
+        path = _json_path(merchant.json_path) if merchant.json_path else self._find_list_path(filepath)
+        column_map, _ = self._column_map(merchant)
+        batch = self._map_items(self._iter_items(filepath, path), column_map, merchant, download_date)
+        if not len(batch) and merchant.json_path and not self._has_list(filepath, path):
+            raise NormalizationError(f"JSON path {merchant.json_path!r} is not a list in {filepath.name}")
+        return batch
+
+    def _iter_items(self, filepath: Path, path: str) -> Iterator[dict]:
+        prefix = f"{path}.item" if path else "item"
+        with _open_json(filepath) as f:
+            try:
+                for item in ijson.items(f, prefix):
+                    if isinstance(item, dict):
+                        yield item
+            except ijson.JSONError as e:
+                raise NormalizationError(f"JSON read failed: {e}")
+
+    def _find_list_path(self, filepath: Path) -> str:
+        """Top-level scan for the array to read: '' for a top-level list, else the first list key."""
+        list_keys = []
+        with _open_json(filepath) as f:
+            try:
+                events = ijson.basic_parse(f)
+                first, _ = next(events, (None, None))
+                if first == "start_array":
+                    return ""
+                if first != "start_map":
+                    raise NormalizationError("JSON does not contain a list of records")
+                depth, key = 1, None
+                for event, value in events:
+                    if depth == 1 and event == "map_key":
+                        key = value
+                    elif event in ("start_map", "start_array"):
+                        if depth == 1 and event == "start_array":
+                            list_keys.append(key)
+                        depth += 1
+                    elif event in ("end_map", "end_array"):
+                        depth -= 1
+            except ijson.JSONError as e:
+                raise NormalizationError(f"JSON read failed: {e}")
+        if not list_keys:
+            raise NormalizationError("JSON dict contains no list-valued keys")
+        if len(list_keys) > 1:
+            logger.warning(
+                "JSONNormalizer: multiple list keys found %s, using first: %r",
+                list_keys, list_keys[0]
+            )
+        else:
+            logger.debug("JSONNormalizer: using key %r", list_keys[0])
+        return list_keys[0]
+
+    def _has_list(self, filepath: Path, path: str) -> bool:
+        with _open_json(filepath) as f:
+            try:
+                return any(p == path and event == "start_array" for p, event, _ in ijson.parse(f))
+            except ijson.JSONError:
+                return False
+
+
+def _json_path(path: str) -> str:
+    """Merchant json_path → ijson prefix of the array ('$.data.items' and 'data.items' both work)."""
+    return path.strip().removeprefix("$").strip(".")
+
+
+def _open_json(filepath: Path):
+    f = filepath.open("rb")
+    # ijson rejects a UTF-8 byte order mark. Reopen rather than seek back:
+    # decompressing streams can't rewind.
+    if f.read(3) != b"\xef\xbb\xbf":
+        f.close()
+        f = filepath.open("rb")
+    return f
+
+
+class ArchiveMember:
+    """One file inside a zip archive, readable like a Path without extracting it.
+
+    Offers the slice of the Path API the format normalizers use (``name``,
+    ``suffix``, ``open``, ``read_bytes``). Each ``open`` has its own handle on
+    the archive, so members can be read from several threads at once.
+    """
+
+    def __init__(self, archive: Path, member: str):
+        self.archive = archive
+        self.member = member
+        self.name = PurePosixPath(member).name
+        self.suffix = PurePosixPath(member).suffix
+
+    def open(self, mode: str = "rb") -> IO[bytes]:
+        if mode != "rb":
+            raise ValueError("Archive members are read-only binary files")
+        with zipfile.ZipFile(self.archive) as zf:
+            # The member stream keeps the archive file open after the ZipFile closes
+            return zf.open(self.member)
+
+    def read_bytes(self) -> bytes:
+        with zipfile.ZipFile(self.archive) as zf:
+            return zf.read(self.member)
+
+    def __str__(self) -> str:
+        return f"{self.archive}!{self.member}"
+
+
+class ArchiveNormalizer(BaseNormalizer):
+    """Normalizes the price lists inside a zip archive.
+
+    Members are picked by the merchant's ``archive_members`` globs (default:
+    every member with a known extension), handed to the normalizer for their
+    extension without touching disk, and parsed in parallel. Records keep
+    archive order.
+    """
+
+    def normalize(self, filepath: Path, merchant: MerchantConfig, download_date: str) -> RecordBatch:
         try:
-            data = json.loads(filepath.read_text())
-        except Exception as e:
-            raise NormalizationError(f"JSON read failed: {e}")
-        if isinstance(data, dict):
-            list_keys = [k for k, v in data.items() if isinstance(v, list)]
-            if not list_keys:
-                raise NormalizationError("JSON dict contains no list-valued keys")
-            if len(list_keys) > 1:
-                logger.warning(
-                    "JSONNormalizer: multiple list keys found %s, using first: %r",
-                    list_keys, list_keys[0]
-                )
-            else:
-                logger.debug("JSONNormalizer: using key %r", list_keys[0])
-            data = data[list_keys[0]]
-        if not isinstance(data, list):
-            raise NormalizationError("JSON does not contain a list of records")
-        column_map = merchant.column_map or {}
-        return [self._map_row(item, column_map, merchant, download_date) for item in data if isinstance(item, dict)]
+            with zipfile.ZipFile(filepath) as zf:
+                names = [info.filename for info in zf.infolist() if not info.is_dir()]
+        except (zipfile.BadZipFile, OSError) as e:
+            raise NormalizationError(f"ZIP read failed for {filepath}: {e}")
+        members = self._select(names, merchant, filepath)
+        if len(members) == 1:
+            batches = [self._normalize_member(filepath, members[0], merchant, download_date)]
+        else:
+            with ThreadPoolExecutor(max_workers=min(len(members), ARCHIVE_WORKERS)) as pool:
+                batches = list(pool.map(
+                    lambda name: self._normalize_member(filepath, name, merchant, download_date), members
+                ))
+        return RecordBatch.concat(batches)
+
+    def _select(self, names: list[str], merchant: MerchantConfig, filepath: Path) -> list[str]:
+        patterns = merchant.archive_members
+        if patterns:
+            members = [n for n in names if any(fnmatch(n, p) for p in patterns)]
+            unsupported = [n for n in members if _member_normalizer(n) is None]
+            if unsupported:
+                raise NormalizationError(f"{filepath.name}: no normalizer for archive member(s) {unsupported}")
+        else:
+            # Skip macOS resource forks and other hidden files
+            members = [
+                n for n in names
+                if _member_normalizer(n) is not None
+                and not any(part.startswith((".", "__MACOSX")) for part in PurePosixPath(n).parts)
+            ]
+        if not members:
+            wanted = f" matching {patterns}" if patterns else ""
+            raise NormalizationError(f"{filepath.name}: no members{wanted} to normalize; archive has {names}")
+        return members
+
+    def _normalize_member(self, filepath: Path, name: str, merchant: MerchantConfig, download_date: str) -> RecordBatch:
+        logger.debug("ArchiveNormalizer: %s member %r", merchant.id, name)
+        return _member_normalizer(name)().normalize(ArchiveMember(filepath, name), merchant, download_date)
+
+
+def _member_normalizer(name: str) -> type[BaseNormalizer] | None:
+    cls = NormalizerRegistry.FORMAT_MAP.get(PurePosixPath(name).suffix.lower())
+    # Archives inside archives are not unpacked
+    return None if cls is ArchiveNormalizer else cls
+
+
+def _seekable(filepath: Union[Path, ArchiveMember, RawFile]) -> Union[Path, IO[bytes]]:
+    # Excel readers seek all over the file; a zip member or compressed file
+    # can only seek by decompressing again, so those are read into memory
+    return filepath if isinstance(filepath, Path) else io.BytesIO(filepath.read_bytes())
 
 
 class PDFNormalizer(BaseNormalizer):
-    def normalize(self, filepath: Path, merchant: MerchantConfig, download_date: str) -> list[WineRecord]:
+    def normalize(self, filepath: Path, merchant: MerchantConfig, download_date: str) -> RecordBatch:
         logger.warning(
             "PDF normalization not implemented for %s (%s). "
             "File downloaded and hashed but not normalized.",
             merchant.id, filepath.name
         )
-        return []
+        return self._batch(merchant, download_date, {}, 0)
 
 
 class NormalizerRegistry:
     FORMAT_MAP = {
         ".csv": CSVNormalizer,
+        ".txt": TXTNormalizer,
         ".xlsx": XLSXNormalizer,
         ".xlsm": XLSXNormalizer,
         ".xls": XLSXNormalizer,
         ".json": JSONNormalizer,
         ".pdf": PDFNormalizer,
+        ".zip": ArchiveNormalizer,
     }
+    # Applied in order to every batch, whichever normalizer produced it
+    POST_PROCESSORS = (extract_from_names,)
 
     @property
     def _merchant_map(self) -> dict[str, type[BaseNormalizer]]:
@@ -123,12 +492,23 @@ class NormalizerRegistry:
         except ImportError:
             return {}
 
-    def normalize(self, filepath: Path, merchant: MerchantConfig, download_date: str) -> list[WineRecord]:
+    def normalize(self, filepath: Path, merchant: MerchantConfig, download_date: str) -> RecordBatch:
+        # Compressed raw files are read through a decompressor (corkscrew.compression)
+        filepath = readable(filepath)
         merchant_map = self._merchant_map
         if merchant.id in merchant_map:
-            return merchant_map[merchant.id]().normalize(filepath, merchant, download_date)
-        ext = filepath.suffix.lower()
-        cls = self.FORMAT_MAP.get(ext)
-        if cls is None:
-            raise NormalizationError(f"No normalizer for extension '{ext}'")
-        return cls().normalize(filepath, merchant, download_date)
+            cls = merchant_map[merchant.id]
+        else:
+            ext = filepath.suffix.lower()
+            cls = self.FORMAT_MAP.get(ext)
+            if cls is None:
+                raise NormalizationError(f"No normalizer for extension '{ext}'")
+        batch = cls().normalize(filepath, merchant, download_date)
+        # The file may come from a fallback download rather than the preferred one
+        batch.source_url = merchant.download_for(filepath.suffix.lower().lstrip(".")).url
+        for step in self.POST_PROCESSORS:
+            batch = step(batch)
+        # Before the typed columns: a currency's minor unit decides price_minor
+        batch = infer_currency(batch, merchant.country)
+        batch.typed = typed_columns(batch, merchant.country)
+        return batch
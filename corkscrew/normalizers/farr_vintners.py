@@ -1,5 +1,3 @@
-import copy
-
 from corkscrew.normalizer import CSVNormalizer
 
 class FarrVintnersNormalizer(CSVNormalizer):
@@ -18,11 +16,3 @@ class FarrVintnersNormalizer(CSVNormalizer):
         "Scorer": "scorer",
         "Condition": "condition_notes",
     }
-
-    def normalize(self, filepath, merchant, download_date):
-        # Use config column_map if provided, otherwise fall back to default
-        if not merchant.column_map:
-            patched = copy.copy(merchant)
-            object.__setattr__(patched, "column_map", self.DEFAULT_COLUMN_MAP)
-            return super().normalize(filepath, patched, download_date)
-        return super().normalize(filepath, merchant, download_date)
@@ -1,5 +1,3 @@
-import copy
-
 from corkscrew.normalizer import XLSXNormalizer
 
 class HubWineNormalizer(XLSXNormalizer):
@@ -15,10 +13,3 @@ class HubWineNormalizer(XLSXNormalizer):
         "Stock": "stock_quantity",
         "Case Size": "case_size",
     }
-
-    def normalize(self, filepath, merchant, download_date):
-        if not merchant.column_map:
-            patched = copy.copy(merchant)
-            object.__setattr__(patched, "column_map", self.DEFAULT_COLUMN_MAP)
-            return super().normalize(filepath, patched, download_date)
-        return super().normalize(filepath, merchant, download_date)
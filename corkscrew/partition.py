@@ -0,0 +1,155 @@
+# corkscrew/partition.py
+"""The master file split into one CSV per country and merchant, with a catalog.
+
+``merge --partitioned`` writes hive-style directories::
+
+    partitioned/country=FR/merchant_id=lavinia/part-0.csv
+    partitioned/_catalog.json
+
+As in hive, the partition values live in the folder names (and the catalog),
+not in the files. The catalog lists every partition with its row count, price
+range and currencies, so a consumer can pick the files it needs with
+``select_partitions`` without opening any of them. Tools that understand hive
+partitioning (pyarrow, DuckDB, Spark) can read the directory as one dataset.
+"""
+from __future__ import annotations
+import json
+import os
+import secrets
+import shutil
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Iterable, Optional
+from urllib.parse import quote
+import pandas as pd
+
+CATALOG_NAME = "_catalog.json"
+CATALOG_VERSION = 1
+PARTITION_COLUMNS = ("country", "merchant_id")
+
+
+def partition_dir(country: str, merchant_id: str) -> Path:
+    return Path(f"country={quote(country, safe='')}") / f"merchant_id={quote(merchant_id, safe='')}"
+
+
+class PartitionWriter:
+    """Writes partitions into a new version of the dataset that ``commit`` publishes.
+
+    Versions live in ``.<name>.d/`` next to ``out_dir``, and ``out_dir`` is a
+    symlink to the current one, replaced in a single ``os.replace``. A reader
+    opening ``out_dir`` gets the old dataset or the new one, never a mix or
+    nothing. To keep one version throughout, a reader resolves ``out_dir``
+    first. The previous version is kept for readers still working through
+    it, and older ones are deleted. Partitions of merchants dropped from the
+    config disappear with their version.
+
+    Where symlinks can't be made (Windows without developer mode) ``out_dir``
+    is a plain directory, replaced by two renames, so for a moment it doesn't
+    exist.
+    """
+
+    def __init__(self, out_dir: Path):
+        self.out_dir = out_dir
+        self._versions = out_dir.with_name(f".{out_dir.name}.d")
+        version = f"{datetime.now(timezone.utc).strftime('%Y%m%dT%H%M%SZ')}-{secrets.token_hex(3)}"
+        self._tmp = self._versions / version
+        self._tmp.mkdir(parents=True)
+        self.partitions: list[dict] = []
+
+    def write(self, country: str, merchant_id: str, df: pd.DataFrame) -> dict:
+        rel = partition_dir(country, merchant_id) / "part-0.csv"
+        path = self._tmp / rel
+        path.parent.mkdir(parents=True, exist_ok=True)
+        df.drop(columns=[c for c in PARTITION_COLUMNS if c in df.columns]).to_csv(path, index=False)
+        prices = df["price_minor"].dropna() if "price_minor" in df.columns else pd.Series(dtype="Int64")
+        currencies = df["currency"].dropna() if "currency" in df.columns else pd.Series(dtype=str)
+        dates = df["download_date"].dropna() if "download_date" in df.columns else pd.Series(dtype=str)
+        entry = {
+            "path": rel.as_posix(),
+            "country": country,
+            "merchant_id": merchant_id,
+            "rows": len(df),
+            "min_price_minor": int(prices.min()) if len(prices) else None,
+            "max_price_minor": int(prices.max()) if len(prices) else None,
+            "currencies": sorted(c for c in currencies.unique() if c),
+            "download_date": dates.max() if len(dates) else None,
+        }
+        self.partitions.append(entry)
+        return entry
+
+    def commit(self) -> dict:
+        catalog = {
+            "version": CATALOG_VERSION,
+            "generated_at": datetime.now(timezone.utc).isoformat(),
+            "partition_by": list(PARTITION_COLUMNS),
+            "rows": sum(p["rows"] for p in self.partitions),
+            "partitions": sorted(self.partitions, key=lambda p: p["path"]),
+        }
+        (self._tmp / CATALOG_NAME).write_text(json.dumps(catalog, indent=2))
+        link = self.out_dir.with_name(f".{self.out_dir.name}.link")
+        link.unlink(missing_ok=True)
+        try:
+            os.symlink(Path(self._versions.name) / self._tmp.name, link, target_is_directory=True)
+        except OSError:
+            self._swap_directories()
+            return catalog
+        previous = Path(os.readlink(self.out_dir)).name if self.out_dir.is_symlink() else None
+        if self.out_dir.exists() and not self.out_dir.is_symlink():
+            # A plain directory from before versions were kept; swapped the old way, once
+            self._swap_directories(link)
+        else:
+            os.replace(link, self.out_dir)
+        for version in self._versions.iterdir():
+            if version.name not in (self._tmp.name, previous):
+                shutil.rmtree(version, ignore_errors=True)
+        return catalog
+
+    def _swap_directories(self, link: Optional[Path] = None):
+        old = self.out_dir.with_name(f".{self.out_dir.name}.old")
+        shutil.rmtree(old, ignore_errors=True)
+        if self.out_dir.exists():
+            self.out_dir.rename(old)
+        if link is not None:
+            os.replace(link, self.out_dir)
+        else:
+            self._tmp.rename(self.out_dir)
+            shutil.rmtree(self._versions, ignore_errors=True)
+        shutil.rmtree(old, ignore_errors=True)
+
+    def abort(self):
+        shutil.rmtree(self._tmp, ignore_errors=True)
+
+
+def read_catalog(out_dir: Path) -> dict:
+    catalog = json.loads((out_dir / CATALOG_NAME).read_text())
+    if catalog.get("version") != CATALOG_VERSION:
+        raise ValueError(f"Unsupported catalog version {catalog.get('version')} in {out_dir}")
+    return catalog
+
+
+def select_partitions(
+    catalog: dict,
+    countries: Optional[Iterable[str]] = None,
+    merchant_ids: Optional[Iterable[str]] = None,
+    min_price_minor: Optional[int] = None,
+    max_price_minor: Optional[int] = None,
+) -> list[dict]:
+    """Catalog entries that can hold rows matching every given filter.
+
+    A price filter keeps partitions whose price range overlaps it; partitions
+    with no readable prices are dropped by it.
+    """
+    countries = {c.upper() for c in countries} if countries is not None else None
+    merchant_ids = set(merchant_ids) if merchant_ids is not None else None
+    selected = []
+    for p in catalog["partitions"]:
+        if countries is not None and p["country"].upper() not in countries:
+            continue
+        if merchant_ids is not None and p["merchant_id"] not in merchant_ids:
+            continue
+        if min_price_minor is not None and (p["max_price_minor"] is None or p["max_price_minor"] < min_price_minor):
+            continue
+        if max_price_minor is not None and (p["min_price_minor"] is None or p["min_price_minor"] > max_price_minor):
+            continue
+        selected.append(p)
+    return selected
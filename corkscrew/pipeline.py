@@ -0,0 +1,297 @@
+"""Async run pipeline: download, state and normalize stages joined by bounded queues."""
+from __future__ import annotations
+import asyncio
+from concurrent.futures import Executor, ThreadPoolExecutor
+from dataclasses import dataclass
+from datetime import date
+from pathlib import Path
+from typing import Callable, Optional
+from corkscrew.checkpoint import RunJournal
+from corkscrew.models import DownloadResult, MerchantConfig, RecordBatch
+from corkscrew.normalizer import NormalizerRegistry, NormalizationError, normalizer_version
+from corkscrew.precheck import largest_first, size_anomaly
+from corkscrew.profiling import Profiler
+from corkscrew.quality import assess, quarantine_path, write_report
+from corkscrew.storage import NormalizeManifest, StorageManager
+
+QUEUE_SIZE = 8
+NORMALIZE_WORKERS = 4
+
+_DONE = object()
+
+
+@dataclass
+class MerchantOutcome:
+    merchant: MerchantConfig
+    result: DownloadResult
+    changed: bool = False
+    records: int = 0
+    norm_error: Optional[str] = None
+    out_path: Optional[Path] = None
+    resumed: bool = False
+    # Set when the download's size looks wrong against the merchant's history
+    warning: Optional[str] = None
+    # Why the normalized snapshot was quarantined (written to quarantine_path, not out_path)
+    quarantine: Optional[list[str]] = None
+    quarantine_path: Optional[Path] = None
+
+    @property
+    def success(self) -> bool:
+        return self.result.success
+
+
+def write_records_csv(records: RecordBatch, out_path: Path) -> Path:
+    out_path.parent.mkdir(parents=True, exist_ok=True)
+    records.to_frame().to_csv(out_path, index=False)
+    return out_path
+
+
+def write_checked(records: RecordBatch, out_path: Path, quarantined: Path, reasons: list[str],
+                  current: dict, previous: Optional[dict]) -> Path:
+    """Write the snapshot to ``out_path``, or to ``quarantined`` with a report if there are ``reasons``."""
+    if reasons:
+        write_records_csv(records, quarantined)
+        write_report(quarantined, reasons, current, previous)
+        return quarantined
+    write_records_csv(records, out_path)
+    # An earlier run of the same day may have quarantined this date
+    quarantined.unlink(missing_ok=True)
+    quarantined.with_suffix(".json").unlink(missing_ok=True)
+    return out_path
+
+
+class RunPipeline:
+    """Streams merchants through download → hash/state → normalize.
+
+    Each stage runs as its own set of tasks and hands work to the next through a
+    bounded ``asyncio.Queue``, so downloads pause when post-processing falls
+    behind and a slow merchant never holds up the others. Normalization is
+    CPU-bound and runs on ``executor``.
+
+    With ``sizes`` (expected bytes by merchant id, see corkscrew.precheck) the
+    largest downloads are started first.
+
+    Every normalized snapshot is checked against the merchant's last accepted
+    one (corkscrew.quality); one that looks broken is quarantined instead of
+    written to ``normalized_root``.
+
+    With a ``journal`` every completed stage is checkpointed, and merchants the
+    journal already has as finished are skipped, so re-running with the same
+    journal picks up where an interrupted run stopped.
+    """
+
+    def __init__(
+        self,
+        downloader,
+        storage: StorageManager,
+        registry: NormalizerRegistry,
+        normalized_root: Path,
+        *,
+        download_workers: int = 10,
+        normalize_workers: int = NORMALIZE_WORKERS,
+        queue_size: int = QUEUE_SIZE,
+        executor: Optional[Executor] = None,
+        on_outcome: Optional[Callable[[MerchantOutcome], None]] = None,
+        ref_date: Optional[date] = None,
+        journal: Optional[RunJournal] = None,
+        profiler: Optional[Profiler] = None,
+        sizes: Optional[dict[str, int]] = None,
+    ):
+        self.downloader = downloader
+        self.storage = storage
+        self.registry = registry
+        self.normalized_root = normalized_root
+        self.manifest = NormalizeManifest(normalized_root)
+        self.download_workers = download_workers
+        self.normalize_workers = normalize_workers
+        self.queue_size = queue_size
+        self.executor = executor
+        self.on_outcome = on_outcome
+        self.journal = journal
+        self.profiler = profiler
+        self.sizes = sizes
+        self.ref_date = ref_date or (journal.ref_date if journal else None)
+
+    async def run(self, merchants: list[MerchantConfig]) -> list[MerchantOutcome]:
+        outcomes: list[MerchantOutcome] = []
+        pending: asyncio.Queue = asyncio.Queue()
+        for m in largest_first(merchants, self.sizes) if self.sizes else merchants:
+            if self.journal and self.journal.is_finished(m.id):
+                outcomes.append(self._restore_outcome(m))
+            else:
+                pending.put_nowait(m)
+        hashed: asyncio.Queue = asyncio.Queue(maxsize=self.queue_size)
+        to_normalize: asyncio.Queue = asyncio.Queue(maxsize=self.queue_size)
+
+        own_executor = self.executor is None
+        executor = self.executor or ThreadPoolExecutor(max_workers=self.normalize_workers)
+        try:
+            # A stage that fails would leave the others blocked on its queue
+            # forever; the task group cancels them instead
+            async with asyncio.TaskGroup() as stages:
+                download_count = max(1, min(self.download_workers, pending.qsize()))
+                download_tasks = [
+                    stages.create_task(self._download_stage(pending, hashed))
+                    for _ in range(download_count)
+                ]
+                state_task = stages.create_task(self._state_stage(hashed, to_normalize, outcomes))
+                for _ in range(self.normalize_workers):
+                    stages.create_task(self._normalize_stage(to_normalize, outcomes, executor))
+                stages.create_task(self._close_stages(download_tasks, state_task, hashed, to_normalize))
+        except ExceptionGroup as failed:
+            # Raise the stage's own error, as it would be without the group
+            raise failed.exceptions[0]
+        finally:
+            if own_executor:
+                executor.shutdown(wait=True)
+        return outcomes
+
+    async def _close_stages(self, download_tasks: list[asyncio.Task], state_task: asyncio.Task,
+                            hashed: asyncio.Queue, to_normalize: asyncio.Queue):
+        """Tell each stage its input is finished once the stage before it has drained."""
+        await asyncio.gather(*download_tasks)
+        await hashed.put(_DONE)
+        await state_task
+        for _ in range(self.normalize_workers):
+            await to_normalize.put(_DONE)
+
+    async def _download_stage(self, pending: asyncio.Queue, hashed: asyncio.Queue):
+        while True:
+            try:
+                merchant = pending.get_nowait()
+            except asyncio.QueueEmpty:
+                return
+            prior = self.journal.completed(merchant.id).get("download") if self.journal else None
+            if prior is not None:
+                # Downloaded and recorded before the interruption; reuse the file
+                await hashed.put((merchant, DownloadResult(**prior["result"]), prior))
+                continue
+            try:
+                result = await self.downloader.download(merchant, self.ref_date)
+            except Exception as e:
+                result = DownloadResult(
+                    merchant_id=merchant.id, status_code=0, bytes_downloaded=0,
+                    changed=False, error=str(e) or type(e).__name__,
+                )
+            if self.profiler is not None:
+                self.profiler.record(merchant.id, "download", result.elapsed_seconds)
+            await hashed.put((merchant, result, None))
+
+    async def _state_stage(self, hashed: asyncio.Queue, to_normalize: asyncio.Queue, outcomes: list):
+        # Single consumer: StorageManager rewrites state.json on every update and
+        # is not safe to call concurrently.
+        while True:
+            item = await hashed.get()
+            if item is _DONE:
+                return
+            merchant, result, prior = item
+            outcome = MerchantOutcome(merchant=merchant, result=result)
+            if prior is not None:
+                outcome.changed = prior["changed"]
+                outcome.warning = prior.get("warning")
+                outcome.resumed = True
+                await to_normalize.put(outcome)
+                continue
+            if not result.success:
+                await asyncio.to_thread(self.storage.record_failure, merchant.id, result.error or "Unknown error")
+                self._checkpoint(merchant.id, "download", result=result.model_dump(), changed=False,
+                                 error=result.error)
+                self._emit(outcome, outcomes)
+                continue
+
+            outcome.changed = self.storage.is_changed(merchant.id, result.file_hash)
+            # Judged against history before this download joins it
+            outcome.warning = size_anomaly(self.storage.get_merchant_state(merchant.id), result.bytes_downloaded)
+            await asyncio.to_thread(
+                self.storage.record_success,
+                merchant.id,
+                hash_val=result.file_hash,
+                filepath=result.filepath,
+                changed=outcome.changed,
+                bytes_downloaded=result.bytes_downloaded,
+                seconds=result.elapsed_seconds,
+            )
+            self._checkpoint(merchant.id, "download", result=result.model_dump(), changed=outcome.changed,
+                             warning=outcome.warning)
+            if outcome.changed:
+                await to_normalize.put(outcome)
+            else:
+                self._emit(outcome, outcomes)
+
+    async def _normalize_stage(self, to_normalize: asyncio.Queue, outcomes: list, executor: Executor):
+        loop = asyncio.get_running_loop()
+        run_date = (self.ref_date or date.today()).isoformat()
+        while True:
+            outcome = await to_normalize.get()
+            if outcome is _DONE:
+                return
+            merchant_id = outcome.merchant.id
+            out_path = self.normalized_root / merchant_id / f"{run_date}.csv"
+            quarantined = quarantine_path(self.normalized_root, merchant_id, run_date)
+            normalize, check, write = self.registry.normalize, assess, write_checked
+            if self.profiler is not None:
+                normalize = self.profiler.wrap(merchant_id, "normalize", normalize)
+                check = self.profiler.wrap(merchant_id, "quality", check)
+                write = self.profiler.wrap(merchant_id, "write", write)
+            try:
+                records = await loop.run_in_executor(
+                    executor, normalize,
+                    Path(outcome.result.filepath), outcome.merchant, run_date,
+                )
+                outcome.records = len(records)
+                self._checkpoint(merchant_id, "normalize", records=outcome.records)
+                quality = None
+                if records:
+                    previous = self.manifest.baseline(merchant_id, run_date)
+                    quality, reasons = await loop.run_in_executor(executor, check, records, previous)
+                    written = await loop.run_in_executor(
+                        executor, write, records, out_path, quarantined, reasons, quality, previous,
+                    )
+                    if reasons:
+                        outcome.quarantine, outcome.quarantine_path = reasons, written
+                        self._checkpoint(merchant_id, "write", out_path=None, quarantine=reasons,
+                                         quarantine_path=str(written))
+                    else:
+                        outcome.out_path = written
+                        self._checkpoint(merchant_id, "write", out_path=str(written))
+                # Lets 'corkscrew normalize' skip this download until the normalizer changes
+                await asyncio.to_thread(
+                    self.manifest.record, merchant_id, run_date, Path(outcome.result.filepath),
+                    outcome.result.file_hash, normalizer_version(outcome.merchant), outcome.records,
+                    profile=quality, quarantine=outcome.quarantine,
+                )
+            except NormalizationError as e:
+                outcome.norm_error = str(e)
+            except Exception as e:
+                # Don't let one broken file take down the whole worker
+                outcome.norm_error = f"{type(e).__name__}: {e}"
+            if outcome.norm_error:
+                self._checkpoint(merchant_id, "normalize", records=0, error=outcome.norm_error)
+            self._emit(outcome, outcomes)
+
+    def _checkpoint(self, merchant_id: str, stage: str, **data):
+        if self.journal is not None:
+            self.journal.record(merchant_id, stage, **data)
+
+    def _restore_outcome(self, merchant: MerchantConfig) -> MerchantOutcome:
+        done = self.journal.completed(merchant.id)
+        download = done["download"]
+        normalize = done.get("normalize", {})
+        write = done.get("write")
+        return MerchantOutcome(
+            merchant=merchant,
+            result=DownloadResult(**download["result"]),
+            changed=download.get("changed", False),
+            records=normalize.get("records", 0),
+            norm_error=normalize.get("error"),
+            warning=download.get("warning"),
+            out_path=Path(write["out_path"]) if write and write.get("out_path") else None,
+            quarantine=write.get("quarantine") if write else None,
+            quarantine_path=Path(write["quarantine_path"]) if write and write.get("quarantine_path") else None,
+            resumed=True,
+        )
+
+    def _emit(self, outcome: MerchantOutcome, outcomes: list):
+        outcomes.append(outcome)
+        if self.on_outcome is not None:
+            self.on_outcome(outcome)
@@ -0,0 +1,59 @@
+# corkscrew/precheck.py
+"""Expected download sizes: largest-first scheduling and size sanity checks.
+
+A merchant's expected size is what its server reported for a HEAD request
+(``Downloader.precheck``, with ``run --precheck``) or else the median size of
+its recent downloads. Starting the biggest files first keeps one large file
+from starting last and running on alone after everything else has finished.
+
+After a download its size is checked against history, so a file suspiciously
+smaller or larger than usual (an error page served with 200, a half-empty
+export) is flagged before it is parsed. Truncation against the size the server
+announced is caught by the downloader itself.
+"""
+from __future__ import annotations
+from statistics import median
+from typing import Iterable, Optional
+from corkscrew.models import MerchantConfig, MerchantState
+from corkscrew.storage import StorageManager
+
+# A download is flagged when it is this many times smaller or larger than usual
+ANOMALY_RATIO = 5
+# Successful downloads with a recorded size needed before sizes are judged
+MIN_SIZE_SAMPLES = 3
+
+
+def recent_sizes(state: MerchantState) -> list[int]:
+    return [h["bytes"] for h in state.history if h.get("status") == "success" and h.get("bytes")]
+
+
+def history_sizes(merchants: Iterable[MerchantConfig], storage: StorageManager) -> dict[str, int]:
+    """Median recent download size of each merchant that has one on record."""
+    sizes = {}
+    for m in merchants:
+        recent = recent_sizes(storage.get_merchant_state(m.id))
+        if recent:
+            sizes[m.id] = int(median(recent))
+    return sizes
+
+
+def largest_first(merchants: list[MerchantConfig], sizes: dict[str, int]) -> list[MerchantConfig]:
+    """Merchants by expected size, largest first; unknown sizes keep their order at the end."""
+    return sorted(merchants, key=lambda m: -sizes.get(m.id, -1))
+
+
+def size_anomaly(state: MerchantState, size: int) -> Optional[str]:
+    """Why ``size`` looks wrong for this merchant, or None if it looks normal."""
+    recent = recent_sizes(state)
+    if len(recent) < MIN_SIZE_SAMPLES or size <= 0:
+        return None
+    typical = median(recent)
+    if size * ANOMALY_RATIO < typical:
+        return f"File is much smaller than usual ({_kb(size)} vs typically {_kb(typical)})"
+    if size > typical * ANOMALY_RATIO:
+        return f"File is much larger than usual ({_kb(size)} vs typically {_kb(typical)})"
+    return None
+
+
+def _kb(size: float) -> str:
+    return f"{size / 1024:,.0f} KB"
@@ -0,0 +1,157 @@
+# corkscrew/profiling.py
+"""Per-merchant cProfile and tracemalloc measurements for ``--profile`` runs.
+
+Each profiled stage call (hash, normalize, quality, write) runs under its own
+``cProfile.Profile`` with the tracemalloc peak reset just before it. Calls
+are serialized so the profile and the memory peak belong to one merchant
+only. That costs little, because the stages are GIL-bound anyway.
+Downloads are network waits in the event loop, so they are recorded as wall
+time from ``DownloadResult.elapsed_seconds``.
+
+``Profiler.write`` leaves in the profile directory:
+
+    <merchant_id>.prof   pstats dump of all that merchant's stages
+                         (``python -m pstats``, snakeviz, ...)
+    summary.txt          hottest functions across the run, merchants by
+                         peak memory, slowest merchant stages
+    summary.json         the same numbers, machine-readable
+"""
+from __future__ import annotations
+import cProfile
+import io
+import json
+import pstats
+import re
+import threading
+import time
+import tracemalloc
+from pathlib import Path
+from typing import Callable, Optional, TypeVar
+
+T = TypeVar("T")
+TOP_FUNCTIONS = 30
+TOP_MERCHANTS = 20
+
+
+class Profiler:
+    def __init__(self, out_dir: Path, memory: bool = True):
+        self.out_dir = out_dir
+        self.memory = memory
+        self.stages: dict[str, dict[str, dict]] = {}
+        self._profiles: dict[str, list[cProfile.Profile]] = {}
+        self._lock = threading.Lock()
+        self._started_tracing = False
+
+    def __enter__(self) -> Profiler:
+        if self.memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self._started_tracing = True
+        return self
+
+    def __exit__(self, *exc):
+        if self._started_tracing:
+            tracemalloc.stop()
+            self._started_tracing = False
+
+    def call(self, merchant_id: str, stage: str, fn: Callable[..., T], *args) -> T:
+        """Run ``fn(*args)`` as ``stage`` of ``merchant_id``, recording time, profile and peak memory."""
+        with self._lock:
+            tracing = self.memory and tracemalloc.is_tracing()
+            if tracing:
+                tracemalloc.reset_peak()
+                base, _ = tracemalloc.get_traced_memory()
+            profile = cProfile.Profile()
+            start = time.perf_counter()
+            profile.enable()
+            try:
+                return fn(*args)
+            finally:
+                profile.disable()
+                entry = {"seconds": round(time.perf_counter() - start, 4)}
+                if tracing:
+                    entry["peak_bytes"] = max(0, tracemalloc.get_traced_memory()[1] - base)
+                self.stages.setdefault(merchant_id, {})[stage] = entry
+                self._profiles.setdefault(merchant_id, []).append(profile)
+
+    def wrap(self, merchant_id: str, stage: str, fn: Callable[..., T]) -> Callable[..., T]:
+        return lambda *args: self.call(merchant_id, stage, fn, *args)
+
+    def record(self, merchant_id: str, stage: str, seconds: float):
+        """Record a stage measured elsewhere (wall time only)."""
+        with self._lock:
+            self.stages.setdefault(merchant_id, {})[stage] = {"seconds": round(seconds, 4)}
+
+    def write(self) -> Path:
+        """Write per-merchant profiles and the summaries; return the summary path."""
+        self.out_dir.mkdir(parents=True, exist_ok=True)
+        combined: Optional[pstats.Stats] = None
+        for merchant_id, profiles in self._profiles.items():
+            stats = pstats.Stats(*profiles)
+            stats.dump_stats(self.out_dir / f"{_safe_name(merchant_id)}.prof")
+            if combined is None:
+                combined = pstats.Stats(*profiles)
+            else:
+                combined.add(*profiles)
+
+        summary = {
+            "functions": _hottest(combined) if combined else [],
+            "memory": self._by_memory(),
+            "slowest": self._slowest(),
+            "merchants": self.stages,
+        }
+        (self.out_dir / "summary.json").write_text(json.dumps(summary, indent=2))
+        path = self.out_dir / "summary.txt"
+        path.write_text(_render(summary))
+        return path
+
+    def _by_memory(self) -> list[dict]:
+        rows = [
+            {"merchant_id": m, "stage": stage, "peak_bytes": entry["peak_bytes"]}
+            for m, stages in self.stages.items()
+            for stage, entry in stages.items() if "peak_bytes" in entry
+        ]
+        rows.sort(key=lambda r: r["peak_bytes"], reverse=True)
+        return rows[:TOP_MERCHANTS]
+
+    def _slowest(self) -> list[dict]:
+        rows = [
+            {"merchant_id": m, "stage": stage, "seconds": entry["seconds"]}
+            for m, stages in self.stages.items() for stage, entry in stages.items()
+        ]
+        rows.sort(key=lambda r: r["seconds"], reverse=True)
+        return rows[:TOP_MERCHANTS]
+
+
+def _hottest(stats: pstats.Stats) -> list[dict]:
+    """Functions ranked by own (not cumulative) time across every profiled call."""
+    rows = []
+    for (filename, line, name), (_, ncalls, tottime, cumtime, _) in stats.stats.items():
+        rows.append({
+            "function": f"{filename}:{line}({name})",
+            "calls": ncalls,
+            "tottime": round(tottime, 4),
+            "cumtime": round(cumtime, 4),
+        })
+    rows.sort(key=lambda r: r["tottime"], reverse=True)
+    return rows[:TOP_FUNCTIONS]
+
+
+def _render(summary: dict) -> str:
+    out = io.StringIO()
+    out.write("Hottest functions (own time, all merchants)\n")
+    out.write(f"{'tottime s':>10} {'cumtime s':>10} {'calls':>10}  function\n")
+    for r in summary["functions"]:
+        out.write(f"{r['tottime']:>10.3f} {r['cumtime']:>10.3f} {r['calls']:>10}  {r['function']}\n")
+    out.write("\nHighest peak memory (traced Python allocations)\n")
+    out.write(f"{'peak MB':>10}  {'stage':<10} merchant\n")
+    for r in summary["memory"]:
+        out.write(f"{r['peak_bytes'] / 1e6:>10.1f}  {r['stage']:<10} {r['merchant_id']}\n")
+    out.write("\nSlowest merchant stages\n")
+    out.write(f"{'seconds':>10}  {'stage':<10} merchant\n")
+    for r in summary["slowest"]:
+        out.write(f"{r['seconds']:>10.3f}  {r['stage']:<10} {r['merchant_id']}\n")
+    return out.getvalue()
+
+
+def _safe_name(merchant_id: str) -> str:
+    return re.sub(r"[^A-Za-z0-9._-]", "_", merchant_id)
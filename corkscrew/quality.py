@@ -0,0 +1,90 @@
+# corkscrew/quality.py
+"""Data-quality checks of a normalized snapshot against the merchant's previous one.
+
+A broken normalizer or a changed merchant layout still produces a CSV, just a
+wrong one: every price empty, prices 100x off, vintages that no longer parse.
+``profile`` sums a batch up in a few columnar passes (null rate per field, row
+count, price quartiles, share of unreadable vintages) and ``check`` compares
+that with the profile of the last snapshot that was accepted. A snapshot
+that breaches a threshold is quarantined (written to ``data/quarantine/``
+instead of ``data/normalized/``) until it is accepted with
+``corkscrew normalize --accept``.
+
+Profiles are kept in the normalize manifest, so checking needs no previous
+CSV to be read back.
+"""
+from __future__ import annotations
+import json
+from pathlib import Path
+from typing import Optional
+import pandas as pd
+from corkscrew.models import RecordBatch
+from corkscrew.typed import is_non_vintage
+
+# Snapshots smaller than this (now or last time) are too noisy to judge on rates
+MIN_ROWS = 20
+# Quarantine when, compared with the previous accepted snapshot:
+ROW_DROP = 0.5  # more than this share of rows disappeared
+NULL_RATE_RISE = 0.3  # a field became empty for this much more of the rows
+PRICE_SHIFT = 5.0  # the median price moved by more than this factor either way
+BAD_VINTAGE_RISE = 0.2  # this much more of the vintages could not be read
+
+
+def quarantine_path(normalized_root: Path, merchant_id: str, run_date: str) -> Path:
+    return normalized_root.parent / "quarantine" / merchant_id / f"{run_date}.csv"
+
+
+def profile(batch: RecordBatch) -> dict:
+    rows = len(batch)
+    null_rates = {
+        field: round(values.count("") / rows, 4) if rows else 0.0
+        for field, values in batch.columns.items()
+    }
+    prices = batch.typed.get("price_minor")
+    prices = prices.dropna() if prices is not None else None
+    quartiles = prices.quantile([0.25, 0.5, 0.75]).tolist() if prices is not None and len(prices) else None
+    bad_vintage = 0.0
+    if "vintage" in batch.columns and "vintage_year" in batch.typed:
+        text = batch.columns["vintage"]
+        given = pd.Series(text, dtype=object) != ""
+        unreadable = given & batch.typed["vintage_year"].isna().to_numpy() & ~is_non_vintage(text)
+        bad_vintage = round(unreadable.sum() / given.sum(), 4) if given.any() else 0.0
+    return {"rows": rows, "null_rates": null_rates, "price_quartiles": quartiles,
+            "bad_vintage_share": float(bad_vintage)}
+
+
+def check(current: dict, previous: Optional[dict]) -> list[str]:
+    """Why ``current`` looks broken next to ``previous``; empty when it looks fine."""
+    if previous is None or previous["rows"] < MIN_ROWS:
+        return []
+    reasons = []
+    if current["rows"] < previous["rows"] * (1 - ROW_DROP):
+        reasons.append(f"Row count fell from {previous['rows']:,} to {current['rows']:,}")
+    if current["rows"] < MIN_ROWS:
+        return reasons
+    for field, before in previous["null_rates"].items():
+        # A field whose column disappeared is empty for every row
+        rate = current["null_rates"].get(field, 1.0)
+        if rate - before > NULL_RATE_RISE:
+            reasons.append(f"{field} is empty for {rate:.0%} of rows (was {before:.0%})")
+    now, then = current["price_quartiles"], previous["price_quartiles"]
+    if now and then and now[1] > 0 and then[1] > 0:
+        ratio = now[1] / then[1]
+        if ratio > PRICE_SHIFT or ratio < 1 / PRICE_SHIFT:
+            reasons.append(f"Median price moved {ratio:.3g}x ({then[1] / 100:,.2f} → {now[1] / 100:,.2f})")
+    rise = current["bad_vintage_share"] - previous["bad_vintage_share"]
+    if rise > BAD_VINTAGE_RISE:
+        reasons.append(f"{current['bad_vintage_share']:.0%} of vintages could not be read "
+                       f"(was {previous['bad_vintage_share']:.0%})")
+    return reasons
+
+
+def assess(batch: RecordBatch, previous: Optional[dict]) -> tuple[dict, list[str]]:
+    current = profile(batch)
+    return current, check(current, previous)
+
+
+def write_report(path: Path, reasons: list[str], current: dict, previous: Optional[dict]):
+    """The reasons for a quarantine, next to the quarantined CSV."""
+    path.with_suffix(".json").write_text(json.dumps(
+        {"reasons": reasons, "profile": current, "previous": previous}, indent=2))
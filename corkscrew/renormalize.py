@@ -0,0 +1,214 @@
+# corkscrew/renormalize.py
+"""Re-normalize the raw download archive without downloading anything.
+
+Downloads live in ``data/raw/<merchant>/<YYYY-MM-DD>/``. ``scan_raw`` picks
+the ones to rebuild, ``plan`` drops those the normalize manifest says are
+already current, and ``run_jobs`` normalizes the rest in a process pool.
+
+A CSV is current when it was built by the same normalizer version from the
+same raw bytes. The raw file's size/mtime stamp is checked first; only when
+that moved (the file was compacted, say) is the file hashed, in the worker.
+
+Rebuilt snapshots go through the same quality checks as a run's, against the
+baseline the manifest had when the jobs were planned; ``accept`` writes
+quarantined ones to the normalized directory after all.
+"""
+from __future__ import annotations
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import date
+from pathlib import Path
+from typing import Iterable, Iterator, NamedTuple, Optional
+from corkscrew.models import MerchantConfig
+from corkscrew.normalizer import NormalizationError, NormalizerRegistry, normalizer_version
+from corkscrew.pipeline import write_checked
+from corkscrew.profiling import Profiler
+from corkscrew.quality import assess, quarantine_path
+from corkscrew.storage import NormalizeManifest, compute_hash
+
+
+class RawDownload(NamedTuple):
+    merchant_id: str
+    run_date: str
+    path: Path
+
+    @classmethod
+    def from_path(cls, merchant_id: str, path: Path) -> RawDownload:
+        """A download given by path; its date comes from the date directory it sits in."""
+        try:
+            run_date = date.fromisoformat(path.parent.name).isoformat()
+        except ValueError:
+            run_date = date.today().isoformat()
+        return cls(merchant_id, run_date, path)
+
+
+class Job(NamedTuple):
+    download: RawDownload
+    merchant: MerchantConfig
+    out_path: Path
+    version: str
+    # Hash of the raw file the existing CSV was built from, when that CSV is
+    # otherwise current; a matching file needs no work
+    known_hash: Optional[str] = None
+    # Quality profile to check the snapshot against (see corkscrew.quality)
+    baseline: Optional[dict] = None
+    # Write the snapshot even if it fails the quality checks
+    accept: bool = False
+
+    @property
+    def quarantined(self) -> Path:
+        return quarantine_path(self.out_path.parent.parent, self.download.merchant_id, self.download.run_date)
+
+
+class JobResult(NamedTuple):
+    job: Job
+    status: str  # "written", "quarantined", "empty", "unchanged" or "failed"
+    file_hash: Optional[str] = None
+    records: int = 0
+    error: Optional[str] = None
+    profile: Optional[dict] = None
+    quarantine: Optional[list[str]] = None
+
+
+def scan_raw(
+    raw_root: Path,
+    merchant_ids: Optional[Iterable[str]] = None,
+    since: Optional[date] = None,
+    until: Optional[date] = None,
+    all_history: bool = False,
+) -> list[RawDownload]:
+    """Downloads under ``raw_root``, oldest first within each merchant.
+
+    Without a date range or ``all_history`` only each merchant's latest
+    download is returned.
+    """
+    if not raw_root.is_dir():
+        return []
+    wanted = set(merchant_ids) if merchant_ids is not None else None
+    latest_only = not (all_history or since or until)
+    found: list[RawDownload] = []
+    for merchant_dir in sorted(raw_root.iterdir()):
+        if not merchant_dir.is_dir() or (wanted is not None and merchant_dir.name not in wanted):
+            continue
+        dated = []
+        for day_dir in sorted(merchant_dir.iterdir()):
+            try:
+                day = date.fromisoformat(day_dir.name)
+            except ValueError:
+                continue
+            if (since and day < since) or (until and day > until) or not day_dir.is_dir():
+                continue
+            path = _download_in(day_dir)
+            if path is not None:
+                dated.append(RawDownload(merchant_dir.name, day_dir.name, path))
+        found.extend(dated[-1:] if latest_only else dated)
+    return found
+
+
+def plan(
+    downloads: list[RawDownload],
+    merchants: dict[str, MerchantConfig],
+    normalized_root: Path,
+    manifest: NormalizeManifest,
+    force: bool = False,
+    accept: bool = False,
+) -> tuple[list[Job], int]:
+    """Jobs for the downloads whose CSV is missing or stale, and the number already current.
+
+    With ``accept``, quarantined snapshots count as stale.
+    """
+    jobs: list[Job] = []
+    current = 0
+    for download in downloads:
+        merchant = merchants[download.merchant_id]
+        version = normalizer_version(merchant)
+        out_path = normalized_root / download.merchant_id / f"{download.run_date}.csv"
+        entry = None if force else manifest.get(download.merchant_id, download.run_date)
+        if entry and entry.get("quarantine"):
+            expected = None if accept else quarantine_path(normalized_root, download.merchant_id, download.run_date)
+        else:
+            expected = out_path
+        if entry and (entry["version"] != version or (entry["records"] and not (expected and expected.exists()))):
+            entry = None
+        if entry and entry["file"] == str(download.path) and entry["stamp"] == _stamp(download.path):
+            current += 1
+            continue
+        baseline = manifest.baseline(download.merchant_id, download.run_date)
+        jobs.append(Job(download, merchant, out_path, version, entry["hash"] if entry else None, baseline, accept))
+    return jobs, current
+
+
+def renormalize(job: Job, profiler: Optional[Profiler] = None) -> JobResult:
+    """Normalize one download and write its CSV. Runs in a worker process."""
+    download = job.download
+    try:
+        file_hash = compute_hash(download.path)
+        if file_hash == job.known_hash:
+            return JobResult(job, "unchanged", file_hash)
+        normalize, check, write = NormalizerRegistry().normalize, assess, write_checked
+        if profiler is not None:
+            key = f"{download.merchant_id}@{download.run_date}"
+            normalize = profiler.wrap(key, "normalize", normalize)
+            check = profiler.wrap(key, "quality", check)
+            write = profiler.wrap(key, "write", write)
+        records = normalize(download.path, job.merchant, download.run_date)
+        if not records:
+            return JobResult(job, "empty", file_hash)
+        profile, reasons = check(records, job.baseline)
+        if job.accept:
+            reasons = []
+        write(records, job.out_path, job.quarantined, reasons, profile, job.baseline)
+        return JobResult(job, "quarantined" if reasons else "written", file_hash, len(records),
+                         profile=profile, quarantine=reasons or None)
+    except NormalizationError as e:
+        return JobResult(job, "failed", error=str(e))
+    except Exception as e:
+        # One broken file shouldn't stop the rest of the archive
+        return JobResult(job, "failed", error=f"{type(e).__name__}: {e}")
+
+
+def run_jobs(jobs: list[Job], workers: Optional[int] = None, profiler: Optional[Profiler] = None) -> Iterator[JobResult]:
+    """Run ``jobs``, yielding results as they finish.
+
+    Normalizing is CPU-bound Python, so processes (not threads) are what spread
+    it over the cores. With one worker or a profiler, which only sees this
+    process, jobs run here one after another.
+    """
+    workers = min(workers or os.cpu_count() or 1, len(jobs))
+    if workers <= 1 or profiler is not None:
+        for job in jobs:
+            yield renormalize(job, profiler)
+        return
+    # Largest files first, so a big one doesn't start last and run alone
+    ordered = sorted(jobs, key=lambda j: j.download.path.stat().st_size, reverse=True)
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = [pool.submit(renormalize, job) for job in ordered]
+        for future in as_completed(futures):
+            yield future.result()
+
+
+def record_result(manifest: NormalizeManifest, result: JobResult):
+    """Note a finished job in the manifest; failures are left out so they are retried."""
+    if result.status == "failed":
+        return
+    download = result.job.download
+    records, profile, quarantine = result.records, result.profile, result.quarantine
+    if result.status == "unchanged":
+        entry = manifest.get(download.merchant_id, download.run_date)
+        records, profile, quarantine = entry["records"], entry.get("profile"), entry.get("quarantine")
+    manifest.record(download.merchant_id, download.run_date, download.path,
+                    result.file_hash, result.job.version, records, profile=profile, quarantine=quarantine)
+
+
+def _download_in(day_dir: Path) -> Optional[Path]:
+    # The newest visible file; hidden ones are partial downloads and their metadata
+    files = [p for p in day_dir.iterdir() if p.is_file() and not p.name.startswith(".")]
+    return max(files, key=lambda p: p.stat().st_mtime_ns) if files else None
+
+
+def _stamp(path: Path) -> Optional[list[int]]:
+    try:
+        st = path.stat()
+    except OSError:
+        return None
+    return [st.st_mtime_ns, st.st_size]
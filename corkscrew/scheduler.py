@@ -0,0 +1,226 @@
+"""Long-running scheduler behind ``corkscrew serve``, plus its local control socket."""
+from __future__ import annotations
+import asyncio
+import json
+import logging
+import socket
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Callable, Optional
+from corkscrew.cadence import refresh_interval
+from corkscrew.models import MerchantConfig
+from corkscrew.storage import StorageManager
+
+logger = logging.getLogger(__name__)
+
+RETRY_BASE = timedelta(minutes=30)
+# Re-check the schedule at least this often. State is re-read from state.json
+# on every check, so merchants fetched by other processes (e.g. a manual
+# 'corkscrew run') are not fetched again.
+MAX_SLEEP = 300.0
+DEFAULT_PORT = 8765
+
+
+class Scheduler:
+    """Polls each merchant on its own learned interval (see cadence.refresh_interval).
+
+    Each merchant goes through the pipeline on its own as soon as it is due, up
+    to the pipeline's ``download_workers`` at once, so a slow merchant never
+    holds up the ones that fall due while it runs.
+
+    ``on_finished`` is called in a worker thread with each finished merchant's
+    outcomes, e.g. to refresh the status summary.
+    """
+
+    def __init__(
+        self,
+        merchants: list[MerchantConfig],
+        storage: StorageManager,
+        pipeline,
+        reload_config: Optional[Callable[[], list[MerchantConfig]]] = None,
+        clock: Callable[[], datetime] = lambda: datetime.now(timezone.utc),
+        on_finished: Optional[Callable[[list], None]] = None,
+    ):
+        self.merchants = {m.id: m for m in merchants}
+        self.storage = storage
+        self.pipeline = pipeline
+        self.reload_config = reload_config
+        self.clock = clock
+        self.on_finished = on_finished
+        self.started = clock()
+        self.cycles = 0
+        self._forced: set[str] = set()
+        self._running: list[str] = []
+        self._stopping = False
+        self._wake = asyncio.Event()
+
+    def next_due(self, merchant_id: str) -> datetime:
+        state = self.storage.get_merchant_state(merchant_id)
+        if state.last_run is None:
+            return self.started
+        last_run = datetime.fromisoformat(state.last_run)
+        if last_run.tzinfo is None:
+            last_run = last_run.replace(tzinfo=timezone.utc)
+        wait = refresh_interval(state)
+        if state.consecutive_failures:
+            wait = min(wait, RETRY_BASE * 2 ** (state.consecutive_failures - 1))
+        return last_run + wait
+
+    def due(self) -> list[MerchantConfig]:
+        now = self.clock()
+        due = [
+            m for m in self.merchants.values()
+            if m.id not in self._running and (m.id in self._forced or self.next_due(m.id) <= now)
+        ]
+        self._forced.difference_update(m.id for m in due)
+        return due
+
+    async def run_forever(self):
+        """Start merchants as they fall due until stopped; running merchants are let finish."""
+        limit = max(1, getattr(self.pipeline, "download_workers", 1))
+        running: dict[asyncio.Task, str] = {}
+        try:
+            while not self._stopping:
+                self._wake.clear()
+                self.storage.reload()
+                forced = set(self._forced)
+                due = self.due()
+                room = limit - len(running)
+                for m in due[:room]:
+                    running[asyncio.create_task(self.pipeline.run([m]))] = m.id
+                # Forced merchants that didn't fit stay forced for the next free slot
+                self._forced.update(m.id for m in due[room:] if m.id in forced)
+                self._running = sorted(running.values())
+                await self._wait(running, full=len(running) >= limit)
+                for task in [t for t in running if t.done()]:
+                    await self._finished(task, running.pop(task))
+                self._running = sorted(running.values())
+        finally:
+            if running:
+                await asyncio.gather(*running, return_exceptions=True)
+                for task, merchant_id in running.items():
+                    await self._finished(task, merchant_id)
+            self._running = []
+
+    async def _finished(self, task: asyncio.Task, merchant_id: str):
+        self.cycles += 1
+        if task.cancelled():
+            return
+        if task.exception() is not None:
+            logger.error("Scheduled run of %s failed", merchant_id, exc_info=task.exception())
+            return
+        if self.on_finished is not None:
+            try:
+                await asyncio.to_thread(self.on_finished, task.result())
+            except Exception:
+                logger.exception("Updating after the scheduled run of %s failed", merchant_id)
+
+    async def _wait(self, running: dict[asyncio.Task, str], full: bool):
+        """Until a merchant finishes, one falls due, or a control command wakes us."""
+        idle = [m for m in self.merchants if m not in self._running]
+        timeout = MAX_SLEEP
+        if idle and not full:
+            next_at = min(self.next_due(m) for m in idle)
+            timeout = min(MAX_SLEEP, max(0.0, (next_at - self.clock()).total_seconds()))
+        wake = asyncio.create_task(self._wake.wait())
+        try:
+            await asyncio.wait({wake, *running}, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+        finally:
+            wake.cancel()
+
+    def force(self, merchant_id: str) -> bool:
+        if merchant_id not in self.merchants:
+            return False
+        self._forced.add(merchant_id)
+        self._wake.set()
+        return True
+
+    def stop(self):
+        self._stopping = True
+        self._wake.set()
+
+    def reload(self) -> int:
+        if self.reload_config is None:
+            raise RuntimeError("No config loader configured")
+        self.merchants = {m.id: m for m in self.reload_config()}
+        self._wake.set()
+        return len(self.merchants)
+
+    def status(self) -> dict:
+        merchants = {}
+        for merchant_id in sorted(self.merchants):
+            state = self.storage.get_merchant_state(merchant_id)
+            merchants[merchant_id] = {
+                "last_run": state.last_run,
+                "next_due": self.next_due(merchant_id).isoformat(),
+                "interval_hours": round(refresh_interval(state).total_seconds() / 3600, 1),
+                "consecutive_failures": state.consecutive_failures,
+            }
+        return {
+            "started": self.started.isoformat(),
+            "cycles": self.cycles,
+            "running": list(self._running),
+            "merchants": merchants,
+        }
+
+    def handle_command(self, line: str) -> dict:
+        command, _, arg = line.strip().partition(" ")
+        if command == "status":
+            return {"ok": True, **self.status()}
+        if command == "run":
+            if not self.force(arg.strip()):
+                return {"ok": False, "error": f"Unknown merchant '{arg.strip()}'"}
+            return {"ok": True, "queued": arg.strip()}
+        if command == "reload":
+            try:
+                return {"ok": True, "merchants": self.reload()}
+            except Exception as e:
+                return {"ok": False, "error": str(e)}
+        if command == "stop":
+            self.stop()
+            return {"ok": True}
+        return {"ok": False, "error": f"Unknown command '{command}'"}
+
+
+def has_unix_sockets() -> bool:
+    return hasattr(socket, "AF_UNIX")
+
+
+async def start_control_server(scheduler: Scheduler, socket_path: Optional[Path], port: int = DEFAULT_PORT):
+    """Serve one-line JSON commands (status, run <id>, reload, stop).
+
+    Listens on a Unix socket where available, otherwise on localhost ``port``.
+    """
+    async def handle(reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            line = (await reader.readline()).decode()
+            reply = scheduler.handle_command(line)
+            writer.write((json.dumps(reply) + "\n").encode())
+            await writer.drain()
+        except Exception:
+            logger.exception("Control socket request failed")
+        finally:
+            writer.close()
+
+    if socket_path is not None and has_unix_sockets():
+        socket_path.parent.mkdir(parents=True, exist_ok=True)
+        socket_path.unlink(missing_ok=True)
+        return await asyncio.start_unix_server(handle, path=str(socket_path))
+    return await asyncio.start_server(handle, host="127.0.0.1", port=port)
+
+
+def send_command(line: str, socket_path: Optional[Path], port: int = DEFAULT_PORT, timeout: float = 10.0) -> dict:
+    if socket_path is not None and has_unix_sockets():
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        address = str(socket_path)
+    else:
+        sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        address = ("127.0.0.1", port)
+    with sock:
+        sock.settimeout(timeout)
+        sock.connect(address)
+        sock.sendall((line.strip() + "\n").encode())
+        chunks = []
+        while chunk := sock.recv(65536):
+            chunks.append(chunk)
+    return json.loads(b"".join(chunks))
@@ -0,0 +1,221 @@
+"""Splitting a run across workers: deterministic shards, a SQLite lease queue, and reduce."""
+from __future__ import annotations
+import asyncio
+import hashlib
+import json
+import os
+import socket
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Optional
+from corkscrew.models import MerchantConfig
+from corkscrew.storage import file_lock, write_json_atomic
+
+LEASE_SECONDS = 900
+
+
+def parse_shard(spec: str) -> tuple[int, int]:
+    """Parse "i/N" (1-based) into (i, N)."""
+    try:
+        index_str, total_str = spec.split("/")
+        index, total = int(index_str), int(total_str)
+    except ValueError:
+        raise ValueError(f"Invalid shard '{spec}': expected i/N, e.g. 1/4")
+    if total < 1 or not 1 <= index <= total:
+        raise ValueError(f"Invalid shard '{spec}': need 1 <= i <= N")
+    return index, total
+
+
+def shard_of(merchant_id: str, total: int) -> int:
+    # sha1 rather than hash(): str hashes are salted per process
+    digest = hashlib.sha1(merchant_id.encode()).digest()
+    return int.from_bytes(digest[:8], "big") % total + 1
+
+
+def select_shard(merchants: list[MerchantConfig], index: int, total: int) -> list[MerchantConfig]:
+    return [m for m in merchants if shard_of(m.id, total) == index]
+
+
+class LeaseQueue:
+    """Work queue of merchant ids in a SQLite file shared by local workers.
+
+    Rows belong to a run (``run_key``, the run's reference date), so the same
+    file can be reused night after night: a new run seeds its own rows and
+    drops those of earlier runs. Workers claim merchants under a time-limited
+    lease that they renew while working; a lease that expires (the worker
+    died) makes the merchant claimable again.
+
+    Safe to call from worker threads; calls are serialized on one connection.
+    """
+
+    def __init__(self, db_path: Path, run_key: str, lease_seconds: int = LEASE_SECONDS):
+        self.db_path = db_path
+        self.run_key = run_key
+        self.lease_seconds = lease_seconds
+        db_path.parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(db_path, timeout=30, isolation_level=None, check_same_thread=False)
+        self._lock = threading.Lock()
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        columns = [r[1] for r in self._conn.execute("PRAGMA table_info(leases)")]
+        if columns and "run_key" not in columns:
+            # A queue from before runs were keyed; its rows are of no use to any run now
+            self._conn.execute("DROP TABLE leases")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS leases ("
+            " run_key TEXT NOT NULL,"
+            " merchant_id TEXT NOT NULL,"
+            " status TEXT NOT NULL DEFAULT 'pending',"
+            " worker TEXT,"
+            " lease_expires REAL,"
+            " PRIMARY KEY (run_key, merchant_id))"
+        )
+
+    def close(self):
+        self._conn.close()
+
+    def seed(self, merchant_ids: list[str]):
+        """Add this run's merchants; merchants already seeded for it keep their status."""
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                self._conn.execute("DELETE FROM leases WHERE run_key != ?", (self.run_key,))
+                self._conn.executemany(
+                    "INSERT OR IGNORE INTO leases (run_key, merchant_id) VALUES (?, ?)",
+                    [(self.run_key, m) for m in merchant_ids],
+                )
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+
+    def claim(self, worker: str, limit: int = 1) -> list[str]:
+        with self._lock:
+            now = time.time()
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                rows = self._conn.execute(
+                    "SELECT merchant_id FROM leases WHERE run_key = ?"
+                    " AND (status = 'pending' OR (status = 'leased' AND lease_expires < ?))"
+                    " ORDER BY merchant_id LIMIT ?",
+                    (self.run_key, now, limit),
+                ).fetchall()
+                claimed = [r[0] for r in rows]
+                self._conn.executemany(
+                    "UPDATE leases SET status = 'leased', worker = ?, lease_expires = ?"
+                    " WHERE run_key = ? AND merchant_id = ?",
+                    [(worker, now + self.lease_seconds, self.run_key, m) for m in claimed],
+                )
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+            return claimed
+
+    def renew(self, merchant_ids: list[str], worker: str) -> list[str]:
+        """Extend ``worker``'s leases on ``merchant_ids``; returns those it still holds."""
+        with self._lock:
+            expires = time.time() + self.lease_seconds
+            held = []
+            for m in merchant_ids:
+                cursor = self._conn.execute(
+                    "UPDATE leases SET lease_expires = ?"
+                    " WHERE run_key = ? AND merchant_id = ? AND worker = ? AND status = 'leased'",
+                    (expires, self.run_key, m, worker),
+                )
+                if cursor.rowcount:
+                    held.append(m)
+            return held
+
+    def complete(self, merchant_id: str, worker: str):
+        with self._lock:
+            self._conn.execute(
+                "UPDATE leases SET status = 'done', lease_expires = NULL"
+                " WHERE run_key = ? AND merchant_id = ? AND worker = ?",
+                (self.run_key, merchant_id, worker),
+            )
+
+    def counts(self) -> dict[str, int]:
+        return dict(self._conn.execute(
+            "SELECT status, COUNT(*) FROM leases WHERE run_key = ? GROUP BY status", (self.run_key,)
+        ).fetchall())
+
+    def clear(self):
+        """Forget every run's rows (after 'corkscrew reduce' has collected the workers' results)."""
+        self._conn.execute("DELETE FROM leases")
+
+
+def partial_state_path(shards_root: Path, worker: str) -> Path:
+    return shards_root / f"state-{worker}.json"
+
+
+def reduce_states(state_path: Path, partial_paths: list[Path]) -> int:
+    """Fold per-worker partial state files into the global state file.
+
+    Each merchant keeps whichever entry has the latest ``last_run``. Returns the
+    number of merchants updated.
+    """
+    with file_lock(state_path):
+        merged: dict = json.loads(state_path.read_text()) if state_path.exists() else {}
+        updated = 0
+        for path in sorted(partial_paths):
+            partial = json.loads(path.read_text())
+            for merchant_id, entry in partial.items():
+                current = merged.get(merchant_id)
+                if current is None or (entry.get("last_run") or "") > (current.get("last_run") or ""):
+                    merged[merchant_id] = entry
+                    updated += 1
+        write_json_atomic(state_path, merged, indent=2)
+    return updated
+
+
+def default_worker_id(shard: Optional[tuple[int, int]] = None) -> str:
+    if shard is not None:
+        return f"shard-{shard[0]}-of-{shard[1]}"
+    return f"{socket.gethostname()}-{os.getpid()}"
+
+
+async def run_from_queue(pipeline, queue: LeaseQueue, worker: str, merchants: list[MerchantConfig],
+                         batch_size: int = 10) -> list:
+    """Claim merchants from ``queue`` and push each through ``pipeline`` as soon as it is claimed.
+
+    Up to ``batch_size`` merchants run at once. Each one that finishes is
+    completed and a replacement claimed straight away, so a slow merchant never
+    leaves the worker idle. Leases of running merchants are renewed every third
+    of a lease, so slow downloads aren't handed to another worker halfway
+    through. Queue calls run in a thread, off the event loop.
+    """
+    by_id = {m.id: m for m in merchants}
+    outcomes = []
+    running: dict[asyncio.Task, str] = {}
+    heartbeat = asyncio.create_task(_renew_leases(queue, running, worker))
+    try:
+        while True:
+            room = batch_size - len(running)
+            claimed = await asyncio.to_thread(queue.claim, worker, room) if room else []
+            for merchant_id in claimed:
+                # Ids this worker's config doesn't know stay leased and fall to another worker on expiry
+                if merchant_id in by_id:
+                    running[asyncio.create_task(pipeline.run([by_id[merchant_id]]))] = merchant_id
+            if not running:
+                if claimed:
+                    continue
+                return outcomes
+            done, _ = await asyncio.wait(running, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                merchant_id = running.pop(task)
+                outcomes.extend(task.result())
+                await asyncio.to_thread(queue.complete, merchant_id, worker)
+    finally:
+        heartbeat.cancel()
+        for task in running:
+            task.cancel()
+        await asyncio.gather(heartbeat, *running, return_exceptions=True)
+
+
+async def _renew_leases(queue: LeaseQueue, running: dict[asyncio.Task, str], worker: str):
+    while True:
+        await asyncio.sleep(max(queue.lease_seconds / 3, 1))
+        if running:
+            await asyncio.to_thread(queue.renew, list(running.values()), worker)
@@ -1,38 +1,123 @@
 # corkscrew/storage.py
-import hashlib
 import json
 import logging
+import os
 import shutil
+import tempfile
+import threading
+from contextlib import contextmanager
 from datetime import datetime, timezone
 from pathlib import Path
+from typing import Iterator, Optional
+from corkscrew.compression import hash_raw
 from corkscrew.models import MerchantState
 
 logger = logging.getLogger(__name__)
 
 HISTORY_LIMIT = 30
+MANIFEST_NAME = ".manifest.json"
+
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
 
 
 def compute_hash(filepath: Path) -> str:
-    sha256 = hashlib.sha256()
-    with open(filepath, "rb") as f:
-        for chunk in iter(lambda: f.read(65536), b""):
-            sha256.update(chunk)
-    return sha256.hexdigest()
+    # Over the uncompressed bytes, however the file is stored
+    return hash_raw(Path(filepath))
+
+
+@contextmanager
+def file_lock(path: Path) -> Iterator[None]:
+    """Hold an exclusive lock on ``path`` across processes, via a ``<name>.lock`` file next to it."""
+    lock_path = path.with_name(f"{path.name}.lock")
+    lock_path.parent.mkdir(parents=True, exist_ok=True)
+    with open(lock_path, "a+b") as f:
+        if fcntl is not None:
+            fcntl.flock(f, fcntl.LOCK_EX)
+        else:
+            f.seek(0)
+            msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(f, fcntl.LOCK_UN)
+            else:
+                f.seek(0)
+                msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+
+
+def write_json_atomic(path: Path, data, **dump_options):
+    """Write ``data`` to a temp file of its own next to ``path``, then swap it in.
+
+    Readers never see half a file, and concurrent writers never share a temp file.
+    """
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=path.parent, prefix=f".{path.name}.", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "w") as f:
+            json.dump(data, f, **dump_options)
+        os.replace(tmp, path)
+    except BaseException:
+        Path(tmp).unlink(missing_ok=True)
+        raise
 
 
 class StorageManager:
-    def __init__(self, state_path: Path):
+    """Per-merchant run state persisted to a JSON file.
+
+    With ``base_path`` (a sharded worker), state is read from the global file
+    but only the merchants this instance records are written to ``state_path``,
+    to be folded back in later by ``shard.reduce_states``.
+
+    Other processes may write the same file (a manual 'corkscrew run' next to
+    'corkscrew serve'), and the pipeline records merchants from several
+    threads. Each update holds a thread lock and a file lock on the state
+    file, starts from the merchant's entry as it is on disk, and rewrites only
+    the merchants recorded since the last save.
+    """
+
+    def __init__(self, state_path: Path, base_path: Optional[Path] = None):
         self.state_path = state_path
-        self._data: dict = self._load()
+        self.base_path = base_path
+        self._touched: set[str] = set()
+        # Merchants recorded since the last save
+        self._dirty: set[str] = set()
+        self._data: dict = {}
+        self._lock = threading.RLock()
+        self.reload()
 
-    def _load(self) -> dict:
-        if not self.state_path.exists():
+    def reload(self):
+        """Re-read the state from disk, picking up what other processes have written."""
+        with self._lock:
+            data = self._load(self.base_path) if self.base_path is not None else {}
+            own = self._load(self.state_path)
+            data.update(own)
+            data.update({k: self._data[k] for k in self._dirty if k in self._data})
+            if self.base_path is not None:
+                self._touched.update(own)
+            self._data = data
+
+    @contextmanager
+    def _updating(self) -> Iterator[None]:
+        """Hold both locks around reading the latest state, changing it, and saving it."""
+        with self._lock, file_lock(self.state_path):
+            self.reload()
+            yield
+            self._save()
+
+    def _load(self, path: Path) -> dict:
+        if not path.exists():
             return {}
         try:
-            return json.loads(self.state_path.read_text())
+            return json.loads(path.read_text())
         except json.JSONDecodeError as e:
-            backup = self.state_path.with_suffix(".json.bak")
-            shutil.copy2(self.state_path, backup)
+            backup = path.with_suffix(".json.bak")
+            shutil.copy2(path, backup)
             logger.warning(
                 "state.json is corrupted (%s). Starting with empty state. "
                 "Corrupted file backed up to %s",
@@ -41,8 +126,19 @@ class StorageManager:
             return {}
 
     def _save(self):
-        self.state_path.parent.mkdir(parents=True, exist_ok=True)
-        self.state_path.write_text(json.dumps(self._data, indent=2))
+        # Called from _updating, with both locks held
+        if self.base_path is not None:
+            data = {k: v for k, v in self._data.items() if k in self._touched}
+        else:
+            data = self._load(self.state_path)
+            data.update({k: self._data[k] for k in self._dirty if k in self._data})
+            self._data = data
+        write_json_atomic(self.state_path, data, indent=2)
+        self._dirty.clear()
+
+    def _mark(self, merchant_id: str):
+        self._touched.add(merchant_id)
+        self._dirty.add(merchant_id)
 
     def get_merchant_state(self, merchant_id: str) -> MerchantState:
         return MerchantState(**self._data.get(merchant_id, {}))
@@ -51,36 +147,136 @@ class StorageManager:
         state = self.get_merchant_state(merchant_id)
         return state.last_hash != new_hash
 
-    def record_success(self, merchant_id: str, hash_val: str, filepath: str, changed: bool):
+    def record_success(
+        self,
+        merchant_id: str,
+        hash_val: str,
+        filepath: str,
+        changed: bool,
+        bytes_downloaded: Optional[int] = None,
+        seconds: Optional[float] = None,
+    ):
         now = datetime.now(timezone.utc).isoformat()
-        existing = self._data.get(merchant_id, {})
-        history = list(existing.get("history", []))
-        history.append({"date": now[:10], "hash": hash_val, "status": "success", "changed": changed})
-        if len(history) > HISTORY_LIMIT:
-            history = history[-HISTORY_LIMIT:]
-        self._data[merchant_id] = {
-            "last_run": now,
-            "last_success": now,
-            "last_hash": hash_val,
-            "last_file": filepath,
-            "changed": changed,
-            "consecutive_failures": 0,
-            "history": history,
-        }
-        self._save()
+        entry = {"date": now[:10], "hash": hash_val, "status": "success", "changed": changed}
+        if bytes_downloaded is not None:
+            entry["bytes"] = bytes_downloaded
+        if seconds is not None:
+            entry["seconds"] = seconds
+        with self._updating():
+            existing = self._data.get(merchant_id, {})
+            history = list(existing.get("history", []))
+            history.append(entry)
+            if len(history) > HISTORY_LIMIT:
+                history = history[-HISTORY_LIMIT:]
+            self._mark(merchant_id)
+            self._data[merchant_id] = {
+                "last_run": now,
+                "last_success": now,
+                "last_hash": hash_val,
+                "last_file": filepath,
+                "changed": changed,
+                "consecutive_failures": 0,
+                "history": history,
+            }
+
+    def rename_files(self, renamed: dict[str, str]) -> int:
+        """Point ``last_file`` entries at files that were moved (e.g. by ``compact``)."""
+        updated = 0
+        with self._updating():
+            for merchant_id, entry in self._data.items():
+                new = renamed.get(entry.get("last_file"))
+                if new is not None:
+                    entry["last_file"] = new
+                    self._mark(merchant_id)
+                    updated += 1
+        return updated
 
     def record_failure(self, merchant_id: str, error: str):
         now = datetime.now(timezone.utc).isoformat()
-        existing = self._data.get(merchant_id, {})
-        history = list(existing.get("history", []))
-        history.append({"date": now[:10], "hash": None, "status": "failed", "changed": False, "error": error})
-        if len(history) > HISTORY_LIMIT:
-            history = history[-HISTORY_LIMIT:]
-        failures = existing.get("consecutive_failures", 0) + 1
-        self._data[merchant_id] = {
-            **existing,
-            "last_run": now,
-            "consecutive_failures": failures,
-            "history": history,
+        with self._updating():
+            existing = self._data.get(merchant_id, {})
+            history = list(existing.get("history", []))
+            history.append({"date": now[:10], "hash": None, "status": "failed", "changed": False, "error": error})
+            if len(history) > HISTORY_LIMIT:
+                history = history[-HISTORY_LIMIT:]
+            failures = existing.get("consecutive_failures", 0) + 1
+            self._mark(merchant_id)
+            self._data[merchant_id] = {
+                **existing,
+                "last_run": now,
+                "consecutive_failures": failures,
+                "history": history,
+            }
+
+
+class NormalizeManifest:
+    """What each normalized CSV was built from.
+
+    Kept per merchant as ``<normalized root>/<merchant>/.manifest.json``,
+    keyed by download date: the raw file, its hash and size/mtime stamp, the
+    normalizer version and the record count. While the hash and version still
+    match, that date's CSV is up to date. Entries also keep the snapshot's
+    quality profile, and the reasons it was quarantined if it was (see
+    corkscrew.quality).
+    """
+
+    def __init__(self, root: Path):
+        self.root = root
+        # merchant id -> (file stamp, entries); re-read when another process rewrites the file
+        self._entries: dict[str, tuple[Optional[tuple], dict[str, dict]]] = {}
+        self._lock = threading.Lock()
+
+    def _path(self, merchant_id: str) -> Path:
+        return self.root / merchant_id / MANIFEST_NAME
+
+    def entries(self, merchant_id: str) -> dict[str, dict]:
+        path = self._path(merchant_id)
+        try:
+            st = path.stat()
+            stamp = (st.st_ino, st.st_mtime_ns, st.st_size)
+        except OSError:
+            stamp = None
+        cached = self._entries.get(merchant_id)
+        if cached is not None and cached[0] == stamp:
+            return cached[1]
+        try:
+            entries = json.loads(path.read_text()) if stamp is not None else {}
+        except (OSError, ValueError):
+            entries = {}
+        self._entries[merchant_id] = (stamp, entries)
+        return entries
+
+    def get(self, merchant_id: str, run_date: str) -> Optional[dict]:
+        return self.entries(merchant_id).get(run_date)
+
+    def baseline(self, merchant_id: str, run_date: str) -> Optional[dict]:
+        """Quality profile of the newest accepted snapshot from before ``run_date``."""
+        entries = self.entries(merchant_id)
+        for day in sorted(entries, reverse=True):
+            entry = entries[day]
+            if day < run_date and entry.get("profile") and not entry.get("quarantine"):
+                return entry["profile"]
+        return None
+
+    def record(self, merchant_id: str, run_date: str, raw_path: Path, file_hash: str, version: str, records: int,
+               profile: Optional[dict] = None, quarantine: Optional[list[str]] = None):
+        st = raw_path.stat()
+        entry = {
+            "file": str(raw_path),
+            "hash": file_hash,
+            "stamp": [st.st_mtime_ns, st.st_size],
+            "version": version,
+            "records": records,
         }
-        self._save()
+        if profile is not None:
+            entry["profile"] = profile
+        if quarantine:
+            entry["quarantine"] = quarantine
+        path = self._path(merchant_id)
+        # 'corkscrew normalize' and a running 'corkscrew serve' may both be
+        # recording: merge into what is on disk now, not what we read earlier
+        with self._lock, file_lock(path):
+            entries = dict(self.entries(merchant_id))
+            entries[run_date] = entry
+            write_json_atomic(path, entries, indent=2, sort_keys=True)
+            self._entries.pop(merchant_id, None)
@@ -0,0 +1,107 @@
+"""Vectorized parsing of WineRecord string fields into typed, nullable int columns.
+
+Typed columns sit next to the string fields they come from, so the original
+text is always kept and a value that does not parse is simply <NA>.
+"""
+from __future__ import annotations
+import pandas as pd
+from corkscrew.models import RecordBatch
+
+# Countries whose merchants write "1.234,50"; elsewhere "1,234.50" is assumed
+# unless a value is unambiguous on its own (a separator followed by 1-2 digits).
+DECIMAL_COMMA_COUNTRIES = frozenset({"AT", "BE", "DE", "ES", "FR", "IT", "NL", "PT"})
+# Digits after the decimal point in the currency's minor unit, if not 2
+CURRENCY_EXPONENTS = {"JPY": 0, "KRW": 0}
+
+NON_VINTAGE = r"^(?:n\.?\s?v\.?|non[\s-]?vintage|sans\s+ann[ée]e|ohne\s+jahrgang)$"
+NAMED_FORMATS = {
+    "half bottle": 375,
+    "half": 375,
+    "demi": 375,
+    "bottle": 750,
+    "btl": 750,
+    "clavelin": 620,
+    "double magnum": 3000,
+    "magnum": 1500,
+    "mag": 1500,
+    "jeroboam": 3000,
+    "rehoboam": 4500,
+    "methuselah": 6000,
+    "imperial": 6000,
+    "salmanazar": 9000,
+    "balthazar": 12000,
+    "nebuchadnezzar": 15000,
+}
+UNIT_ML = {"ml": 1, "cl": 10, "l": 1000, "ltr": 1000, "litre": 1000, "liter": 1000}
+# Bare numbers that are bottle sizes in centilitres (as in "75" or "150")
+CL_SIZES = frozenset({37.5, 50.0, 75.0, 100.0, 150.0, 300.0, 450.0, 600.0})
+
+_NAMED_PATTERN = "|".join(sorted(NAMED_FORMATS, key=len, reverse=True)).replace(" ", r"\s+")
+
+
+def _text(values) -> pd.Series:
+    return pd.Series(values, dtype=object).fillna("").astype(str).str.strip()
+
+
+def parse_decimal(values, decimal_comma: bool = False) -> pd.Series:
+    """Parse locale-formatted amounts ("£1,250.00", "1.250,50 €", "1'250") to float."""
+    cleaned = _text(values).str.replace(r"[^\d.,\-]", "", regex=True)
+    # A trailing separator with 1-2 digits after it is a decimal point in any locale
+    trailing = cleaned.str.extract(r"([.,])\d{1,2}$", expand=False)
+    comma_decimal = (trailing == ",") | (trailing.isna() & decimal_comma)
+    as_dot = cleaned.where(comma_decimal, cleaned.str.replace(",", "", regex=False))
+    as_dot = as_dot.where(
+        ~comma_decimal,
+        cleaned.str.replace(".", "", regex=False).str.replace(",", ".", regex=False),
+    )
+    return pd.to_numeric(as_dot, errors="coerce")
+
+
+def parse_price_minor(price, currency, decimal_comma: bool = False) -> pd.Series:
+    amount = parse_decimal(price, decimal_comma)
+    exponent = _text(currency).str.upper().map(CURRENCY_EXPONENTS).fillna(2)
+    return (amount * 10 ** exponent).round().astype("Int64")
+
+
+def parse_vintage(values) -> pd.Series:
+    """Four-digit vintage year; non-vintage and unparseable values are <NA>."""
+    years = _text(values).str.extract(r"\b(1[89]\d{2}|20\d{2})\b", expand=False)
+    return pd.to_numeric(years, errors="coerce").astype("Int64")
+
+
+def is_non_vintage(values) -> pd.Series:
+    return _text(values).str.lower().str.match(NON_VINTAGE)
+
+
+def parse_count(values) -> pd.Series:
+    """First whole number in the value, e.g. "24+" → 24, "6x75cl" → 6, "1,200" → 1200."""
+    text = _text(values).str.replace(r"(?<=\d)[,.' ](?=\d{3}\b)", "", regex=True)
+    return pd.to_numeric(text.str.extract(r"(\d+)", expand=False), errors="coerce").astype("Int64")
+
+
+def parse_format_ml(values) -> pd.Series:
+    """Bottle size in ml from "75cl", "1,5 L", "750ml", "Magnum", or a bare "75"/"1.5"."""
+    text = _text(values).str.lower()
+    with_unit = text.str.extract(r"(\d+(?:[.,]\d+)?)\s*(ml|cl|ltr|litre|liter|l)s?\b")
+    number = pd.to_numeric(with_unit[0].str.replace(",", ".", regex=False), errors="coerce")
+    ml = number * with_unit[1].map(UNIT_ML)
+
+    named = text.str.extract(rf"\b({_NAMED_PATTERN})\b", expand=False).str.replace(r"\s+", " ", regex=True)
+    ml = ml.fillna(named.map(NAMED_FORMATS))
+
+    bare = pd.to_numeric(text.where(text.str.fullmatch(r"\d+(?:[.,]\d+)?")).str.replace(",", ".", regex=False),
+                         errors="coerce")
+    bare_ml = bare.where(~bare.isin(CL_SIZES), bare * 10)
+    bare_ml = bare_ml.where(~(bare < 20), bare * 1000)
+    return ml.fillna(bare_ml).round().astype("Int64")
+
+
+def typed_columns(batch: RecordBatch, country: str) -> dict[str, pd.Series]:
+    decimal_comma = country.upper() in DECIMAL_COMMA_COUNTRIES
+    return {
+        "price_minor": parse_price_minor(batch.column("price"), batch.column("currency"), decimal_comma),
+        "vintage_year": parse_vintage(batch.column("vintage")),
+        "stock_int": parse_count(batch.column("stock_quantity")),
+        "case_size_int": parse_count(batch.column("case_size")),
+        "format_ml": parse_format_ml(batch.column("format")),
+    }
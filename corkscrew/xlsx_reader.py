@@ -0,0 +1,202 @@
+"""Streaming XLSX reader that only decodes the columns it is asked for.
+
+openpyxl's read-only mode still builds a full cell object (and a rich-text
+object for every inline string) for each cell in a row, so selecting columns
+after the fact saves almost nothing on wide price lists. This reader walks the
+sheet XML with ``iterparse`` and skips unwanted ``<c>`` elements before any
+value conversion; openpyxl is only used for its date-format helpers.
+"""
+from __future__ import annotations
+import posixpath
+import re
+import threading
+import zipfile
+from typing import IO, Iterator, Optional, Union
+from xml.etree import ElementTree as ET
+from pathlib import Path
+from openpyxl.styles.numbers import BUILTIN_FORMATS, is_date_format
+from openpyxl.utils.datetime import CALENDAR_MAC_1904, CALENDAR_WINDOWS_1900, from_excel
+
+NS = "{http://schemas.openxmlformats.org/spreadsheetml/2006/main}"
+DOC_REL_NS = "{http://schemas.openxmlformats.org/officeDocument/2006/relationships}"
+PKG_REL_NS = "{http://schemas.openxmlformats.org/package/2006/relationships}"
+
+_REF_LETTERS = re.compile(r"[A-Z]+")
+_col_cache: dict[str, int] = {}
+
+
+def column_index(ref: str) -> int:
+    """0-based column index of a cell reference such as "AB12"."""
+    letters = _REF_LETTERS.match(ref).group(0)
+    idx = _col_cache.get(letters)
+    if idx is None:
+        idx = 0
+        for ch in letters:
+            idx = idx * 26 + (ord(ch) - 64)
+        idx -= 1
+        _col_cache[letters] = idx
+    return idx
+
+
+class XLSXReader:
+    def __init__(self, source: Union[Path, str, IO[bytes]]):
+        self._zip = zipfile.ZipFile(source)
+        self._rels = self._read_rels("xl/_rels/workbook.xml.rels")
+        self._sheets, self._epoch = self._read_workbook()
+        self._shared: Optional[list[str]] = None
+        self._date_styles: Optional[set[int]] = None
+        # Sheets may be read from several threads; the shared parts load once
+        self._lock = threading.Lock()
+
+    def __enter__(self) -> XLSXReader:
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        self._zip.close()
+
+    @property
+    def sheet_names(self) -> list[str]:
+        return [name for name, _ in self._sheets]
+
+    def _read_rels(self, path: str) -> dict[str, tuple[str, str]]:
+        rels = {}
+        if path not in self._zip.namelist():
+            return rels
+        root = ET.fromstring(self._zip.read(path))
+        for rel in root.iter(f"{PKG_REL_NS}Relationship"):
+            target = rel.get("Target", "")
+            target = target.lstrip("/") if target.startswith("/") else posixpath.normpath(posixpath.join("xl", target))
+            rels[rel.get("Id")] = (rel.get("Type", ""), target)
+        return rels
+
+    def _read_workbook(self) -> tuple[list[tuple[str, str]], object]:
+        root = ET.fromstring(self._zip.read("xl/workbook.xml"))
+        pr = root.find(f"{NS}workbookPr")
+        epoch = CALENDAR_MAC_1904 if pr is not None and pr.get("date1904") in ("1", "true") else CALENDAR_WINDOWS_1900
+        sheets = []
+        for sheet in root.iter(f"{NS}sheet"):
+            _, target = self._rels[sheet.get(f"{DOC_REL_NS}id")]
+            sheets.append((sheet.get("name"), target))
+        return sheets, epoch
+
+    def _part(self, rel_type_suffix: str) -> Optional[str]:
+        for rel_type, target in self._rels.values():
+            if rel_type.endswith(rel_type_suffix) and target in self._zip.namelist():
+                return target
+        return None
+
+    def _shared_strings(self) -> list[str]:
+        with self._lock:
+            if self._shared is None:
+                shared = []
+                path = self._part("/sharedStrings")
+                if path:
+                    with self._zip.open(path) as f:
+                        for _, elem in ET.iterparse(f):
+                            if elem.tag == f"{NS}si":
+                                # Plain <t> or rich-text runs <r><t>; phonetic hints (<rPh>) are skipped
+                                shared.append("".join(
+                                    t.text or "" for t in elem.iterfind(f"{NS}t")
+                                ) + "".join(
+                                    t.text or "" for t in elem.iterfind(f"{NS}r/{NS}t")
+                                ))
+                                elem.clear()
+                self._shared = shared
+        return self._shared
+
+    def _date_style_ids(self) -> set[int]:
+        with self._lock:
+            if self._date_styles is None:
+                date_styles = set()
+                path = self._part("/styles")
+                if path:
+                    root = ET.fromstring(self._zip.read(path))
+                    custom = {int(f.get("numFmtId")): f.get("formatCode", "") for f in root.iter(f"{NS}numFmt")}
+                    cell_xfs = root.find(f"{NS}cellXfs")
+                    for i, xf in enumerate(cell_xfs if cell_xfs is not None else []):
+                        fmt_id = int(xf.get("numFmtId", 0))
+                        code = custom.get(fmt_id) or BUILTIN_FORMATS.get(fmt_id, "")
+                        if code and is_date_format(code):
+                            date_styles.add(i)
+                self._date_styles = date_styles
+        return self._date_styles
+
+    def _sheet_path(self, sheet: Union[int, str]) -> str:
+        if isinstance(sheet, int):
+            return self._sheets[sheet][1]
+        for name, path in self._sheets:
+            if name == sheet:
+                return path
+        raise KeyError(f"No sheet named {sheet!r}")
+
+    def iter_rows(self, sheet: Union[int, str] = 0, columns: Optional[set[int]] = None) -> Iterator[dict[int, object]]:
+        """Yield {column_index: value} per row, holding only non-empty wanted cells.
+
+        ``columns=None`` decodes every column. Empty rows are yielded as ``{}``
+        so callers can tell the header row from the first data row.
+        """
+        for values, _ in self.iter_filled_rows(sheet, columns):
+            yield values
+
+    def iter_filled_rows(
+        self, sheet: Union[int, str] = 0, columns: Optional[set[int]] = None,
+    ) -> Iterator[tuple[dict[int, object], bool]]:
+        """Like ``iter_rows``, paired with whether the row has a value in any column.
+
+        Unwanted cells are only checked for a value, not decoded, so whether a
+        row counts as blank doesn't depend on which columns are read.
+        """
+        shared = self._shared_strings()
+        date_styles = self._date_style_ids()
+        with self._zip.open(self._sheet_path(sheet)) as f:
+            sheet_data = None
+            for event, elem in ET.iterparse(f, events=("start", "end")):
+                if event == "start":
+                    if elem.tag == f"{NS}sheetData":
+                        sheet_data = elem
+                    continue
+                if elem.tag != f"{NS}row":
+                    continue
+                values: dict[int, object] = {}
+                filled = False
+                for position, c in enumerate(elem.iter(f"{NS}c")):
+                    ref = c.get("r")
+                    col = column_index(ref) if ref else position
+                    if columns is not None and col not in columns:
+                        filled = filled or _has_value(c)
+                        continue
+                    value = self._cell_value(c, shared, date_styles)
+                    if value is not None:
+                        values[col] = value
+                yield values, filled or bool(values)
+                # Drop finished rows so memory stays flat however long the sheet is
+                sheet_data.clear()
+
+    def _cell_value(self, c: ET.Element, shared: list[str], date_styles: set[int]):
+        cell_type = c.get("t", "n")
+        if cell_type == "inlineStr":
+            return "".join(t.text or "" for t in c.iter(f"{NS}t"))
+        v = c.find(f"{NS}v")
+        if v is None or v.text is None:
+            return None
+        text = v.text
+        if cell_type == "s":
+            return shared[int(text)]
+        if cell_type == "b":
+            return text == "1"
+        if cell_type in ("str", "e", "d"):
+            return text
+        number = float(text) if any(ch in text for ch in ".eE") else int(text)
+        if int(c.get("s", 0)) in date_styles:
+            return from_excel(number, self._epoch)
+        return number
+
+
+def _has_value(c: ET.Element) -> bool:
+    if c.get("t") == "inlineStr":
+        return any(t.text for t in c.iter(f"{NS}t"))
+    v = c.find(f"{NS}v")
+    return v is not None and v.text is not None
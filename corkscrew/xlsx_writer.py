@@ -0,0 +1,139 @@
+"""Streaming XLSX export of the master: a summary sheet and one sheet per merchant.
+
+Rows go straight from each merchant's normalized CSV into an openpyxl
+write-only workbook, which spools every sheet to a temporary file as it is
+written, so memory stays flat however many wines there are. A merchant with
+more rows than fit on one sheet continues on "<name> (2)", "<name> (3)"...
+Given an exchange-rate table, each sheet also gets a ``price_eur`` column.
+"""
+from __future__ import annotations
+import csv
+import re
+from pathlib import Path
+from typing import Iterable, Iterator, NamedTuple, Optional
+from openpyxl import Workbook
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.cell.cell import ILLEGAL_CHARACTERS_RE
+from openpyxl.styles import Font
+from corkscrew.fx import FxTable
+from corkscrew.models import TYPED_FIELDS
+
+# Excel's limit, header row included
+MAX_SHEET_ROWS = 1_048_576
+MAX_SHEET_NAME = 31
+SUMMARY_SHEET = "Summary"
+SUMMARY_HEADER = ("Merchant ID", "Merchant", "Wines", "Download date", "Sheets")
+
+_INVALID_NAME_CHARS = re.compile(r"[\[\]:*?/\\]")
+
+
+class MerchantSheets(NamedTuple):
+    merchant_id: str
+    merchant_name: str
+    rows: int
+    download_date: str
+    sheets: list[str]
+
+
+def write_master_xlsx(
+    sources: Iterable[tuple[str, Path]],
+    out_path: Path,
+    max_rows: int = MAX_SHEET_ROWS,
+    fx: Optional[FxTable] = None,
+) -> list[MerchantSheets]:
+    """Write each (merchant id, normalized CSV) to its own sheet(s) of ``out_path``."""
+    wb = Workbook(write_only=True)
+    used = {SUMMARY_SHEET.lower()}
+    written: list[MerchantSheets] = []
+    for merchant_id, csv_path in sources:
+        written.append(_write_merchant(wb, merchant_id, csv_path, used, max_rows, fx))
+
+    summary = wb.create_sheet(SUMMARY_SHEET)
+    summary.freeze_panes = "A2"
+    summary.append(_header(summary, SUMMARY_HEADER))
+    for m in written:
+        summary.append([m.merchant_id, m.merchant_name, m.rows, m.download_date, ", ".join(m.sheets)])
+    summary.append([])
+    summary.append(["Total", "", sum(m.rows for m in written)])
+    wb.move_sheet(SUMMARY_SHEET, offset=-len(wb.sheetnames) + 1)
+
+    out_path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = out_path.with_name(f".{out_path.name}.tmp")
+    wb.save(tmp)
+    tmp.replace(out_path)
+    return written
+
+
+def _write_merchant(
+    wb: Workbook, merchant_id: str, csv_path: Path, used: set[str], max_rows: int, fx: Optional[FxTable],
+) -> MerchantSheets:
+    rows = _csv_rows(csv_path, fx)
+    header = next(rows, None) or []
+    name_at = header.index("merchant_name") if "merchant_name" in header else None
+    date_at = header.index("download_date") if "download_date" in header else None
+    merchant_name = download_date = ""
+    sheets: list[str] = []
+    ws = None
+    count = 0
+    for row in rows:
+        if count % (max_rows - 1) == 0:
+            ws = wb.create_sheet(sheet_name(merchant_id, len(sheets) + 1, used))
+            ws.freeze_panes = "A2"
+            ws.append(_header(ws, header))
+            sheets.append(ws.title)
+        if count == 0:
+            merchant_name = row[name_at] if name_at is not None else ""
+            download_date = row[date_at] if date_at is not None else ""
+        ws.append(row)
+        count += 1
+    return MerchantSheets(merchant_id, merchant_name or merchant_id, count, download_date, sheets)
+
+
+def _csv_rows(csv_path: Path, fx: Optional[FxTable] = None) -> Iterator[list]:
+    """The header, then every row with typed columns as ints (None when blank).
+
+    With ``fx``, rows that have a price, currency and download date end in ``price_eur``.
+    """
+    with open(csv_path, newline="", encoding="utf-8") as f:
+        reader = csv.reader(f)
+        header = next(reader, None)
+        if header is None:
+            return
+        typed_at = [i for i, name in enumerate(header) if name in TYPED_FIELDS]
+        needed = ("price_minor", "currency", "download_date")
+        convert_at = [header.index(name) for name in needed] if fx is not None and set(needed) <= set(header) else None
+        yield header + ["price_eur"] if convert_at else header
+        for row in reader:
+            # Control characters (from PDFs, mostly) are not allowed in the sheet XML
+            row = [ILLEGAL_CHARACTERS_RE.sub("", v) for v in row]
+            for i in typed_at:
+                if i < len(row):
+                    row[i] = int(row[i]) if row[i] else None
+            if convert_at:
+                price, currency, day = (row[i] if i < len(row) else None for i in convert_at)
+                row.append(fx.convert(price, currency or "", day or ""))
+            yield row
+
+
+def _header(ws, names: Iterable[str]) -> list[WriteOnlyCell]:
+    bold = Font(bold=True)
+    cells = []
+    for name in names:
+        cell = WriteOnlyCell(ws, value=name)
+        cell.font = bold
+        cells.append(cell)
+    return cells
+
+
+def sheet_name(base: str, part: int, used: set[str]) -> str:
+    """A valid, unused sheet name for ``part`` of ``base`` (names are unique ignoring case)."""
+    base = _INVALID_NAME_CHARS.sub("_", base).strip("'") or "Sheet"
+    suffix = f" ({part})" if part > 1 else ""
+    n = 1
+    while True:
+        name = base[:MAX_SHEET_NAME - len(suffix)] + suffix
+        if name.lower() not in used:
+            used.add(name.lower())
+            return name
+        n += 1
+        suffix = f" ({part})~{n}" if part > 1 else f"~{n}"
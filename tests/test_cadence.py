@@ -0,0 +1,95 @@
+from datetime import date, timedelta
+from corkscrew.cadence import (
+    MAX_INTERVAL, MIN_INTERVAL, DEFAULT_INTERVAL,
+    estimate_cadence, refresh_interval, should_fetch, typical_cost, unchanged_streak,
+)
+from corkscrew.models import MerchantState
+
+
+def make_state(entries):
+    """entries: (date, changed) pairs, oldest first."""
+    return MerchantState(history=[
+        {"date": d, "hash": "h", "status": "success", "changed": changed} for d, changed in entries
+    ])
+
+
+def test_new_merchant_uses_default_interval():
+    assert refresh_interval(MerchantState()) == DEFAULT_INTERVAL
+
+
+def test_weekly_changes_are_polled_twice_a_week():
+    state = make_state([("2026-01-05", True), ("2026-01-12", True), ("2026-01-19", True)])
+    assert refresh_interval(state) == timedelta(days=3.5)
+
+
+def test_daily_changes_clamped_to_minimum():
+    state = make_state([(f"2026-01-{d:02d}", True) for d in range(1, 10)])
+    assert refresh_interval(state) == max(MIN_INTERVAL, timedelta(hours=12))
+
+
+def test_rarely_changing_merchant_backs_off():
+    state = make_state([("2026-01-01", True)] + [(f"2026-01-{d:02d}", False) for d in range(2, 13)])
+    assert unchanged_streak(state) == 11
+    assert refresh_interval(state) == DEFAULT_INTERVAL * 4
+
+
+def test_interval_never_exceeds_maximum():
+    state = make_state([("2026-01-01", True), ("2026-03-01", True)])
+    assert refresh_interval(state) == MAX_INTERVAL
+
+
+def test_failures_do_not_break_unchanged_streak():
+    state = make_state([("2026-01-01", False), ("2026-01-02", False)])
+    state.history.append({"date": "2026-01-03", "hash": None, "status": "failed", "changed": False})
+    assert unchanged_streak(state) == 2
+
+
+def make_success_state(change_days, last_success, sizes=None):
+    """History of daily successes from 2026-01-01 to last_success, changed on change_days."""
+    start, end = date(2026, 1, 1), date.fromisoformat(last_success)
+    history = []
+    for i in range((end - start).days + 1):
+        d = (start + timedelta(days=i)).isoformat()
+        history.append({"date": d, "hash": "h", "status": "success", "changed": d in change_days,
+                        "bytes": (sizes or {}).get(d, 1000), "seconds": 2.0})
+    return MerchantState(last_success=f"{last_success}T06:00:00+00:00", history=history)
+
+
+def test_estimate_cadence_detects_weekday_pattern():
+    # 2026-01-05, -12, -19 are Mondays
+    state = make_success_state({"2026-01-05", "2026-01-12", "2026-01-19"}, "2026-01-20")
+    cadence = estimate_cadence(state)
+    assert cadence.reliable
+    assert cadence.weekdays == frozenset({0})
+    assert cadence.interval == timedelta(days=7)
+
+
+def test_should_fetch_skips_until_usual_weekday():
+    state = make_success_state({"2026-01-05", "2026-01-12", "2026-01-19"}, "2026-01-20")
+    fetch, reason = should_fetch(state, today=date(2026, 1, 23))  # Friday
+    assert not fetch and "Mon" in reason
+    fetch, _ = should_fetch(state, today=date(2026, 1, 26))  # Monday
+    assert fetch
+
+
+def test_should_fetch_uses_interval_without_weekday_pattern():
+    # Every 10 days, landing on different weekdays
+    state = make_success_state({"2026-01-01", "2026-01-11", "2026-01-21"}, "2026-01-22")
+    assert should_fetch(state, today=date(2026, 1, 25))[0] is False
+    assert should_fetch(state, today=date(2026, 1, 30))[0] is True
+
+
+def test_should_fetch_errs_towards_fetching():
+    assert should_fetch(MerchantState(), today=date(2026, 1, 2)) == (True, "never downloaded")
+    thin = make_success_state({"2026-01-05"}, "2026-01-06")
+    assert should_fetch(thin, today=date(2026, 1, 7))[0] is True
+    failing = make_success_state({"2026-01-05", "2026-01-12", "2026-01-19"}, "2026-01-20")
+    failing.consecutive_failures = 1
+    assert should_fetch(failing, today=date(2026, 1, 21))[0] is True
+    old = make_success_state({"2026-01-05", "2026-01-12", "2026-01-19"}, "2026-01-20")
+    assert should_fetch(old, today=date(2026, 2, 20))[0] is True
+
+
+def test_typical_cost_uses_recorded_sizes():
+    state = make_success_state(set(), "2026-01-03", sizes={"2026-01-01": 500, "2026-01-02": 700, "2026-01-03": 900})
+    assert typical_cost(state) == (700, 2.0)
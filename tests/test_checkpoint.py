@@ -0,0 +1,70 @@
+import json
+import pytest
+from datetime import date
+from corkscrew.checkpoint import RunJournal
+
+
+def test_create_writes_run_metadata(tmp_path):
+    journal = RunJournal.create(tmp_path, ["a", "b"], ref_date=date(2026, 2, 23))
+    meta = json.loads((journal.run_dir / "run.json").read_text())
+    assert meta["merchants"] == ["a", "b"]
+    assert journal.ref_date == date(2026, 2, 23)
+    assert not journal.finished
+
+
+def test_record_persists_across_instances(tmp_path):
+    journal = RunJournal.create(tmp_path, ["a"])
+    journal.record("a", "download", changed=True, result={})
+    reopened = RunJournal.open(tmp_path, journal.run_id)
+    assert "download" in reopened.completed("a")
+
+
+def test_unknown_stage_rejected(tmp_path):
+    journal = RunJournal.create(tmp_path, ["a"])
+    with pytest.raises(ValueError):
+        journal.record("a", "upload")
+
+
+def test_is_finished_rules(tmp_path):
+    journal = RunJournal.create(tmp_path, ["failed", "unchanged", "pending-normalize", "written", "empty"])
+    journal.record("failed", "download", changed=False, error="HTTP 503", result={})
+    journal.record("unchanged", "download", changed=False, result={})
+    journal.record("pending-normalize", "download", changed=True, result={})
+    journal.record("written", "download", changed=True, result={})
+    journal.record("written", "normalize", records=3)
+    journal.record("written", "write", out_path="x.csv")
+    journal.record("empty", "download", changed=True, result={})
+    journal.record("empty", "normalize", records=0)
+    assert journal.is_finished("failed")
+    assert journal.is_finished("unchanged")
+    assert not journal.is_finished("pending-normalize")
+    assert journal.is_finished("written")
+    assert journal.is_finished("empty")
+    assert not journal.is_finished("never-started")
+
+
+def test_torn_last_line_is_ignored(tmp_path):
+    journal = RunJournal.create(tmp_path, ["a"])
+    journal.record("a", "download", changed=False, result={})
+    with open(journal.run_dir / "journal.jsonl", "a") as f:
+        f.write('{"merchant_id": "a", "stage": "norm')
+    reopened = RunJournal.open(tmp_path, journal.run_id)
+    assert reopened.is_finished("a")
+
+
+def test_latest_unfinished_only_resumes_the_most_recent_run(tmp_path):
+    stale = RunJournal.create(tmp_path, ["a"])
+    latest = RunJournal.create(tmp_path, ["a"])
+    assert RunJournal.latest_unfinished(tmp_path).run_id == latest.run_id
+    # An interrupted run is not resumed once a newer run has finished
+    latest.mark_finished()
+    assert RunJournal.latest_unfinished(tmp_path) is None
+    assert RunJournal.open(tmp_path, stale.run_id).run_id == stale.run_id
+
+    # Start time decides, not the directory name
+    meta = json.loads((stale.run_dir / "run.json").read_text())
+    meta["started"] = "2999-01-01T00:00:00+00:00"
+    (stale.run_dir / "run.json").write_text(json.dumps(meta))
+    (tmp_path / "zz-custom").mkdir()
+    (tmp_path / "zz-custom" / "run.json").write_text(json.dumps({**meta, "started": "2000-01-01T00:00:00+00:00"}))
+    assert RunJournal.latest_unfinished(tmp_path).run_id == stale.run_id
@@ -0,0 +1,101 @@
+# tests/test_compression.py
+import hashlib
+import pytest
+from pathlib import Path
+from corkscrew import compression
+from corkscrew.compression import (
+    RawFile, compact, compact_candidates, compress_file, find_raw, hash_raw, open_raw, readable,
+)
+from corkscrew.models import MerchantConfig, DownloadConfig
+from corkscrew.normalizer import NormalizerRegistry
+from corkscrew.storage import StorageManager, compute_hash
+
+CODECS = ["gzip", pytest.param("zstd", marks=pytest.mark.skipif(compression.zstandard is None, reason="zstandard not installed"))]
+CSV = b"Wine,Price\n" + b"Petrus,4500.00\nLatour,800\n" * 50
+
+
+def make_merchant(**extra):
+    return MerchantConfig(
+        id="test", name="Test", country="UK", tier=1, enabled=True, discovery_url="https://example.com",
+        downloads=[DownloadConfig(url="https://example.com/f.csv", format="csv", preferred=True)],
+        url_pattern="static", column_map={"Wine": "wine_name", "Price": "price"}, **extra,
+    )
+
+
+@pytest.mark.parametrize("codec", CODECS)
+def test_compress_file_round_trips_and_keeps_hash(tmp_path, codec):
+    path = tmp_path / "stock.csv"
+    path.write_bytes(CSV)
+    stored = compress_file(path, codec)
+    assert stored.name == "stock.csv" + compression.CODEC_SUFFIXES[codec]
+    assert not path.exists()
+    assert stored.stat().st_size < len(CSV)
+    with open_raw(stored) as f:
+        assert f.read() == CSV
+    assert hash_raw(stored) == compute_hash(stored) == hashlib.sha256(CSV).hexdigest()
+
+
+def test_compress_file_switches_codec(tmp_path):
+    path = tmp_path / "stock.csv"
+    path.write_bytes(CSV)
+    gz = compress_file(path, "gzip")
+    if compression.zstandard is None:
+        pytest.skip("zstandard not installed")
+    zst = compress_file(gz, "zstd")
+    assert zst.name == "stock.csv.zst" and not gz.exists()
+    assert compress_file(zst, "zstd") == zst
+    assert RawFile(zst).read_bytes() == CSV
+
+
+@pytest.mark.parametrize("codec", CODECS)
+def test_registry_normalizes_compressed_files(tmp_path, codec):
+    csv_path = tmp_path / "stock.csv"
+    csv_path.write_bytes(CSV)
+    json_path = tmp_path / "api.json"
+    json_path.write_bytes(b'\xef\xbb\xbf{"wines": [{"Wine": "Krug", "Price": 250}]}')
+    registry = NormalizerRegistry()
+    records = registry.normalize(compress_file(csv_path, codec), make_merchant(), "2026-02-23")
+    assert len(records) == 100 and records[0].price == "4500"
+    records = registry.normalize(compress_file(json_path, codec), make_merchant(json_path="wines"), "2026-02-23")
+    assert [(r.wine_name, r.price) for r in records] == [("Krug", "250")]
+
+
+def test_readable_finds_file_compressed_after_it_was_recorded(tmp_path):
+    path = tmp_path / "stock.csv"
+    path.write_bytes(CSV)
+    stored = compress_file(path, "gzip")
+    assert find_raw(path) == stored
+    assert isinstance(readable(path), RawFile) and readable(path).suffix == ".csv"
+    assert len(NormalizerRegistry().normalize(path, make_merchant(), "2026-02-23")) == 100
+
+
+def test_compact_skips_containers_and_hidden_files(tmp_path):
+    day = tmp_path / "raw" / "merchant" / "2026-02-23"
+    day.mkdir(parents=True)
+    for name in ("stock.csv", "list.xlsx", "archive.zip", ".abc.part", "old.json.gz"):
+        (day / name).write_bytes(CSV)
+    assert [p.name for p in compact_candidates(tmp_path / "raw", "gzip")] == ["stock.csv"]
+    if compression.zstandard is not None:
+        assert [p.name for p in compact_candidates(tmp_path / "raw", "zstd")] == ["old.json.gz", "stock.csv"]
+
+
+@pytest.mark.skipif(compression.zstandard is None, reason="zstandard not installed")
+def test_compact_reports_each_file(tmp_path):
+    good = tmp_path / "a.csv"
+    good.write_bytes(CSV)
+    broken = tmp_path / "b.json.gz"
+    broken.write_bytes(b"not gzip")
+    results = {r.source.name: r for r in compact([good, broken], "zstd", workers=2)}
+    assert results["a.csv"].target == tmp_path / "a.csv.zst"
+    assert results["a.csv"].after < results["a.csv"].before
+    assert results["b.json.gz"].error and broken.exists()
+
+
+def test_storage_rename_files_updates_last_file(tmp_path):
+    storage = StorageManager(tmp_path / "state.json")
+    storage.record_success("m1", "h", "data/raw/m1/stock.csv", changed=True)
+    storage.record_success("m2", "h", "data/raw/m2/list.xlsx", changed=True)
+    assert storage.rename_files({"data/raw/m1/stock.csv": "data/raw/m1/stock.csv.zst"}) == 1
+    reloaded = StorageManager(tmp_path / "state.json")
+    assert reloaded.get_merchant_state("m1").last_file == "data/raw/m1/stock.csv.zst"
+    assert reloaded.get_merchant_state("m2").last_file == "data/raw/m2/list.xlsx"
@@ -1,4 +1,5 @@
 # tests/test_config.py
+import json
 import pytest
 from pathlib import Path
 from corkscrew.config import load_config, ConfigError
@@ -44,3 +45,93 @@ def test_load_config_merchants_not_list_raises(tmp_path):
     bad.write_text("merchants: not-a-list")
     with pytest.raises(ConfigError):
         load_config(bad)
+
+
+def _merchant(merchant_id, country="UK", tier=1, enabled=True, **extra):
+    return {
+        "id": merchant_id, "name": merchant_id, "country": country, "tier": tier, "enabled": enabled,
+        "discovery_url": "https://example.com/", "url_pattern": "static",
+        "downloads": [{"url": f"https://example.com/{merchant_id}.csv", "format": "csv", "preferred": True}],
+        **extra,
+    }
+
+
+@pytest.fixture
+def include_config(tmp_path):
+    import yaml
+    (tmp_path / "merchants.d").mkdir()
+    (tmp_path / "merchants.d" / "fr.yaml").write_text(yaml.safe_dump({"merchants": [
+        _merchant("fr-one", country="FR"), _merchant("fr-two", country="FR", tier=2),
+    ]}))
+    (tmp_path / "merchants.d" / "de.yaml").write_text(yaml.safe_dump({"merchants": [
+        _merchant("de-one", country="DE", tier=2, enabled=False),
+    ]}))
+    root = tmp_path / "merchants.yaml"
+    root.write_text(yaml.safe_dump({"include": ["merchants.d/*.yaml"], "merchants": [_merchant("uk-one")]}))
+    return root
+
+
+def test_load_config_follows_include_globs(include_config):
+    assert [m.id for m in load_config(include_config)] == ["uk-one", "de-one", "fr-one", "fr-two"]
+
+
+def test_load_config_filters_across_included_files(include_config):
+    assert [m.id for m in load_config(include_config, tier=2)] == ["de-one", "fr-two"]
+    assert [m.id for m in load_config(include_config, country="fr")] == ["fr-one", "fr-two"]
+    assert [m.id for m in load_config(include_config, enabled_only=True, tier=2)] == ["fr-two"]
+    assert [m.id for m in load_config(include_config, merchant_ids=["uk-one", "de-one"])] == ["uk-one", "de-one"]
+
+
+def test_filtered_load_only_reads_matching_files(include_config):
+    load_config(include_config, merchant_id="fr-one")
+    # Break de.yaml but keep the index stamp current: a file with no match is never opened
+    de = include_config.parent / "merchants.d" / "de.yaml"
+    de.write_text("merchants: [broken")
+    index_path = include_config.parent / ".merchants.index.json"
+    index = json.loads(index_path.read_text())
+    index["files"][str(de)] = [de.stat().st_mtime_ns, de.stat().st_size]
+    index_path.write_text(json.dumps(index))
+    assert [m.id for m in load_config(include_config, merchant_id="fr-one")] == ["fr-one"]
+    with pytest.raises(ConfigError):
+        load_config(include_config)
+
+
+def test_filtered_load_validates_only_selected_entries(tmp_path):
+    import yaml
+    root = tmp_path / "merchants.yaml"
+    root.write_text(yaml.safe_dump({"merchants": [_merchant("good"), {"id": "bad", "tier": 3}]}))
+    assert [m.id for m in load_config(root, merchant_id="good")] == ["good"]
+    with pytest.raises(ConfigError, match="bad"):
+        load_config(root)
+
+
+def test_index_is_rebuilt_when_an_included_file_changes(include_config):
+    import yaml
+    assert load_config(include_config, merchant_id="fr-three") == []
+    fr = include_config.parent / "merchants.d" / "fr.yaml"
+    fr.write_text(yaml.safe_dump({"merchants": [_merchant("fr-three", country="FR")]}))
+    assert [m.id for m in load_config(include_config, merchant_id="fr-three")] == ["fr-three"]
+
+
+def test_duplicate_ids_across_included_files_raise(include_config):
+    import yaml
+    (include_config.parent / "merchants.d" / "zz.yaml").write_text(yaml.safe_dump({"merchants": [_merchant("fr-one")]}))
+    with pytest.raises(ConfigError, match="fr-one"):
+        load_config(include_config)
+    with pytest.raises(ConfigError, match="fr-one"):
+        load_config(include_config, tier=1)
+
+
+def test_missing_literal_include_raises(tmp_path):
+    root = tmp_path / "merchants.yaml"
+    root.write_text("include: [missing.yaml]\n")
+    with pytest.raises(ConfigError, match="missing.yaml"):
+        load_config(root)
+
+
+def test_nested_include_raises(tmp_path):
+    (tmp_path / "child.yaml").write_text("include: [other.yaml]\nmerchants: []\n")
+    root = tmp_path / "merchants.yaml"
+    root.write_text("include: [child.yaml]\n")
+    with pytest.raises(ConfigError, match="include"):
+        load_config(root)
@@ -1,10 +1,40 @@
 # tests/test_downloader.py
 import asyncio
+import gzip
+import hashlib
+import time
 import pytest
+from datetime import date
 from pathlib import Path
 from unittest.mock import AsyncMock, MagicMock, patch
-from corkscrew.downloader import Downloader
-from corkscrew.models import MerchantConfig, DownloadConfig
+from corkscrew.downloader import Downloader, _part_meta_path, download_chain
+from corkscrew.models import MerchantConfig, DownloadConfig, DownloadResult
+
+
+def make_response(status_code=200, content=b"", headers=None):
+    response = MagicMock()
+    response.status_code = status_code
+    response.headers = headers if headers is not None else {"content-type": "application/octet-stream"}
+    response.content = content
+
+    async def aiter_bytes(chunk_size=None):
+        yield content
+
+    response.aiter_bytes = aiter_bytes
+    return response
+
+
+def mock_http(mock_client_cls, response):
+    """Point the patched httpx.AsyncClient at ``response`` for every streamed GET."""
+    stream_ctx = MagicMock()
+    stream_ctx.__aenter__ = AsyncMock(return_value=response)
+    stream_ctx.__aexit__ = AsyncMock(return_value=None)
+    mock_client = AsyncMock()
+    mock_client.__aenter__ = AsyncMock(return_value=mock_client)
+    mock_client.__aexit__ = AsyncMock(return_value=None)
+    mock_client.stream = MagicMock(return_value=stream_ctx)
+    mock_client_cls.return_value = mock_client
+    return mock_client
 
 
 def make_merchant(url_pattern="static", url="https://example.com/file.xlsx", fmt="xlsx"):
@@ -19,17 +49,10 @@ def make_merchant(url_pattern="static", url="https://example.com/file.xlsx", fmt
 @pytest.mark.asyncio
 async def test_download_saves_file(tmp_path):
     merchant = make_merchant()
-    mock_response = MagicMock()
-    mock_response.status_code = 200
-    mock_response.headers = {"content-type": "application/octet-stream"}
-    mock_response.content = b"wine,vintage\nPetrus,2019\n" + b"x" * 200  # > 100 bytes
+    mock_response = make_response(200, b"wine,vintage\nPetrus,2019\n" + b"x" * 200)  # > 100 bytes
 
     with patch("corkscrew.downloader.httpx.AsyncClient") as mock_client_cls:
-        mock_client = AsyncMock()
-        mock_client.__aenter__ = AsyncMock(return_value=mock_client)
-        mock_client.__aexit__ = AsyncMock(return_value=None)
-        mock_client.get = AsyncMock(return_value=mock_response)
-        mock_client_cls.return_value = mock_client
+        mock_http(mock_client_cls, mock_response)
 
         downloader = Downloader(output_root=tmp_path)
         result = await downloader.download(merchant)
@@ -42,17 +65,10 @@ async def test_download_saves_file(tmp_path):
 @pytest.mark.asyncio
 async def test_download_returns_failure_on_404(tmp_path):
     merchant = make_merchant()
-    mock_response = MagicMock()
-    mock_response.status_code = 404
-    mock_response.content = b""
-    mock_response.headers = {}
+    mock_response = make_response(404, b"", headers={})
 
     with patch("corkscrew.downloader.httpx.AsyncClient") as mock_client_cls:
-        mock_client = AsyncMock()
-        mock_client.__aenter__ = AsyncMock(return_value=mock_client)
-        mock_client.__aexit__ = AsyncMock(return_value=None)
-        mock_client.get = AsyncMock(return_value=mock_response)
-        mock_client_cls.return_value = mock_client
+        mock_http(mock_client_cls, mock_response)
 
         downloader = Downloader(output_root=tmp_path)
         result = await downloader.download(merchant)
@@ -64,17 +80,10 @@ async def test_download_returns_failure_on_404(tmp_path):
 @pytest.mark.asyncio
 async def test_download_rejects_tiny_file(tmp_path):
     merchant = make_merchant()
-    mock_response = MagicMock()
-    mock_response.status_code = 200
-    mock_response.headers = {"content-type": "application/octet-stream"}
-    mock_response.content = b"too small"  # < 100 bytes
+    mock_response = make_response(200, b"too small")  # < 100 bytes
 
     with patch("corkscrew.downloader.httpx.AsyncClient") as mock_client_cls:
-        mock_client = AsyncMock()
-        mock_client.__aenter__ = AsyncMock(return_value=mock_client)
-        mock_client.__aexit__ = AsyncMock(return_value=None)
-        mock_client.get = AsyncMock(return_value=mock_response)
-        mock_client_cls.return_value = mock_client
+        mock_client = mock_http(mock_client_cls, mock_response)
 
         downloader = Downloader(output_root=tmp_path)
         result = await downloader.download(merchant)
@@ -83,27 +92,217 @@ async def test_download_rejects_tiny_file(tmp_path):
     assert result.error is not None
     assert "too small" in result.error.lower()
     # One GET only: size-check failure on a 200 must not trigger the retry loop.
-    assert mock_client.get.call_count == 1
+    assert mock_client.stream.call_count == 1
 
 
 @pytest.mark.asyncio
 async def test_download_all_runs_multiple(tmp_path):
     merchants = [make_merchant(url=f"https://example.com/file{i}.xlsx") for i in range(3)]
 
-    mock_response = MagicMock()
-    mock_response.status_code = 200
-    mock_response.headers = {"content-type": "application/octet-stream"}
-    mock_response.content = b"wine data " * 20  # > 100 bytes
+    mock_response = make_response(200, b"wine data " * 20)  # > 100 bytes
 
     with patch("corkscrew.downloader.httpx.AsyncClient") as mock_client_cls:
-        mock_client = AsyncMock()
-        mock_client.__aenter__ = AsyncMock(return_value=mock_client)
-        mock_client.__aexit__ = AsyncMock(return_value=None)
-        mock_client.get = AsyncMock(return_value=mock_response)
-        mock_client_cls.return_value = mock_client
+        mock_http(mock_client_cls, mock_response)
 
         downloader = Downloader(output_root=tmp_path)
         results = await downloader.download_all(merchants)
 
     assert len(results) == 3
     assert all(r.success for r in results)
+
+
+def make_partial(tmp_path, merchant, data: bytes) -> Path:
+    """Leave a partial download behind as an interrupted run would."""
+    out_dir = tmp_path / merchant.id / date.today().isoformat()
+    out_dir.mkdir(parents=True)
+    part = out_dir / f".{hashlib.sha1(merchant.preferred_download.url.encode()).hexdigest()[:12]}.part"
+    part.write_bytes(data)
+    return part
+
+
+@pytest.mark.asyncio
+async def test_download_resumes_partial_file_with_range(tmp_path):
+    merchant = make_merchant()
+    full = b"wine,vintage\n" + b"Petrus,2019\n" * 20
+    part = make_partial(tmp_path, merchant, full[:50])
+    _part_meta_path(part).write_text('{"validator": "\\"v1\\""}')
+
+    mock_response = make_response(206, full[50:], headers={"content-range": f"bytes 50-{len(full) - 1}/{len(full)}"})
+    with patch("corkscrew.downloader.httpx.AsyncClient") as mock_client_cls:
+        mock_client = mock_http(mock_client_cls, mock_response)
+        result = await Downloader(output_root=tmp_path).download(merchant)
+
+    assert result.success
+    sent_headers = mock_client.stream.call_args.kwargs["headers"]
+    assert sent_headers["Range"] == "bytes=50-"
+    assert sent_headers["If-Range"] == '"v1"'
+    assert Path(result.filepath).read_bytes() == full
+    assert not part.exists()
+
+
+@pytest.mark.asyncio
+async def test_download_does_not_append_an_encoded_range(tmp_path):
+    merchant = make_merchant()
+    full = b"wine,vintage\n" + b"Petrus,2019\n" * 20
+    part = make_partial(tmp_path, merchant, full[:50])
+    _part_meta_path(part).write_text('{"validator": "\\"v1\\""}')
+
+    # A server that gzips regardless: the range counts compressed bytes, so the
+    # decoded tail doesn't line up with the decoded partial file
+    gzipped = gzip.compress(full)
+    mock_response = make_response(206, full[-30:], headers={
+        "content-range": f"bytes 50-{len(gzipped) - 1}/{len(gzipped)}", "content-encoding": "gzip",
+    })
+    with patch("corkscrew.downloader.httpx.AsyncClient") as mock_client_cls, \
+            patch("corkscrew.downloader.RETRY_DELAYS", []):
+        mock_client = mock_http(mock_client_cls, mock_response)
+        result = await Downloader(output_root=tmp_path).download(merchant)
+
+    assert mock_client.stream.call_args.kwargs["headers"]["Accept-Encoding"] == "identity"
+    assert not result.success
+    assert not part.exists() and not _part_meta_path(part).exists()
+
+
+@pytest.mark.asyncio
+async def test_download_restarts_partial_without_validator(tmp_path):
+    merchant = make_merchant()
+    make_partial(tmp_path, merchant, b"stale partial bytes")
+
+    content = b"wine,vintage\n" + b"Latour,2015\n" * 20
+    with patch("corkscrew.downloader.httpx.AsyncClient") as mock_client_cls:
+        mock_client = mock_http(mock_client_cls, make_response(200, content))
+        result = await Downloader(output_root=tmp_path).download(merchant)
+
+    assert result.success
+    assert mock_client.stream.call_args.kwargs["headers"] == {"Accept-Encoding": "identity"}
+    assert Path(result.filepath).read_bytes() == content
+
+
+@pytest.mark.asyncio
+async def test_download_stores_text_formats_compressed(tmp_path):
+    from corkscrew.compression import open_raw
+    merchant = make_merchant(url="https://example.com/stock.csv", fmt="csv")
+    content = b"wine,vintage\nPetrus,2019\n" + b"x" * 200
+    with patch("corkscrew.downloader.httpx.AsyncClient") as mock_client_cls:
+        mock_http(mock_client_cls, make_response(200, content))
+        result = await Downloader(output_root=tmp_path, compression="gzip").download(merchant)
+
+    assert result.filepath.endswith("stock.csv.gz")
+    assert result.file_hash == hashlib.sha256(content).hexdigest()
+    assert result.bytes_downloaded == len(content)
+    with open_raw(Path(result.filepath)) as f:
+        assert f.read() == content
+
+
+def make_multi_format_merchant():
+    return MerchantConfig(
+        id="multi", name="Multi", country="UK", tier=1, enabled=True,
+        discovery_url="https://example.com",
+        downloads=[
+            DownloadConfig(url="https://example.com/list.pdf", format="pdf", preferred=True),
+            DownloadConfig(url="https://example.com/list.xlsx", format="xlsx"),
+            DownloadConfig(url="https://example.com/list.csv", format="csv"),
+        ],
+        url_pattern="static",
+    )
+
+
+def fake_downloads(tmp_path, delays, failing=()):
+    """A stand-in for Downloader._download_one: sleeps per format, then succeeds or fails."""
+    started = []
+
+    async def download_one(merchant, dl, ref_date):
+        started.append(dl.format)
+        await asyncio.sleep(delays.get(dl.format, 0))
+        if dl.format in failing:
+            return DownloadResult(merchant_id=merchant.id, status_code=503, bytes_downloaded=0,
+                                  changed=False, error="HTTP 503")
+        path = tmp_path / f"list.{dl.format}"
+        path.write_bytes(b"x" * 200)
+        return DownloadResult(merchant_id=merchant.id, filepath=str(path), file_hash="h", changed=True,
+                              status_code=200, bytes_downloaded=200)
+
+    return download_one, started
+
+
+def test_download_chain_prefers_cheap_formats_and_demotes_failures():
+    merchant = make_multi_format_merchant()
+    assert [d.format for d in download_chain(merchant)] == ["csv", "xlsx", "pdf"]
+    demoted = {"https://example.com/list.csv"}
+    assert [d.format for d in download_chain(merchant, demoted)] == ["xlsx", "pdf", "csv"]
+
+
+@pytest.mark.asyncio
+async def test_download_falls_back_to_next_format(tmp_path):
+    downloader = Downloader(output_root=tmp_path)
+    downloader._download_one, started = fake_downloads(tmp_path, {}, failing={"csv"})
+    result = await downloader.download(make_multi_format_merchant())
+    assert result.success and result.filepath.endswith(".xlsx")
+    assert started == ["csv", "xlsx"]
+    # The failed csv now goes last
+    started.clear()
+    await downloader.download(make_multi_format_merchant())
+    assert started == ["xlsx"]
+
+
+@pytest.mark.asyncio
+async def test_hedged_download_keeps_the_first_to_finish(tmp_path):
+    downloader = Downloader(output_root=tmp_path, hedge_after=0.05)
+    downloader._download_one, started = fake_downloads(tmp_path, {"csv": 5, "xlsx": 0.01})
+    result = await downloader.download(make_multi_format_merchant())
+    assert result.success and result.filepath.endswith(".xlsx")
+    assert started == ["csv", "xlsx"]
+    assert result.elapsed_seconds < 1
+
+
+@pytest.mark.asyncio
+async def test_cancelled_download_leaves_no_file_behind(tmp_path):
+    merchant = make_merchant(url="https://example.com/list.csv", fmt="csv")
+    downloader = Downloader(output_root=tmp_path)
+    store = downloader._store
+
+    def slow_store(filepath):
+        time.sleep(0.2)
+        return store(filepath)
+
+    downloader._store = slow_store
+    with patch("corkscrew.downloader.httpx.AsyncClient") as mock_client_cls:
+        mock_http(mock_client_cls, make_response(200, b"wine,vintage\n" + b"x" * 200))
+        # Cancelled mid-store, as the loser of a hedged race is
+        task = asyncio.create_task(downloader.download(merchant))
+        await asyncio.sleep(0.05)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+    day_dir = tmp_path / "test-merchant" / date.today().isoformat()
+    assert [p for p in day_dir.iterdir() if not p.name.startswith(".")] == []
+
+
+@pytest.mark.asyncio
+async def test_hedged_download_only_starts_alternate_when_slow(tmp_path):
+    downloader = Downloader(output_root=tmp_path, hedge_after=1)
+    downloader._download_one, started = fake_downloads(tmp_path, {"csv": 0.01})
+    result = await downloader.download(make_multi_format_merchant())
+    assert result.filepath.endswith(".csv")
+    assert started == ["csv"]
+
+
+@pytest.mark.asyncio
+async def test_precheck_records_announced_sizes_and_catches_truncation(tmp_path):
+    merchant = make_merchant(url="https://example.com/list.csv", fmt="csv")
+    head = make_response(200, headers={"content-length": "5000"})
+    body = make_response(200, b"wine,vintage\n" + b"x" * 300)  # chunked: no Content-Length of its own
+
+    with patch("corkscrew.downloader.httpx.AsyncClient") as mock_client_cls, \
+            patch("corkscrew.downloader.RETRY_DELAYS", []):
+        client = mock_http(mock_client_cls, body)
+        client.head = AsyncMock(return_value=head)
+        downloader = Downloader(output_root=tmp_path)
+        assert await downloader.precheck([merchant]) == {"test-merchant": 5000}
+        result = await downloader.download(merchant)
+
+    assert not result.success
+    assert "Truncated download (313 of 5000 bytes)" in result.error
+    # The partial file is kept so a retry can resume it
+    assert list((tmp_path / "test-merchant").rglob(".*.part"))
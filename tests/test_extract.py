@@ -0,0 +1,56 @@
+# tests/test_extract.py
+import pytest
+from corkscrew import extract
+from corkscrew.extract import extract_from_names
+from corkscrew.models import RecordBatch
+
+
+@pytest.fixture(autouse=True, params=["arrow", "python"])
+def name_engine(request, monkeypatch):
+    if request.param == "arrow":
+        pytest.importorskip("pyarrow")
+    else:
+        monkeypatch.setattr(extract, "pa", None)
+
+
+def make_batch(names, **columns):
+    return RecordBatch("m", "M", "u", "d", {"wine_name": names, **columns})
+
+
+def test_extracts_vintage_format_and_color():
+    batch = extract_from_names(make_batch([
+        "Château Latour 2010 Magnum 150cl",
+        "Krug Grande Cuvée NV 75cl",
+        "Domaine Leflaive Puligny-Montrachet Blanc 2018",
+        "Whispering Angel Rosé 2022 1.5L",
+        "Mystery wine",
+    ]))
+    assert batch.column("vintage") == ["2010", "NV", "2018", "2022", ""]
+    assert batch.column("format") == ["Magnum", "75cl", "", "1.5L", ""]
+    assert batch.column("color") == ["", "", "White", "Rosé", ""]
+
+
+def test_existing_values_win():
+    batch = extract_from_names(make_batch(["Latour 2010 Magnum"], vintage=["2011"], format=["75cl"]))
+    assert batch.column("vintage") == ["2011"]
+    assert batch.column("format") == ["75cl"]
+
+
+def test_estate_names_are_not_colours_or_vintages():
+    batch = extract_from_names(make_batch(["Château Cheval Blanc 2005", "Cuvée 12/2019 lot 20191"]))
+    assert batch.column("color") == ["", ""]
+    assert batch.column("vintage") == ["2005", ""]
+
+
+def test_white_wines_of_red_estates_keep_their_colour():
+    batch = extract_from_names(make_batch(["Château Haut-Brion Blanc 2015", "Clos Blanc de Vougeot 2019"]))
+    assert batch.column("color") == ["White", "White"]
+
+
+def test_repeated_names_are_broadcast():
+    batch = extract_from_names(make_batch(["Latour 2010", "Latour 2010", "Latour 2010"], vintage=["", "2009", ""]))
+    assert batch.column("vintage") == ["2010", "2009", "2010"]
+
+
+def test_empty_batch():
+    assert len(extract_from_names(RecordBatch("m", "M", "u", "d"))) == 0
@@ -0,0 +1,53 @@
+# tests/test_fx.py
+import os
+import pytest
+from corkscrew.fx import FxTable, infer_currency, load_fx_table
+from corkscrew.models import RecordBatch
+
+
+def test_infer_currency_from_field_then_price_then_country():
+    batch = RecordBatch("m", "M", "u", "d", {
+        "price": ["£12.50", "45 CHF", "US$30", "$20", "12.50", "12.50", "12.50"],
+        "currency": ["", "", "", "", "eur", "RMB", ""],
+    })
+    infer_currency(batch, "CA")
+    assert batch.columns["currency"] == ["GBP", "CHF", "USD", "CAD", "EUR", "RMB", "CAD"]
+
+    # "kr" only names a krone for a Scandinavian merchant; letters inside words don't count
+    batch = RecordBatch("m", "M", "u", "d", {"price": ["kr 250", "Europe 10"]})
+    infer_currency(batch, "UK")
+    assert batch.columns["currency"] == ["GBP", "GBP"]
+    batch = RecordBatch("m", "M", "u", "d", {"price": ["kr 250"]})
+    infer_currency(batch, "SE")
+    assert batch.columns["currency"] == ["SEK"]
+
+
+def test_fx_table_converts_at_the_rate_in_effect(tmp_path):
+    path = tmp_path / "fx_rates.csv"
+    path.write_text("date,currency,per_eur\n2026-03-01,GBP,0.80\n2026-03-10,GBP,0.90\n2026-03-01,JPY,160\n")
+    fx = FxTable.from_csv(path)
+
+    eur = fx.to_eur([1000, 1000, 1000, 1000, None, 16000, 1000],
+                    ["GBP", "GBP", "GBP", "EUR", "GBP", "JPY", "USD"],
+                    ["2026-02-01", "2026-03-09", "2026-03-10", "2026-03-10", "2026-03-10", "2026-03-10", "2026-03-10"])
+    assert eur.tolist()[:4] == [12.5, 12.5, 11.11, 10.0]
+    assert eur.isna().tolist() == [False] * 4 + [True, False, True]
+    assert eur[5] == 100.0
+    assert fx.convert(1000, "gbp", "2026-03-10") == 11.11
+    assert fx.convert(1000, "USD", "2026-03-10") is None
+    assert fx.rates_on("2026-03-10") is fx.rates_on("2026-03-10")
+
+    path.write_text("date,currency,per_eur\nyesterday,GBP,0.80\n")
+    with pytest.raises(ValueError, match="line 2"):
+        FxTable.from_csv(path)
+
+
+def test_load_fx_table_reads_the_file_once_until_it_changes(tmp_path):
+    path = tmp_path / "fx_rates.csv"
+    assert not load_fx_table(path)
+    path.write_text("date,currency,per_eur\n2026-03-01,GBP,0.80\n")
+    fx = load_fx_table(path)
+    assert load_fx_table(path) is fx
+    path.write_text("date,currency,per_eur\n2026-03-01,GBP,0.85\n")
+    os.utime(path, ns=(1, 1))
+    assert load_fx_table(path).convert(850, "GBP", "2026-03-01") == 10.0
@@ -0,0 +1,54 @@
+# tests/test_health.py
+import json
+import subprocess
+import sys
+from corkscrew.health import build_summary, merchant_health, read_summary, write_summary
+
+
+def history(n, changed=False):
+    return [{"date": "2026-01-01", "hash": "h", "status": "success", "changed": changed}] * n
+
+
+def test_merchant_health_labels():
+    assert merchant_health({}) == "PENDING"
+    assert merchant_health({"last_run": "2026-01-01T00:00:00", "changed": True, "history": history(1)}) == "OK"
+    assert merchant_health({"last_run": "2026-01-01T00:00:00", "changed": False, "history": history(6)}) == "STALE"
+    assert merchant_health({"last_run": "2026-01-01T00:00:00", "consecutive_failures": 1}) == "FAILED"
+    assert merchant_health({"last_run": "2026-01-01T00:00:00", "consecutive_failures": 3}) == "WARN"
+    assert merchant_health({"last_run": "2026-01-01T00:00:00", "consecutive_failures": 7}) == "CRITICAL"
+
+
+def test_summary_counts_and_round_trip(tmp_path):
+    states = {
+        "a": {"last_run": "2026-01-02T10:00:00+00:00", "changed": True, "history": history(1)},
+        "b": {"last_run": "2026-01-03T10:00:00+00:00", "consecutive_failures": 4},
+    }
+    summary = build_summary([("a", "A"), ("b", "B"), ("c", "C")], states)
+    assert summary["counts"]["OK"] == 1 and summary["counts"]["WARN"] == 1 and summary["counts"]["PENDING"] == 1
+    assert summary["last_run"] == "2026-01-03T10:00:00+00:00"
+    assert summary["merchants"]["b"]["failure_streak"] == 4
+
+    path = tmp_path / "status.json"
+    write_summary(path, summary)
+    assert read_summary(path) == summary
+    assert [p.name for p in tmp_path.iterdir()] == ["status.json"]
+    path.write_text(json.dumps({"version": 0}))
+    assert read_summary(path) is None
+
+
+def test_status_json_imports_no_heavy_modules(tmp_path):
+    code = (
+        "import sys\n"
+        "from corkscrew.cli import cli\n"
+        "try:\n"
+        "    cli(['status', '--json'])\n"
+        "except SystemExit:\n"
+        "    pass\n"
+        "heavy = [m for m in ('pandas', 'httpx', 'pydantic', 'rich') if m in sys.modules]\n"
+        "sys.stderr.write(repr(heavy))\n"
+    )
+    (tmp_path / "data").mkdir()
+    write_summary(tmp_path / "data" / "status.json", build_summary([], {}))
+    out = subprocess.run([sys.executable, "-c", code], cwd=tmp_path, capture_output=True, text=True)
+    assert json.loads(out.stdout)["total"] == 0
+    assert out.stderr.strip().endswith("[]")
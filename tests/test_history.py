@@ -0,0 +1,68 @@
+# tests/test_history.py
+import os
+import sqlite3
+import pytest
+from corkscrew.history import HistoryStore
+from corkscrew.models import RecordBatch
+from corkscrew.pipeline import write_records_csv
+from corkscrew.typed import typed_columns
+
+
+def write_snapshot(root, merchant_id, day, wines, prices):
+    batch = RecordBatch(merchant_id, merchant_id.title(), "https://example.com/list.csv", day,
+                        {"wine_name": wines, "price": prices, "vintage": ["2019"] * len(wines)})
+    batch.typed = typed_columns(batch, "UK")
+    return write_records_csv(batch, root / merchant_id / f"{day}.csv")
+
+
+def test_sync_loads_new_and_changed_files_only(tmp_path):
+    root = tmp_path / "normalized"
+    write_snapshot(root, "a", "2026-01-01", ["Petrus", "Latour"], ["100.00", "50.00"])
+    write_snapshot(root, "b", "2026-01-01", ["Petrus"], ["110.00"])
+    with HistoryStore(tmp_path / "history.db") as store:
+        assert store.sync(root) == (2, 0, 0)
+        assert store.sync(root) == (0, 2, 0)
+
+        path = write_snapshot(root, "a", "2026-01-01", ["Petrus"], ["95.00"])
+        os.utime(path, ns=(0, 1))  # a rewrite within the same mtime tick still counts
+        write_snapshot(root, "a", "2026-01-02", ["Petrus"], [""])
+        assert store.sync(root) == (2, 1, 0)
+
+        _, rows = store.query(
+            "SELECT merchant_id, download_date, price_minor, vintage_year FROM wines"
+            " WHERE wine_name = ? ORDER BY download_date, merchant_id", ["petrus"])
+        assert rows == [("a", "2026-01-01", 9500, 2019), ("b", "2026-01-01", 11000, 2019),
+                        ("a", "2026-01-02", None, 2019)]
+        _, latest = store.query("SELECT merchant_id, download_date FROM latest ORDER BY merchant_id")
+        assert latest == [("a", "2026-01-02"), ("b", "2026-01-01")]
+
+
+def test_sync_drops_snapshots_whose_csv_was_removed(tmp_path):
+    root = tmp_path / "normalized"
+    write_snapshot(root, "a", "2026-01-01", ["Petrus"], ["100.00"])
+    path = write_snapshot(root, "a", "2026-01-02", ["Petrus"], ["95.00"])
+    with HistoryStore(tmp_path / "history.db") as store:
+        store.sync(root)
+        assert not store.behind(root)
+        path.unlink()
+        assert store.behind(root)
+        assert store.sync(root) == (0, 1, 1)
+        assert not store.behind(root)
+        _, rows = store.query("SELECT download_date FROM wines UNION ALL SELECT download_date FROM snapshots")
+        assert rows == [("2026-01-01",), ("2026-01-01",)]
+
+
+def test_name_searches_use_the_index(tmp_path):
+    with HistoryStore(tmp_path / "history.db") as store:
+        _, plan = store.query("EXPLAIN QUERY PLAN SELECT * FROM wines WHERE wine_name LIKE 'chateau%'")
+    assert any("wines_name" in row[-1] for row in plan)
+
+
+def test_readonly_store_rejects_writes(tmp_path):
+    write_snapshot(tmp_path / "normalized", "a", "2026-01-01", ["Petrus"], ["100.00"])
+    with HistoryStore(tmp_path / "history.db") as store:
+        store.sync(tmp_path / "normalized")
+    with HistoryStore(tmp_path / "history.db", readonly=True) as store:
+        assert store.query("SELECT COUNT(*) FROM wines")[1] == [(1,)]
+        with pytest.raises(sqlite3.OperationalError):
+            store.query("DELETE FROM wines")
@@ -1,7 +1,7 @@
 # tests/test_models.py
 import pytest
 from pydantic import ValidationError
-from corkscrew.models import DownloadConfig, MerchantConfig, WineRecord, DownloadResult, MerchantState
+from corkscrew.models import DownloadConfig, MerchantConfig, WineRecord, DownloadResult, MerchantState, RecordBatch, WINE_FIELDS
 
 def test_download_config_requires_url_and_format():
     with pytest.raises(ValidationError):
@@ -73,3 +73,63 @@ def test_merchant_config_requires_at_least_one_download():
             downloads=[],  # empty list should fail
             url_pattern="static",
         )
+
+def make_batch():
+    return RecordBatch(
+        "test", "Test", "https://x.com", "2026-02-23",
+        {"wine_name": ["Pétrus", "Latour"], "price": ["4500", "800"], "currency": ["GBP", "GBP"]},
+    )
+
+def test_record_batch_rows_match_wine_records():
+    batch = make_batch()
+    assert len(batch) == 2
+    assert batch[1] == WineRecord(
+        merchant_id="test", merchant_name="Test", wine_name="Latour", price="800", currency="GBP",
+        source_url="https://x.com", download_date="2026-02-23",
+    )
+    assert [r.wine_name for r in batch] == ["Pétrus", "Latour"]
+    assert batch.to_rows()[0] == batch[0].to_row()
+    assert list(batch.to_rows()[0]) == list(WINE_FIELDS)
+
+def test_record_batch_to_frame():
+    df = make_batch().to_frame()
+    assert list(df.columns) == list(WINE_FIELDS)
+    assert df["merchant_id"].tolist() == ["test", "test"]
+    assert df["vintage"].tolist() == ["", ""]
+
+def test_record_batch_interns_repeated_strings():
+    batch = RecordBatch("t", "T", "u", "d", {"currency": ["".join(["G", "BP"]), "".join(["GB", "P"])]})
+    assert batch.columns["currency"][0] is batch.columns["currency"][1]
+
+def test_record_batch_rejects_mismatched_columns():
+    with pytest.raises(ValueError):
+        RecordBatch("t", "T", "u", "d", {"wine_name": ["a"], "price": ["1", "2"]})
+    with pytest.raises(ValueError):
+        RecordBatch("t", "T", "u", "d", {"merchant_id": ["x"]})
+
+def test_record_batch_from_records_round_trips():
+    batch = make_batch()
+    assert RecordBatch.from_records(batch).to_rows() == batch.to_rows()
+
+def test_record_batch_concat_fills_missing_columns():
+    other = RecordBatch("test", "Test", "https://x.com", "2026-02-23", {"wine_name": ["Krug"], "vintage": ["NV"]})
+    joined = RecordBatch.concat([make_batch(), other])
+    assert len(joined) == 3
+    assert joined.column("wine_name") == ["Pétrus", "Latour", "Krug"]
+    assert joined.column("vintage") == ["", "", "NV"]
+    assert joined.column("price") == ["4500", "800", ""]
+    with pytest.raises(ValueError):
+        RecordBatch.concat([])
+
+
+def test_merchant_config_download_for_format():
+    mc = MerchantConfig(
+        id="x", name="X", country="UK", tier=1, enabled=True, discovery_url="https://example.com",
+        downloads=[
+            DownloadConfig(url="https://example.com/a.xlsx", format="xlsx", preferred=True),
+            DownloadConfig(url="https://example.com/a.csv", format="csv"),
+        ],
+        url_pattern="static",
+    )
+    assert mc.download_for("csv").url == "https://example.com/a.csv"
+    assert mc.download_for("pdf").url == "https://example.com/a.xlsx"
@@ -3,7 +3,7 @@ import pytest
 import pandas as pd
 from pathlib import Path
 from datetime import date
-from corkscrew.normalizer import NormalizerRegistry, CSVNormalizer, XLSXNormalizer, PDFNormalizer, JSONNormalizer, NormalizationError
+from corkscrew.normalizer import NormalizerRegistry, CSVNormalizer, TXTNormalizer, XLSXNormalizer, PDFNormalizer, JSONNormalizer, NormalizationError
 from corkscrew.models import MerchantConfig, DownloadConfig, WineRecord
 
 FIXTURES = Path(__file__).parent / "fixtures"
@@ -35,16 +35,36 @@ def test_csv_normalizer_with_column_map():
     assert records[0].merchant_id == "test"
     assert records[0].download_date == "2026-02-23"
 
-def test_csv_normalizer_missing_column_skips_gracefully():
+def test_csv_normalizer_missing_column_fails_fast():
     # column_map references a column that doesn't exist in the CSV
     merchant = make_merchant(column_map={
         "Wine": "wine_name",
         "NonExistent": "region",
     })
     normalizer = CSVNormalizer()
-    records = normalizer.normalize(FIXTURES / "sample_wines.csv", merchant, download_date="2026-02-23")
+    with pytest.raises(NormalizationError, match="NonExistent"):
+        normalizer.normalize(FIXTURES / "sample_wines.csv", merchant, download_date="2026-02-23")
+
+
+def test_csv_normalizer_reads_only_mapped_columns(monkeypatch):
+    seen = {}
+    original = pd.read_csv
+
+    def spy(*args, **kwargs):
+        if kwargs.get("nrows") != 0:
+            seen["usecols"] = kwargs.get("usecols")
+        return original(*args, **kwargs)
+
+    monkeypatch.setattr("corkscrew.normalizer.pd.read_csv", spy)
+    merchant = make_merchant(column_map={"Wine": "wine_name", "Price": "price"})
+    records = CSVNormalizer().normalize(FIXTURES / "sample_wines.csv", merchant, download_date="2026-02-23")
+    assert seen["usecols"] == ["Wine", "Price"]
+    assert records[1].price == "650"
+
+
+def test_csv_normalizer_without_column_map_keeps_row_count():
+    records = CSVNormalizer().normalize(FIXTURES / "sample_wines.csv", make_merchant(), download_date="2026-02-23")
     assert len(records) == 3
-    assert records[0].region == ""  # missing col defaults to empty
 
 def test_xlsx_normalizer(tmp_path):
     # Create a simple xlsx fixture
@@ -68,6 +88,42 @@ def test_xlsx_normalizer(tmp_path):
     assert len(records) == 2
     assert records[0].wine_name == "Latour"
 
+def test_xlsx_normalizer_projects_wide_sheet(tmp_path):
+    df = pd.DataFrame({f"Extra {i}": ["x", "y"] for i in range(30)})
+    df.insert(3, "Wine", ["Latour", "Margaux"])
+    df.insert(10, "Price", [800.0, 600.5])
+    xlsx_path = tmp_path / "wide.xlsx"
+    df.to_excel(xlsx_path, index=False)
+
+    merchant = make_merchant(column_map={"Wine": "wine_name", "Price": "price"})
+    records = XLSXNormalizer().normalize(xlsx_path, merchant, download_date="2026-02-23")
+    assert [(r.wine_name, r.price) for r in records] == [("Latour", "800"), ("Margaux", "600.5")]
+
+
+def test_xlsx_row_count_does_not_depend_on_column_map(tmp_path):
+    import openpyxl
+    wb = openpyxl.Workbook()
+    for row in (["Notes", "Wine", "Price"], [None, "Latour", 800], ["Bordeaux", None, None], [None, None, None],
+                ["en primeur", "Margaux", 600]):
+        wb.active.append(row)
+    xlsx_path = tmp_path / "notes.xlsx"
+    wb.save(xlsx_path)
+
+    unmapped = XLSXNormalizer().normalize(xlsx_path, make_merchant(), download_date="2026-02-23")
+    mapped = XLSXNormalizer().normalize(xlsx_path, make_merchant(column_map={"Wine": "wine_name"}),
+                                        download_date="2026-02-23")
+    assert len(unmapped) == len(mapped) == 3
+    assert mapped.column("wine_name") == ["Latour", "", "Margaux"]
+
+
+def test_xlsx_normalizer_missing_column_fails_fast(tmp_path):
+    xlsx_path = tmp_path / "wines.xlsx"
+    pd.DataFrame({"Wine": ["Latour"]}).to_excel(xlsx_path, index=False)
+    merchant = make_merchant(column_map={"Wine": "wine_name", "Prix": "price"})
+    with pytest.raises(NormalizationError, match="Prix"):
+        XLSXNormalizer().normalize(xlsx_path, merchant, download_date="2026-02-23")
+
+
 def test_pdf_normalizer_returns_empty_with_warning(tmp_path, caplog):
     import logging
     pdf_path = tmp_path / "price.pdf"
@@ -76,7 +132,7 @@ def test_pdf_normalizer_returns_empty_with_warning(tmp_path, caplog):
     normalizer = PDFNormalizer()
     with caplog.at_level(logging.WARNING):
         records = normalizer.normalize(pdf_path, merchant, download_date="2026-02-23")
-    assert records == []
+    assert len(records) == 0
     assert "PDF normalization" in caplog.text
 
 def test_registry_dispatches_by_format(tmp_path):
@@ -133,3 +189,189 @@ def test_json_normalizer_no_list_keys_raises(tmp_path):
     normalizer = JSONNormalizer()
     with pytest.raises(NormalizationError, match="no list-valued keys"):
         normalizer.normalize(p, merchant, download_date="2026-02-23")
+
+def test_registry_adds_typed_columns_with_merchant_locale(tmp_path):
+    p = tmp_path / "fr.csv"
+    p.write_text('Vin,Millesime,Prix,Format\nPétrus,2015,"1.250,00",75cl\nKrug,NV,1.250,Magnum\n')
+    merchant = make_merchant(column_map={"Vin": "wine_name", "Millesime": "vintage", "Prix": "price", "Format": "format"})
+    merchant.country = "FR"
+    batch = NormalizerRegistry().normalize(p, merchant, download_date="2026-02-23")
+    assert batch[1].price == "1.250"
+    assert batch.typed["price_minor"].tolist() == [125000, 125000]
+    assert batch.typed["vintage_year"].tolist()[0] == 2015
+    assert pd.isna(batch.typed["vintage_year"].iloc[1])
+    assert batch.typed["format_ml"].tolist() == [750, 1500]
+
+
+def _json_merchant(json_path=None):
+    merchant = make_merchant(column_map={"Wine": "wine_name", "Price": "price"})
+    return merchant.model_copy(update={"json_path": json_path})
+
+
+def test_json_normalizer_reads_configured_path(tmp_path):
+    import json
+    data = {"meta": {"tags": ["a"]}, "data": {"products": [{"Wine": "Petrus", "Price": 4500.5}, "junk"]}}
+    p = tmp_path / "api.json"
+    p.write_text(json.dumps(data))
+    records = JSONNormalizer().normalize(p, _json_merchant("$.data.products"), download_date="2026-02-23")
+    assert [(r.wine_name, r.price) for r in records] == [("Petrus", "4500.5")]
+
+
+def test_json_normalizer_top_level_list_with_bom(tmp_path):
+    p = tmp_path / "list.json"
+    p.write_bytes(b'\xef\xbb\xbf[{"Wine": "Krug", "Price": 1e3}]')
+    records = JSONNormalizer().normalize(p, _json_merchant(), download_date="2026-02-23")
+    assert [(r.wine_name, r.price) for r in records] == [("Krug", "1000")]
+
+
+def test_json_normalizer_path_not_a_list_raises(tmp_path):
+    p = tmp_path / "api.json"
+    p.write_text('{"data": {"products": {"Wine": "Petrus"}}}')
+    with pytest.raises(NormalizationError, match="data.products"):
+        JSONNormalizer().normalize(p, _json_merchant("data.products"), download_date="2026-02-23")
+
+
+def test_json_normalizer_empty_list_at_path_is_not_an_error(tmp_path):
+    p = tmp_path / "api.json"
+    p.write_text('{"data": {"products": []}}')
+    assert len(JSONNormalizer().normalize(p, _json_merchant("data.products"), download_date="2026-02-23")) == 0
+
+
+def test_json_normalizer_invalid_json_raises(tmp_path):
+    p = tmp_path / "broken.json"
+    p.write_text('{"wines": [{"Wine": "Petrus"')
+    with pytest.raises(NormalizationError, match="JSON read failed"):
+        JSONNormalizer().normalize(p, _json_merchant("wines"), download_date="2026-02-23")
+
+
+def test_json_normalizer_maps_items_in_batches(tmp_path, monkeypatch):
+    import json
+    from corkscrew import normalizer
+    monkeypatch.setattr(normalizer, "ITEM_BATCH_SIZE", 3)
+    p = tmp_path / "wines.json"
+    p.write_text(json.dumps({"wines": [{"Wine": f"Wine {i}", "Price": str(i)} for i in range(10)]}))
+    records = JSONNormalizer().normalize(p, _json_merchant("wines"), download_date="2026-02-23")
+    assert len(records) == 10
+    assert records.column("wine_name")[-1] == "Wine 9"
+    assert records.column("price") == [str(i) for i in range(10)]
+
+
+def test_txt_normalizer_reads_delimited_and_one_column_lists(tmp_path):
+    p = tmp_path / "list.txt"
+    p.write_text('Wine\nChateau Margaux 2015\n"Clos" du Mesnil\nPetrus 2019\n')
+    records = TXTNormalizer().normalize(p, make_merchant(column_map={"Wine": "wine_name"}), download_date="2026-02-23")
+    assert records.column("wine_name") == ["Chateau Margaux 2015", '"Clos" du Mesnil', "Petrus 2019"]
+
+    p.write_text("Wine;Price\nRousseau;1200\nLeroy;3400\n")
+    merchant = make_merchant(column_map={"Wine": "wine_name", "Price": "price"})
+    records = TXTNormalizer().normalize(p, merchant, download_date="2026-02-23")
+    assert [(r.wine_name, r.price) for r in records] == [("Rousseau", "1200"), ("Leroy", "3400")]
+
+
+def _zip(tmp_path, members: dict):
+    import zipfile
+    p = tmp_path / "lists.zip"
+    with zipfile.ZipFile(p, "w", zipfile.ZIP_DEFLATED) as zf:
+        for name, data in members.items():
+            zf.writestr(name, data)
+    return p
+
+
+def _archive_merchant(archive_members=None):
+    merchant = make_merchant(column_map={"Wine": "wine_name", "Price": "price"})
+    return merchant.model_copy(update={"archive_members": archive_members, "json_path": "wines"})
+
+
+def test_archive_normalizer_dispatches_members_by_extension(tmp_path):
+    p = _zip(tmp_path, {
+        "bordeaux.csv": "Wine,Price\nPetrus,4500.00\nLatour,800\n",
+        "json/champagne.json": '{"wines": [{"Wine": "Krug", "Price": 250}]}',
+        "burgundy.txt": "Wine\tPrice\nRousseau\t1200\n",
+        "readme.md": "ignored",
+        "__MACOSX/._bordeaux.csv": "ignored",
+    })
+    records = NormalizerRegistry().normalize(p, _archive_merchant(), download_date="2026-02-23")
+    assert [(r.wine_name, r.price) for r in records] == [
+        ("Petrus", "4500"), ("Latour", "800"), ("Krug", "250"), ("Rousseau", "1200"),
+    ]
+    assert records.typed["price_minor"][2] == 25000
+
+
+def test_archive_normalizer_selects_members_by_glob(tmp_path):
+    p = _zip(tmp_path, {"stock/current.csv": "Wine,Price\nPetrus,4500\n", "stock/old.csv": "Wine,Price\nOld,1\n"})
+    records = NormalizerRegistry().normalize(p, _archive_merchant(["stock/cur*"]), download_date="2026-02-23")
+    assert [r.wine_name for r in records] == ["Petrus"]
+
+
+def test_archive_normalizer_member_errors(tmp_path):
+    p = _zip(tmp_path, {"notes.md": "nothing here"})
+    with pytest.raises(NormalizationError, match="no members"):
+        NormalizerRegistry().normalize(p, _archive_merchant(), download_date="2026-02-23")
+    with pytest.raises(NormalizationError, match="no normalizer"):
+        NormalizerRegistry().normalize(p, _archive_merchant(["*.md"]), download_date="2026-02-23")
+    bad = tmp_path / "bad.zip"
+    bad.write_bytes(b"not a zip")
+    with pytest.raises(NormalizationError, match="ZIP read failed"):
+        NormalizerRegistry().normalize(bad, _archive_merchant(), download_date="2026-02-23")
+
+
+def test_archive_normalizer_reads_xlsx_members(tmp_path):
+    import io, openpyxl
+    wb = openpyxl.Workbook()
+    wb.active.append(["Wine", "Price"])
+    wb.active.append(["Margaux", 900])
+    out = io.BytesIO()
+    wb.save(out)
+    p = _zip(tmp_path, {"list.xlsx": out.getvalue()})
+    records = NormalizerRegistry().normalize(p, _archive_merchant(), download_date="2026-02-23")
+    assert [(r.wine_name, r.price) for r in records] == [("Margaux", "900")]
+
+
+def _workbook(tmp_path, sheets: dict):
+    import openpyxl
+    wb = openpyxl.Workbook()
+    wb.remove(wb.active)
+    for title, rows in sheets.items():
+        ws = wb.create_sheet(title)
+        for row in rows:
+            ws.append(row)
+    p = tmp_path / "stock.xlsx"
+    wb.save(p)
+    return p
+
+
+def _sheet_merchant(sheets):
+    merchant = make_merchant(column_map={"Wine": "wine_name", "Price": "price"})
+    return merchant.model_copy(update={"sheets": sheets})
+
+
+@pytest.fixture
+def regional_workbook(tmp_path):
+    return _workbook(tmp_path, {
+        "Bordeaux": [["Wine", "Price"], ["Petrus", 4500], ["Latour", 800]],
+        "Burgundy": [["Price", "Wine"], [1200, "Rousseau"]],
+        "Notes": [["Prices ex VAT"]],
+    })
+
+
+def test_xlsx_normalizer_reads_first_sheet_by_default(regional_workbook):
+    records = XLSXNormalizer().normalize(regional_workbook, _sheet_merchant(None), download_date="2026-02-23")
+    assert [(r.wine_name, r.sheet) for r in records] == [("Petrus", "Bordeaux"), ("Latour", "Bordeaux")]
+
+
+@pytest.mark.parametrize("sheets", [["Burgundy", "Bordeaux"], "^B"])
+def test_xlsx_normalizer_reads_selected_sheets_in_workbook_order(regional_workbook, sheets):
+    records = XLSXNormalizer().normalize(regional_workbook, _sheet_merchant(sheets), download_date="2026-02-23")
+    assert [(r.wine_name, r.price, r.sheet) for r in records] == [
+        ("Petrus", "4500", "Bordeaux"), ("Latour", "800", "Bordeaux"), ("Rousseau", "1200", "Burgundy"),
+    ]
+
+
+def test_xlsx_normalizer_sheet_selection_errors(regional_workbook):
+    with pytest.raises(NormalizationError, match="Champagne"):
+        XLSXNormalizer().normalize(regional_workbook, _sheet_merchant(["Champagne"]), download_date="2026-02-23")
+    with pytest.raises(NormalizationError, match="no sheet matches"):
+        XLSXNormalizer().normalize(regional_workbook, _sheet_merchant("^Rh"), download_date="2026-02-23")
+    # "all" includes Notes, which lacks the mapped columns
+    with pytest.raises(NormalizationError, match="not found"):
+        XLSXNormalizer().normalize(regional_workbook, _sheet_merchant("all"), download_date="2026-02-23")
@@ -0,0 +1,61 @@
+# tests/test_partition.py
+import pandas as pd
+from corkscrew.partition import PartitionWriter, read_catalog, select_partitions
+
+
+def frame(merchant_id, prices, currency="EUR"):
+    return pd.DataFrame({
+        "merchant_id": merchant_id,
+        "wine_name": [f"wine {i}" for i in range(len(prices))],
+        "currency": currency,
+        "download_date": "2026-03-01",
+        "price_minor": pd.array(prices, dtype="Int64"),
+    })
+
+
+def test_partitions_are_written_hive_style_with_a_catalog(tmp_path):
+    out = tmp_path / "partitioned"
+    writer = PartitionWriter(out)
+    writer.write("FR", "lavinia", frame("lavinia", [1500, None, 9900]))
+    writer.write("UK", "farr", frame("farr", [None], currency="GBP"))
+    catalog = writer.commit()
+
+    assert catalog == read_catalog(out)
+    assert catalog["rows"] == 4
+    fr, uk = catalog["partitions"]
+    assert fr["path"] == "country=FR/merchant_id=lavinia/part-0.csv"
+    assert (fr["rows"], fr["min_price_minor"], fr["max_price_minor"], fr["currencies"]) == (3, 1500, 9900, ["EUR"])
+    assert (uk["min_price_minor"], uk["max_price_minor"]) == (None, None)
+    written = pd.read_csv(out / fr["path"])
+    assert "merchant_id" not in written.columns and len(written) == 3
+
+
+def test_rewrite_swaps_in_the_new_dataset_and_keeps_one_previous(tmp_path):
+    out = tmp_path / "partitioned"
+    out.mkdir()
+    (out / "stale.csv").write_text("from before versions were kept\n")
+    versions = []
+    for merchant_id in ("gone", "lavinia", "farr"):
+        writer = PartitionWriter(out)
+        writer.write("FR", merchant_id, frame(merchant_id, [100]))
+        writer.commit()
+        versions.append(out.resolve())
+
+    assert out.is_symlink() and read_catalog(out)["partitions"][0]["merchant_id"] == "farr"
+    assert not (out / "country=FR" / "merchant_id=lavinia").exists()
+    # The version before is kept for readers still reading it, older ones go
+    assert sorted(p.name for p in (tmp_path / ".partitioned.d").iterdir()) == sorted(v.name for v in versions[1:])
+    assert sorted(p.name for p in tmp_path.iterdir()) == [".partitioned.d", "partitioned"]
+
+
+def test_select_partitions_prunes_by_country_merchant_and_price():
+    catalog = {"partitions": [
+        {"country": "FR", "merchant_id": "a", "min_price_minor": 1000, "max_price_minor": 5000},
+        {"country": "FR", "merchant_id": "b", "min_price_minor": None, "max_price_minor": None},
+        {"country": "UK", "merchant_id": "c", "min_price_minor": 6000, "max_price_minor": 9000},
+    ]}
+    ids = lambda parts: [p["merchant_id"] for p in parts]
+    assert ids(select_partitions(catalog, countries=["fr"])) == ["a", "b"]
+    assert ids(select_partitions(catalog, merchant_ids=["c"])) == ["c"]
+    assert ids(select_partitions(catalog, min_price_minor=5500)) == ["c"]
+    assert ids(select_partitions(catalog, countries=["FR"], max_price_minor=2000)) == ["a"]
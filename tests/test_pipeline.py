@@ -0,0 +1,237 @@
+import asyncio
+from datetime import date
+import pytest
+import pandas as pd
+from pathlib import Path
+from corkscrew.models import MerchantConfig, DownloadConfig, DownloadResult
+from corkscrew.normalizer import NormalizerRegistry
+from corkscrew.pipeline import RunPipeline
+from corkscrew.storage import NormalizeManifest, StorageManager, compute_hash
+
+
+def make_merchant(merchant_id):
+    return MerchantConfig(
+        id=merchant_id, name=merchant_id, country="UK", tier=1, enabled=True,
+        discovery_url="https://example.com",
+        downloads=[DownloadConfig(url=f"https://example.com/{merchant_id}.csv", format="csv", preferred=True)],
+        url_pattern="static",
+        column_map={"Wine": "wine_name", "Vintage": "vintage"},
+    )
+
+
+class FakeDownloader:
+    """Writes a small CSV per merchant after an optional per-merchant delay."""
+
+    def __init__(self, root: Path, delays=None, failures=()):
+        self.root = root
+        self.delays = delays or {}
+        self.failures = set(failures)
+        self.downloaded: list[str] = []
+
+    async def download(self, merchant, ref_date=None):
+        await asyncio.sleep(self.delays.get(merchant.id, 0))
+        self.downloaded.append(merchant.id)
+        if merchant.id in self.failures:
+            return DownloadResult(merchant_id=merchant.id, status_code=503, bytes_downloaded=0,
+                                  changed=False, error="HTTP 503")
+        path = self.root / merchant.id / "list.csv"
+        path.parent.mkdir(parents=True, exist_ok=True)
+        pd.DataFrame({"Wine": [f"{merchant.id} wine"], "Vintage": ["2019"]}).to_csv(path, index=False)
+        return DownloadResult(merchant_id=merchant.id, filepath=str(path), file_hash=compute_hash(path),
+                              changed=True, status_code=200, bytes_downloaded=path.stat().st_size)
+
+
+def make_pipeline(tmp_path, downloader, storage=None, **kwargs):
+    return RunPipeline(
+        downloader,
+        storage or StorageManager(tmp_path / "state.json"),
+        NormalizerRegistry(),
+        normalized_root=tmp_path / "normalized",
+        **kwargs,
+    )
+
+
+@pytest.mark.asyncio
+async def test_pipeline_normalizes_changed_merchants(tmp_path):
+    merchants = [make_merchant(f"m{i}") for i in range(3)]
+    pipeline = make_pipeline(tmp_path, FakeDownloader(tmp_path / "raw"))
+    outcomes = await pipeline.run(merchants)
+    assert sorted(o.merchant.id for o in outcomes) == ["m0", "m1", "m2"]
+    assert all(o.changed and o.records == 1 for o in outcomes)
+    for o in outcomes:
+        df = pd.read_csv(o.out_path, dtype=str)
+        assert df.loc[0, "wine_name"] == f"{o.merchant.id} wine"
+
+
+@pytest.mark.asyncio
+async def test_pipeline_skips_normalization_when_unchanged(tmp_path):
+    merchants = [make_merchant("m0")]
+    storage = StorageManager(tmp_path / "state.json")
+    await make_pipeline(tmp_path, FakeDownloader(tmp_path / "raw"), storage=storage).run(merchants)
+    outcomes = await make_pipeline(tmp_path, FakeDownloader(tmp_path / "raw"), storage=storage).run(merchants)
+    assert outcomes[0].changed is False
+    assert outcomes[0].records == 0
+    assert len(storage.get_merchant_state("m0").history) == 2
+
+
+@pytest.mark.asyncio
+async def test_pipeline_records_failures(tmp_path):
+    merchants = [make_merchant("ok"), make_merchant("broken")]
+    storage = StorageManager(tmp_path / "state.json")
+    pipeline = make_pipeline(tmp_path, FakeDownloader(tmp_path / "raw", failures=["broken"]), storage=storage)
+    outcomes = {o.merchant.id: o for o in await pipeline.run(merchants)}
+    assert not outcomes["broken"].success
+    assert storage.get_merchant_state("broken").consecutive_failures == 1
+    assert outcomes["ok"].records == 1
+
+
+@pytest.mark.asyncio
+async def test_slow_merchant_does_not_block_others(tmp_path):
+    merchants = [make_merchant("slow"), make_merchant("fast1"), make_merchant("fast2")]
+    downloader = FakeDownloader(tmp_path / "raw", delays={"slow": 0.5})
+    streamed = []
+    pipeline = make_pipeline(tmp_path, downloader, on_outcome=lambda o: streamed.append(o.merchant.id))
+    await pipeline.run(merchants)
+    assert streamed[-1] == "slow"
+    assert set(streamed[:2]) == {"fast1", "fast2"}
+
+
+@pytest.mark.asyncio
+async def test_failing_stage_stops_the_run_instead_of_hanging(tmp_path):
+    def broken_callback(outcome):
+        raise RuntimeError("display failed")
+
+    merchants = [make_merchant(f"m{i}") for i in range(10)]
+    pipeline = make_pipeline(tmp_path, FakeDownloader(tmp_path / "raw", failures=["m0"]),
+                             on_outcome=broken_callback, queue_size=1)
+    with pytest.raises(RuntimeError, match="display failed"):
+        await asyncio.wait_for(pipeline.run(merchants), timeout=5)
+
+
+@pytest.mark.asyncio
+async def test_bounded_queue_applies_backpressure(tmp_path):
+    merchants = [make_merchant(f"m{i}") for i in range(6)]
+    downloader = FakeDownloader(tmp_path / "raw")
+    pipeline = make_pipeline(tmp_path, downloader, queue_size=1, download_workers=1)
+
+    release = asyncio.Event()
+    state_stage = pipeline._state_stage
+
+    async def stalled_state_stage(*args):
+        await release.wait()
+        return await state_stage(*args)
+
+    pipeline._state_stage = stalled_state_stage
+    run = asyncio.create_task(pipeline.run(merchants))
+    await asyncio.sleep(0.1)
+    # One result sits in the queue and the worker is parked on put() with the
+    # next; the remaining merchants have not been downloaded yet.
+    assert len(downloader.downloaded) == 2
+    release.set()
+    outcomes = await run
+    assert len(outcomes) == 6
+
+
+@pytest.mark.asyncio
+async def test_resumed_run_only_does_unfinished_work(tmp_path):
+    from corkscrew.checkpoint import RunJournal
+    merchants = [make_merchant("done"), make_merchant("downloaded"), make_merchant("todo")]
+    journal = RunJournal.create(tmp_path / "runs", [m.id for m in merchants])
+    storage = StorageManager(tmp_path / "state.json")
+
+    # Simulate a run killed after "done" finished and "downloaded" was fetched
+    first = FakeDownloader(tmp_path / "raw")
+    await make_pipeline(tmp_path, first, storage=storage, journal=journal).run(merchants[:1])
+    result = await first.download(merchants[1])
+    storage.record_success("downloaded", hash_val=result.file_hash, filepath=result.filepath, changed=True)
+    journal.record("downloaded", "download", result=result.model_dump(), changed=True)
+
+    second = FakeDownloader(tmp_path / "raw")
+    resumed = RunJournal.open(tmp_path / "runs", journal.run_id)
+    outcomes = {o.merchant.id: o for o in
+                await make_pipeline(tmp_path, second, storage=storage, journal=resumed).run(merchants)}
+
+    assert second.downloaded == ["todo"]
+    assert outcomes["done"].resumed and outcomes["done"].records == 1
+    assert outcomes["downloaded"].records == 1
+    assert outcomes["downloaded"].out_path.exists()
+    assert outcomes["todo"].records == 1
+    assert all(resumed.is_finished(m.id) for m in merchants)
+    # The resumed download is not recorded in state a second time
+    assert len(storage.get_merchant_state("downloaded").history) == 1
+
+
+@pytest.mark.asyncio
+async def test_profiled_pipeline_records_every_stage(tmp_path):
+    from corkscrew.profiling import Profiler
+    merchants = [make_merchant(f"m{i}") for i in range(2)]
+    with Profiler(tmp_path / "profile") as profiler:
+        await make_pipeline(tmp_path, FakeDownloader(tmp_path / "raw"), profiler=profiler).run(merchants)
+    assert set(profiler.stages) == {"m0", "m1"}
+    assert set(profiler.stages["m0"]) == {"download", "normalize", "quality", "write"}
+    assert profiler.stages["m0"]["normalize"]["peak_bytes"] > 0
+    profiler.write()
+    assert (tmp_path / "profile" / "m1.prof").exists()
+
+
+@pytest.mark.asyncio
+async def test_pipeline_records_normalized_downloads_in_manifest(tmp_path):
+    pipeline = make_pipeline(tmp_path, FakeDownloader(tmp_path / "raw"), ref_date=date(2026, 1, 1))
+    [outcome] = await pipeline.run([make_merchant("m0")])
+    entry = NormalizeManifest(tmp_path / "normalized").get("m0", "2026-01-01")
+    assert entry["hash"] == outcome.result.file_hash and entry["records"] == 1
+
+
+@pytest.mark.asyncio
+async def test_pipeline_starts_largest_downloads_first(tmp_path):
+    merchants = [make_merchant(m) for m in ("small", "big", "unknown", "medium")]
+    downloader = FakeDownloader(tmp_path / "raw")
+    pipeline = make_pipeline(tmp_path, downloader, download_workers=1,
+                             sizes={"small": 10, "big": 10_000, "medium": 500})
+    await pipeline.run(merchants)
+    assert downloader.downloaded == ["big", "medium", "small", "unknown"]
+
+
+@pytest.mark.asyncio
+async def test_pipeline_flags_size_anomalies_before_normalizing(tmp_path):
+    storage = StorageManager(tmp_path / "state.json")
+    for _ in range(3):
+        storage.record_success("m0", hash_val="old", filepath="x.csv", changed=True, bytes_downloaded=500_000)
+    [outcome] = await make_pipeline(tmp_path, FakeDownloader(tmp_path / "raw"), storage=storage).run([make_merchant("m0")])
+    assert "much smaller than usual" in outcome.warning
+    assert outcome.records == 1
+
+
+@pytest.mark.asyncio
+async def test_pipeline_quarantines_snapshots_that_fail_quality_checks(tmp_path):
+    merchant = make_merchant("m0").model_copy(update={"column_map": {"Wine": "wine_name", "Price": "price"}})
+    storage = StorageManager(tmp_path / "state.json")
+
+    async def run_day(day, prices):
+        downloader = FakeDownloader(tmp_path / "raw")
+
+        async def download(merchant, ref_date=None):
+            path = tmp_path / "raw" / merchant.id / day / "list.csv"
+            path.parent.mkdir(parents=True, exist_ok=True)
+            pd.DataFrame({"Wine": [f"wine {i}" for i in range(40)], "Price": prices}).to_csv(path, index=False)
+            return DownloadResult(merchant_id=merchant.id, filepath=str(path), file_hash=compute_hash(path),
+                                  changed=True, status_code=200, bytes_downloaded=path.stat().st_size)
+
+        downloader.download = download
+        pipeline = make_pipeline(tmp_path, downloader, storage=storage, ref_date=date.fromisoformat(day))
+        [outcome] = await pipeline.run([merchant])
+        return outcome
+
+    good = await run_day("2026-01-01", ["12.50"] * 40)
+    assert good.quarantine is None and good.out_path.exists()
+
+    bad = await run_day("2026-01-02", [""] * 40)
+    assert bad.quarantine == ["price is empty for 100% of rows (was 0%)"]
+    assert bad.out_path is None and bad.quarantine_path == tmp_path / "quarantine" / "m0" / "2026-01-02.csv"
+    assert bad.quarantine_path.exists() and bad.quarantine_path.with_suffix(".json").exists()
+    assert not (tmp_path / "normalized" / "m0" / "2026-01-02.csv").exists()
+
+    # Still judged against the last accepted snapshot, not the quarantined one
+    again = await run_day("2026-01-03", [""] * 39 + ["POA"])
+    assert again.quarantine is not None
+    assert (await run_day("2026-01-04", ["13.00"] * 40)).quarantine is None
@@ -0,0 +1,42 @@
+# tests/test_precheck.py
+from corkscrew.models import MerchantConfig, DownloadConfig, MerchantState
+from corkscrew.precheck import history_sizes, largest_first, size_anomaly
+from corkscrew.storage import StorageManager
+
+
+def make_merchant(merchant_id):
+    return MerchantConfig(
+        id=merchant_id, name=merchant_id, country="UK", tier=1, enabled=True,
+        discovery_url="https://example.com",
+        downloads=[DownloadConfig(url=f"https://example.com/{merchant_id}.csv", format="csv", preferred=True)],
+        url_pattern="static",
+    )
+
+
+def state_with_sizes(*sizes):
+    return MerchantState(history=[
+        {"date": "2026-01-01", "hash": "h", "status": "success", "changed": True, "bytes": size} for size in sizes
+    ])
+
+
+def test_largest_first_keeps_unknown_sizes_last_in_order():
+    merchants = [make_merchant(m) for m in ("a", "b", "c", "d")]
+    ordered = largest_first(merchants, {"b": 10, "d": 500})
+    assert [m.id for m in ordered] == ["d", "b", "a", "c"]
+
+
+def test_history_sizes_uses_median_of_recorded_bytes(tmp_path):
+    storage = StorageManager(tmp_path / "state.json")
+    for size in (100, 300, 200):
+        storage.record_success("a", hash_val="h", filepath="x.csv", changed=True, bytes_downloaded=size)
+    storage.record_success("b", hash_val="h", filepath="x.csv", changed=True)
+    assert history_sizes([make_merchant("a"), make_merchant("b")], storage) == {"a": 200}
+
+
+def test_size_anomaly_flags_far_smaller_or_larger_files():
+    state = state_with_sizes(500_000, 520_000, 510_000)
+    assert size_anomaly(state, 480_000) is None
+    assert "smaller" in size_anomaly(state, 2_000)
+    assert "larger" in size_anomaly(state, 5_000_000)
+    # Too little history to judge
+    assert size_anomaly(state_with_sizes(500_000), 2_000) is None
@@ -0,0 +1,35 @@
+# tests/test_profiling.py
+import json
+import pstats
+from corkscrew.profiling import Profiler
+
+
+def allocate(n):
+    return [str(i) for i in range(n)]
+
+
+def test_profiler_records_time_memory_and_profiles(tmp_path):
+    with Profiler(tmp_path / "profile") as profiler:
+        assert len(profiler.call("big-merchant", "normalize", allocate, 200_000)) == 200_000
+        profiler.wrap("small-merchant", "normalize", allocate)(10)
+        profiler.record("small-merchant", "download", 1.5)
+    big = profiler.stages["big-merchant"]["normalize"]
+    small = profiler.stages["small-merchant"]
+    assert big["peak_bytes"] > 1_000_000 > small["normalize"]["peak_bytes"]
+    assert small["download"] == {"seconds": 1.5}
+
+    summary_path = profiler.write()
+    summary = json.loads((tmp_path / "profile" / "summary.json").read_text())
+    assert summary["memory"][0]["merchant_id"] == "big-merchant"
+    assert summary["slowest"][0] == {"merchant_id": "small-merchant", "stage": "download", "seconds": 1.5}
+    assert any("allocate" in f["function"] for f in summary["functions"])
+    assert "Highest peak memory" in summary_path.read_text()
+    stats = pstats.Stats(str(tmp_path / "profile" / "big-merchant.prof"))
+    assert any(name == "allocate" for _, _, name in stats.stats)
+
+
+def test_profiler_without_memory_tracking(tmp_path):
+    profiler = Profiler(tmp_path, memory=False)
+    with profiler:
+        profiler.call("m", "write", allocate, 10)
+    assert "peak_bytes" not in profiler.stages["m"]["write"]
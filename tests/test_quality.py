@@ -0,0 +1,37 @@
+# tests/test_quality.py
+from corkscrew.models import RecordBatch
+from corkscrew.quality import check, profile
+from corkscrew.typed import typed_columns
+
+
+def make_batch(prices, vintages=None, rows=40):
+    columns = {"wine_name": [f"wine {i}" for i in range(rows)], "price": prices * (rows // len(prices))}
+    if vintages is not None:
+        columns["vintage"] = vintages * (rows // len(vintages))
+    batch = RecordBatch("m", "M", "https://example.com/list.csv", "2026-03-01", columns)
+    batch.typed = typed_columns(batch, "UK")
+    return batch
+
+
+def test_profile_summarises_nulls_prices_and_vintages():
+    p = profile(make_batch(["10.00", "", "30.00", "50.00"], ["2019", "NV", "n/a", ""]))
+    assert p["rows"] == 40
+    assert p["null_rates"] == {"wine_name": 0.0, "price": 0.25, "vintage": 0.25}
+    assert p["price_quartiles"][1] == 3000
+    # "n/a" is the only given vintage that is neither a year nor non-vintage
+    assert p["bad_vintage_share"] == round(1 / 3, 4)
+
+
+def test_check_flags_broken_snapshots_only():
+    good = profile(make_batch(["10.00", "20.00"], ["2019"]))
+    assert check(good, None) == []
+    assert check(profile(make_batch(["11.00", "19.00"], ["2018"])), good) == []
+
+    empty_prices = check(profile(make_batch([""], ["2019"])), good)
+    assert empty_prices == ["price is empty for 100% of rows (was 0%)"]
+    [shift] = check(profile(make_batch(["1000.00", "2000.00"], ["2019"])), good)
+    assert shift.startswith("Median price moved 100x")
+    assert check(profile(make_batch(["10.00"], ["2019"], rows=10)), good) == ["Row count fell from 40 to 10"]
+    [vintage] = check(profile(make_batch(["10.00"], ["19"])), good)
+    assert vintage == "100% of vintages could not be read (was 0%)"
+    assert check(profile(make_batch(["10.00"])), good) == ["vintage is empty for 100% of rows (was 0%)"]
@@ -0,0 +1,121 @@
+# tests/test_renormalize.py
+from datetime import date
+import pandas as pd
+from corkscrew.compression import compress_file
+from corkscrew.models import MerchantConfig, DownloadConfig
+from corkscrew.renormalize import RawDownload, plan, record_result, run_jobs, scan_raw
+from corkscrew.storage import NormalizeManifest
+
+
+def make_merchant(merchant_id, column_map=None):
+    return MerchantConfig(
+        id=merchant_id, name=merchant_id, country="UK", tier=1, enabled=True,
+        discovery_url="https://example.com",
+        downloads=[DownloadConfig(url=f"https://example.com/{merchant_id}.csv", format="csv", preferred=True)],
+        url_pattern="static",
+        column_map=column_map or {"Wine": "wine_name", "Vintage": "vintage"},
+    )
+
+
+def write_raw(raw_root, merchant_id, day, wines):
+    path = raw_root / merchant_id / day / "list.csv"
+    path.parent.mkdir(parents=True, exist_ok=True)
+    pd.DataFrame({"Wine": wines, "Vintage": ["2019"] * len(wines)}).to_csv(path, index=False)
+    return path
+
+
+def renormalize_all(downloads, merchants, root, manifest, **kwargs):
+    jobs, current = plan(downloads, merchants, root, manifest, **kwargs)
+    results = list(run_jobs(jobs, workers=1))
+    for result in results:
+        record_result(manifest, result)
+    return results, current
+
+
+def test_scan_raw_selects_latest_range_or_all(tmp_path):
+    for day in ("2026-01-01", "2026-02-01", "2026-03-01"):
+        write_raw(tmp_path, "a", day, ["x"])
+    write_raw(tmp_path, "b", "2026-01-15", ["y"])
+    (tmp_path / "a" / "notes").mkdir()
+    (tmp_path / "a" / "2026-03-01" / ".abc.part").write_bytes(b"partial")
+
+    latest = scan_raw(tmp_path)
+    assert [(d.merchant_id, d.run_date) for d in latest] == [("a", "2026-03-01"), ("b", "2026-01-15")]
+    assert latest[0].path.name == "list.csv"
+    ranged = scan_raw(tmp_path, ["a"], since=date(2026, 1, 15), until=date(2026, 2, 28))
+    assert [d.run_date for d in ranged] == ["2026-02-01"]
+    assert len(scan_raw(tmp_path, all_history=True)) == 4
+
+
+def test_renormalize_skips_current_work(tmp_path):
+    raw, out = tmp_path / "raw", tmp_path / "normalized"
+    write_raw(raw, "a", "2026-01-01", ["Petrus", "Latour"])
+    merchants = {"a": make_merchant("a")}
+    manifest = NormalizeManifest(out)
+
+    results, current = renormalize_all(scan_raw(raw), merchants, out, manifest)
+    assert [r.status for r in results] == ["written"] and current == 0
+    assert pd.read_csv(out / "a" / "2026-01-01.csv")["wine_name"].tolist() == ["Petrus", "Latour"]
+
+    # Same file, same normalizer: nothing to do
+    results, current = renormalize_all(scan_raw(raw), merchants, out, NormalizeManifest(out))
+    assert results == [] and current == 1
+
+    # Compacting moves the file but keeps its bytes: hashed, found unchanged
+    compress_file(raw / "a" / "2026-01-01" / "list.csv", "gzip")
+    results, current = renormalize_all(scan_raw(raw), merchants, out, manifest)
+    assert [r.status for r in results] == ["unchanged"]
+    assert renormalize_all(scan_raw(raw), merchants, out, manifest)[1] == 1
+
+    # A column_map edit changes the normalizer version
+    merchants = {"a": make_merchant("a", {"Wine": "wine_name"})}
+    results, _ = renormalize_all(scan_raw(raw), merchants, out, manifest)
+    assert [r.status for r in results] == ["written"]
+    assert results[0].records == 2
+
+
+def test_renormalize_reports_failures_and_retries_them(tmp_path):
+    raw, out = tmp_path / "raw", tmp_path / "normalized"
+    write_raw(raw, "a", "2026-01-01", ["Petrus"])
+    merchants = {"a": make_merchant("a", {"Missing": "wine_name"})}
+    manifest = NormalizeManifest(out)
+    results, _ = renormalize_all(scan_raw(raw), merchants, out, manifest)
+    assert results[0].status == "failed" and "Missing" in results[0].error
+    assert manifest.get("a", "2026-01-01") is None
+    assert plan(scan_raw(raw), merchants, out, manifest)[0]
+
+
+def test_run_jobs_in_process_pool(tmp_path):
+    raw, out = tmp_path / "raw", tmp_path / "normalized"
+    for i in range(4):
+        write_raw(raw, f"m{i}", "2026-01-01", [f"wine {i}"])
+    merchants = {f"m{i}": make_merchant(f"m{i}") for i in range(4)}
+    jobs, _ = plan(scan_raw(raw), merchants, out, NormalizeManifest(out))
+    results = list(run_jobs(jobs, workers=2))
+    assert sorted(r.job.download.merchant_id for r in results) == ["m0", "m1", "m2", "m3"]
+    assert all(r.status == "written" for r in results)
+
+
+def test_raw_download_date_comes_from_its_directory(tmp_path):
+    assert RawDownload.from_path("a", tmp_path / "2026-02-20" / "x.csv").run_date == "2026-02-20"
+
+
+def test_quarantined_snapshots_stay_quarantined_until_accepted(tmp_path):
+    raw, out = tmp_path / "raw", tmp_path / "normalized"
+    write_raw(raw, "a", "2026-01-01", [f"wine {i}" for i in range(40)])
+    merchants = {"a": make_merchant("a")}
+    manifest = NormalizeManifest(out)
+    renormalize_all(scan_raw(raw), merchants, out, manifest)
+
+    path = raw / "a" / "2026-01-02" / "list.csv"
+    path.parent.mkdir(parents=True)
+    pd.DataFrame({"Wine": [f"wine {i}" for i in range(40)], "Vintage": ["19"] * 40}).to_csv(path, index=False)
+    [result], _ = renormalize_all(scan_raw(raw), merchants, out, manifest)
+    assert result.status == "quarantined" and "vintages could not be read" in result.quarantine[0]
+    assert (tmp_path / "quarantine" / "a" / "2026-01-02.csv").exists()
+    assert renormalize_all(scan_raw(raw), merchants, out, manifest) == ([], 1)
+
+    [result], _ = renormalize_all(scan_raw(raw), merchants, out, manifest, accept=True)
+    assert result.status == "written" and (out / "a" / "2026-01-02.csv").exists()
+    assert not (tmp_path / "quarantine" / "a" / "2026-01-02.csv").exists()
+    assert "quarantine" not in manifest.get("a", "2026-01-02")
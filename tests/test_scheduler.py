@@ -0,0 +1,157 @@
+import asyncio
+import pytest
+from datetime import datetime, timedelta, timezone
+from corkscrew.models import MerchantConfig, DownloadConfig
+from corkscrew.scheduler import Scheduler, send_command, start_control_server
+from corkscrew.storage import StorageManager
+
+NOW = datetime(2026, 2, 23, 12, 0, tzinfo=timezone.utc)
+
+
+def make_merchant(merchant_id):
+    return MerchantConfig(
+        id=merchant_id, name=merchant_id, country="UK", tier=1, enabled=True,
+        discovery_url="https://example.com",
+        downloads=[DownloadConfig(url="https://example.com/f.csv", format="csv", preferred=True)],
+        url_pattern="static",
+    )
+
+
+class FakePipeline:
+    download_workers = 10
+
+    def __init__(self):
+        self.batches = []
+
+    async def run(self, merchants):
+        self.batches.append([m.id for m in merchants])
+        return []
+
+
+def set_last_run(storage, merchant_id, when, failures=0):
+    storage._data[merchant_id] = {
+        "last_run": when.isoformat(), "consecutive_failures": failures, "history": [],
+    }
+
+
+def test_never_run_merchants_are_due_immediately(tmp_path):
+    storage = StorageManager(tmp_path / "state.json")
+    scheduler = Scheduler([make_merchant("a")], storage, FakePipeline(), clock=lambda: NOW)
+    assert [m.id for m in scheduler.due()] == ["a"]
+
+
+def test_merchant_not_due_until_interval_elapsed(tmp_path):
+    storage = StorageManager(tmp_path / "state.json")
+    set_last_run(storage, "a", NOW - timedelta(hours=2))
+    set_last_run(storage, "b", NOW - timedelta(days=2))
+    scheduler = Scheduler([make_merchant("a"), make_merchant("b")], storage, FakePipeline(), clock=lambda: NOW)
+    assert [m.id for m in scheduler.due()] == ["b"]
+
+
+def test_failing_merchant_retried_sooner(tmp_path):
+    storage = StorageManager(tmp_path / "state.json")
+    set_last_run(storage, "a", NOW - timedelta(hours=1), failures=1)
+    scheduler = Scheduler([make_merchant("a")], storage, FakePipeline(), clock=lambda: NOW)
+    assert [m.id for m in scheduler.due()] == ["a"]
+
+
+def test_forced_merchant_runs_once(tmp_path):
+    storage = StorageManager(tmp_path / "state.json")
+    set_last_run(storage, "a", NOW)
+    scheduler = Scheduler([make_merchant("a")], storage, FakePipeline(), clock=lambda: NOW)
+    assert scheduler.force("a")
+    assert not scheduler.force("missing")
+    assert [m.id for m in scheduler.due()] == ["a"]
+    assert scheduler.due() == []
+
+
+@pytest.mark.asyncio
+async def test_run_forever_runs_due_batch_and_stops(tmp_path):
+    storage = StorageManager(tmp_path / "state.json")
+    pipeline = FakePipeline()
+    scheduler = Scheduler([make_merchant("a"), make_merchant("b")], storage, pipeline, clock=lambda: NOW)
+
+    async def run_and_record(merchants):
+        pipeline.batches.append([m.id for m in merchants])
+        for m in merchants:
+            set_last_run(storage, m.id, NOW)
+        scheduler.stop()
+
+    pipeline.run = run_and_record
+    await asyncio.wait_for(scheduler.run_forever(), timeout=5)
+    assert pipeline.batches == [["a"], ["b"]]
+    assert scheduler.cycles == 2
+
+
+@pytest.mark.asyncio
+async def test_each_finished_merchant_is_handed_on(tmp_path):
+    storage = StorageManager(tmp_path / "state.json")
+    finished = []
+
+    class OutcomePipeline:
+        download_workers = 2
+
+        async def run(self, merchants):
+            set_last_run(storage, merchants[0].id, NOW)
+            if merchants[0].id == "b":
+                scheduler.stop()
+            return [merchants[0].id]
+
+    def on_finished(outcomes):
+        finished.extend(outcomes)
+        raise OSError("disk full")  # logged, not fatal
+
+    scheduler = Scheduler([make_merchant("a"), make_merchant("b")], storage, OutcomePipeline(),
+                          clock=lambda: NOW, on_finished=on_finished)
+    await asyncio.wait_for(scheduler.run_forever(), timeout=5)
+    assert sorted(finished) == ["a", "b"]
+    assert scheduler.cycles == 2
+
+
+@pytest.mark.asyncio
+async def test_slow_merchant_does_not_hold_up_others(tmp_path):
+    storage = StorageManager(tmp_path / "state.json")
+    storage.record_success("fast", "h", "f.csv", changed=True)
+    release = asyncio.Event()
+    started = []
+
+    class SlowPipeline:
+        download_workers = 2
+
+        async def run(self, merchants):
+            started.append(merchants[0].id)
+            if merchants[0].id == "slow":
+                await release.wait()
+            return []
+
+    scheduler = Scheduler([make_merchant("slow"), make_merchant("fast")], storage, SlowPipeline())
+    run = asyncio.create_task(scheduler.run_forever())
+    await asyncio.sleep(0.1)
+    assert started == ["slow"] and scheduler.status()["running"] == ["slow"]
+
+    scheduler.force("fast")
+    await asyncio.sleep(0.1)
+    assert started == ["slow", "fast"]
+    assert scheduler.cycles == 1
+    scheduler.stop()
+    release.set()
+    await asyncio.wait_for(run, timeout=5)
+    assert scheduler.cycles == 2
+
+
+@pytest.mark.asyncio
+async def test_control_socket_round_trip(tmp_path):
+    storage = StorageManager(tmp_path / "state.json")
+    scheduler = Scheduler([make_merchant("a")], storage, FakePipeline(), clock=lambda: NOW)
+    sock = tmp_path / "ctl.sock"
+    server = await start_control_server(scheduler, sock)
+    try:
+        status = await asyncio.to_thread(send_command, "status", sock)
+        assert status["ok"] and "a" in status["merchants"]
+        queued = await asyncio.to_thread(send_command, "run a", sock)
+        assert queued == {"ok": True, "queued": "a"}
+        bad = await asyncio.to_thread(send_command, "explode", sock)
+        assert not bad["ok"]
+    finally:
+        server.close()
+        await server.wait_closed()
@@ -0,0 +1,157 @@
+import asyncio
+import json
+import multiprocessing
+import pytest
+from pathlib import Path
+from corkscrew.models import MerchantConfig, DownloadConfig
+from corkscrew.shard import LeaseQueue, parse_shard, reduce_states, run_from_queue, select_shard, shard_of
+
+
+def make_merchant(merchant_id):
+    return MerchantConfig(
+        id=merchant_id, name=merchant_id, country="UK", tier=1, enabled=True,
+        discovery_url="https://example.com",
+        downloads=[DownloadConfig(url="https://example.com/f.csv", format="csv", preferred=True)],
+        url_pattern="static",
+    )
+
+
+def test_parse_shard():
+    assert parse_shard("2/4") == (2, 4)
+    for bad in ("0/4", "5/4", "x/4", "2", "1/0"):
+        with pytest.raises(ValueError):
+            parse_shard(bad)
+
+
+def test_shards_partition_merchants_deterministically():
+    merchants = [make_merchant(f"merchant-{i}") for i in range(50)]
+    shards = [select_shard(merchants, i, 4) for i in range(1, 5)]
+    ids = [m.id for shard in shards for m in shard]
+    assert sorted(ids) == sorted(m.id for m in merchants)
+    assert len(set(ids)) == len(ids)
+    assert shard_of("farr-vintners", 4) == shard_of("farr-vintners", 4)
+
+
+def _claim_all(db_path, worker, out):
+    queue = LeaseQueue(Path(db_path), "2026-03-01")
+    claimed = []
+    while batch := queue.claim(worker, limit=3):
+        claimed.extend(batch)
+        for m in batch:
+            queue.complete(m, worker)
+    queue.close()
+    out.put(claimed)
+
+
+def test_lease_queue_hands_each_merchant_to_one_process(tmp_path):
+    db_path = tmp_path / "queue.db"
+    ids = [f"merchant-{i:03d}" for i in range(60)]
+    queue = LeaseQueue(db_path, "2026-03-01")
+    queue.seed(ids)
+    queue.close()
+
+    ctx = multiprocessing.get_context("spawn")
+    out = ctx.Queue()
+    procs = [ctx.Process(target=_claim_all, args=(str(db_path), f"w{i}", out)) for i in range(4)]
+    for p in procs:
+        p.start()
+    claimed = [m for _ in procs for m in out.get(timeout=60)]
+    for p in procs:
+        p.join(timeout=60)
+
+    assert sorted(claimed) == ids
+    assert LeaseQueue(db_path, "2026-03-01").counts() == {"done": 60}
+
+
+def test_expired_lease_is_reclaimed(tmp_path):
+    queue = LeaseQueue(tmp_path / "queue.db", "2026-03-01", lease_seconds=-1)
+    queue.seed(["a"])
+    assert queue.claim("dead-worker") == ["a"]
+    assert queue.claim("w2") == ["a"]
+    queue.complete("a", "dead-worker")  # stale worker can't complete someone else's lease
+    assert queue.counts() == {"leased": 1}
+
+
+def test_seed_is_idempotent(tmp_path):
+    queue = LeaseQueue(tmp_path / "queue.db", "2026-03-01")
+    queue.seed(["a", "b"])
+    queue.claim("w1", limit=1)
+    queue.seed(["a", "b"])
+    assert queue.counts() == {"leased": 1, "pending": 1}
+
+
+def test_next_run_reuses_the_queue_file(tmp_path):
+    first = LeaseQueue(tmp_path / "queue.db", "2026-03-01")
+    first.seed(["a", "b"])
+    for m in first.claim("w1", limit=2):
+        first.complete(m, "w1")
+    first.seed(["a", "b"])  # a late worker of the same run finds nothing left
+    assert first.claim("w2") == []
+
+    second = LeaseQueue(tmp_path / "queue.db", "2026-03-02")
+    second.seed(["a", "b"])
+    assert second.claim("w1", limit=5) == ["a", "b"]
+    assert first.counts() == {}
+
+    second.clear()
+    second.seed(["a"])
+    assert second.claim("w1") == ["a"]
+
+
+class SlowPipeline:
+    def __init__(self, queue):
+        self.queue = queue
+        self.expiries = []
+
+    async def run(self, batch):
+        for _ in range(3):
+            await asyncio.sleep(0.5)
+            self.expiries.append(self.queue._conn.execute("SELECT MAX(lease_expires) FROM leases").fetchone()[0])
+        return batch
+
+
+def test_leases_are_renewed_while_a_batch_runs(tmp_path):
+    queue = LeaseQueue(tmp_path / "queue.db", "2026-03-01", lease_seconds=3)
+    queue.seed(["a"])
+    pipeline = SlowPipeline(queue)
+    assert asyncio.run(run_from_queue(pipeline, queue, "w1", [make_merchant("a")])) == [make_merchant("a")]
+    assert pipeline.expiries[-1] > pipeline.expiries[0]
+    assert queue.counts() == {"done": 1}
+
+
+def test_worker_claims_more_while_a_slow_merchant_runs(tmp_path):
+    queue = LeaseQueue(tmp_path / "queue.db", "2026-03-01")
+    queue.seed(["a-slow", "b", "c", "d"])
+    merchants = [make_merchant(m) for m in ("a-slow", "b", "c", "d")]
+    finished = []
+
+    class OnePipeline:
+        async def run(self, batch):
+            await asyncio.sleep(0.5 if batch[0].id == "a-slow" else 0.01)
+            finished.append(batch[0].id)
+            return batch
+
+    outcomes = asyncio.run(run_from_queue(OnePipeline(), queue, "w1", merchants, batch_size=2))
+    assert finished == ["b", "c", "d", "a-slow"]
+    assert sorted(m.id for m in outcomes) == ["a-slow", "b", "c", "d"]
+    assert queue.counts() == {"done": 4}
+
+
+def test_reduce_states_keeps_latest_entry(tmp_path):
+    state = tmp_path / "state.json"
+    state.write_text(json.dumps({
+        "a": {"last_run": "2026-02-20T00:00:00+00:00", "last_hash": "old"},
+        "b": {"last_run": "2026-02-24T00:00:00+00:00", "last_hash": "global"},
+    }))
+    p1 = tmp_path / "state-w1.json"
+    p1.write_text(json.dumps({"a": {"last_run": "2026-02-23T00:00:00+00:00", "last_hash": "new"}}))
+    p2 = tmp_path / "state-w2.json"
+    p2.write_text(json.dumps({
+        "b": {"last_run": "2026-02-22T00:00:00+00:00", "last_hash": "older"},
+        "c": {"last_run": "2026-02-23T00:00:00+00:00", "last_hash": "c1"},
+    }))
+    assert reduce_states(state, [p1, p2]) == 2
+    merged = json.loads(state.read_text())
+    assert merged["a"]["last_hash"] == "new"
+    assert merged["b"]["last_hash"] == "global"
+    assert merged["c"]["last_hash"] == "c1"
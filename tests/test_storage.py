@@ -74,3 +74,67 @@ def test_storage_manager_persists_across_instances(tmp_path):
     sm2 = StorageManager(state_file)
     state = sm2.get_merchant_state("test")
     assert state.last_hash == "abc123"
+
+def test_storage_manager_with_base_writes_only_own_merchants(tmp_path):
+    base = tmp_path / "state.json"
+    StorageManager(base).record_success("shared", hash_val="abc", filepath="x.csv", changed=True)
+    partial = tmp_path / "state-w1.json"
+    sm = StorageManager(partial, base_path=base)
+    # Change detection still sees the global state
+    assert sm.is_changed("shared", "abc") is False
+    sm.record_success("mine", hash_val="def", filepath="y.csv", changed=True)
+    assert set(json.loads(partial.read_text())) == {"mine"}
+    assert set(json.loads(base.read_text())) == {"shared"}
+
+
+def test_storage_manager_keeps_what_other_processes_saved(tmp_path):
+    state_file = tmp_path / "state.json"
+    serve = StorageManager(state_file)
+    run = StorageManager(state_file)
+    run.record_success("a", hash_val="from-run", filepath="a.csv", changed=True)
+    serve.record_failure("b", "HTTP 503")
+    saved = json.loads(state_file.read_text())
+    assert saved["a"]["last_hash"] == "from-run" and saved["b"]["consecutive_failures"] == 1
+
+    run.record_success("b", hash_val="fixed", filepath="b.csv", changed=True)
+    assert serve.get_merchant_state("b").consecutive_failures == 1
+    serve.reload()
+    assert serve.get_merchant_state("b").last_hash == "fixed"
+
+
+def test_concurrent_records_from_threads_and_instances_are_all_kept(tmp_path):
+    from concurrent.futures import ThreadPoolExecutor
+    state_file = tmp_path / "state.json"
+    serve, run = StorageManager(state_file), StorageManager(state_file)
+
+    def record(i):
+        storage = serve if i % 2 else run
+        storage.record_success(f"m{i}", hash_val=str(i), filepath=f"{i}.csv", changed=True)
+        storage.record_failure(f"m{i}", "HTTP 503")
+
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        list(pool.map(record, range(40)))
+    saved = json.loads(state_file.read_text())
+    assert len(saved) == 40
+    assert all(len(saved[f"m{i}"]["history"]) == 2 for i in range(40))
+    assert [p.name for p in tmp_path.iterdir() if p.name.endswith(".tmp")] == []
+
+
+def test_manifests_in_two_processes_see_each_others_entries(tmp_path):
+    from corkscrew.storage import NormalizeManifest
+    raw = tmp_path / "list.csv"
+    raw.write_text("wine\n")
+    serve, normalize = NormalizeManifest(tmp_path / "out"), NormalizeManifest(tmp_path / "out")
+    serve.record("m", "2026-01-01", raw, "h1", "3", 10, profile={"rows": 10}, quarantine=["too few rows"])
+    assert serve.baseline("m", "2026-01-02") is None
+
+    # 'normalize --accept' lifts the quarantine, then serve records the next day
+    assert normalize.get("m", "2026-01-01")["quarantine"] == ["too few rows"]
+    normalize.record("m", "2026-01-01", raw, "h1", "3", 10, profile={"rows": 10})
+    assert serve.baseline("m", "2026-01-02") == {"rows": 10}
+    serve.record("m", "2026-01-02", raw, "h2", "3", 12)
+
+    saved = json.loads((tmp_path / "out" / "m" / ".manifest.json").read_text())
+    assert sorted(saved) == ["2026-01-01", "2026-01-02"]
+    assert "quarantine" not in saved["2026-01-01"]
+    assert not list((tmp_path / "out" / "m").glob("*.tmp"))
@@ -0,0 +1,51 @@
+# tests/test_typed.py
+import pandas as pd
+from corkscrew.models import RecordBatch
+from corkscrew.typed import (
+    is_non_vintage, parse_count, parse_decimal, parse_format_ml, parse_price_minor, parse_vintage, typed_columns,
+)
+
+
+def values(series):
+    return [None if pd.isna(v) else v for v in series]
+
+
+def test_parse_decimal_dot_locale():
+    assert values(parse_decimal(["1,250.50", "£4500", "12.5", "1'250", "POA", ""])) == [1250.5, 4500, 12.5, 1250, None, None]
+
+
+def test_parse_decimal_comma_locale():
+    assert values(parse_decimal(["1.250,50 €", "12,5", "1 250", "1.250"], decimal_comma=True)) == [1250.5, 12.5, 1250, 1250]
+
+
+def test_unambiguous_comma_decimal_outside_comma_locale():
+    assert values(parse_decimal(["45,90"])) == [45.9]
+
+
+def test_parse_price_minor_uses_currency_exponent():
+    assert values(parse_price_minor(["1250.50", "1200", "x"], ["GBP", "JPY", "EUR"])) == [125050, 1200, None]
+
+
+def test_parse_vintage_and_nv():
+    raw = ["2015", "NV", "n.v.", "Vintage 1998", "abc", ""]
+    assert values(parse_vintage(raw)) == [2015, None, None, 1998, None, None]
+    assert is_non_vintage(raw).tolist() == [False, True, True, False, False, False]
+
+
+def test_parse_count():
+    assert values(parse_count(["24", "24+", "6x75cl", "1,200", "", "none"])) == [24, 24, 6, 1200, None, None]
+
+
+def test_parse_format_ml():
+    raw = ["75cl", "1,5 L", "750ml", "Magnum", "Double Magnum", "Half bottle", "75", "1.5", "150", "?"]
+    assert values(parse_format_ml(raw)) == [750, 1500, 750, 1500, 3000, 375, 750, 1500, 1500, None]
+
+
+def test_typed_columns_follow_merchant_country():
+    batch = RecordBatch("m", "M", "u", "d", {"price": ["1.250"], "currency": ["EUR"], "format": ["75cl"]})
+    assert typed_columns(batch, "FR")["price_minor"].tolist() == [125000]
+    assert typed_columns(batch, "UK")["price_minor"].tolist() == [125]
+    batch.typed = typed_columns(batch, "FR")
+    df = batch.to_frame()
+    assert df["format_ml"].tolist() == [750]
+    assert pd.isna(df["vintage_year"].iloc[0])
@@ -0,0 +1,51 @@
+# tests/test_xlsx_reader.py
+from datetime import datetime
+import openpyxl
+import pytest
+from corkscrew.xlsx_reader import XLSXReader, column_index
+
+
+def make_workbook(path, rows, sheet_names=("Stock",)):
+    wb = openpyxl.Workbook()
+    wb.active.title = sheet_names[0]
+    for row in rows:
+        wb.active.append(row)
+    for name in sheet_names[1:]:
+        wb.create_sheet(name).append(["other"])
+    wb.save(path)
+    return path
+
+
+def test_column_index():
+    assert column_index("A1") == 0
+    assert column_index("Z9") == 25
+    assert column_index("AB12") == 27
+
+
+def test_reads_strings_numbers_and_dates(tmp_path):
+    path = make_workbook(tmp_path / "f.xlsx", [
+        ["Wine", "Price", "Listed", "In stock"],
+        ["Château Margaux", 850, datetime(2026, 2, 23), True],
+        ["Pétrus", 12.5, None, False],
+    ])
+    with XLSXReader(path) as reader:
+        rows = list(reader.iter_rows())
+    assert rows[0] == {0: "Wine", 1: "Price", 2: "Listed", 3: "In stock"}
+    assert rows[1] == {0: "Château Margaux", 1: 850, 2: datetime(2026, 2, 23), 3: True}
+    assert rows[2] == {0: "Pétrus", 1: 12.5, 3: False}
+
+
+def test_only_requested_columns_are_decoded(tmp_path):
+    path = make_workbook(tmp_path / "f.xlsx", [["a", "b", "c"], [1, 2, 3], [None, None, None]])
+    with XLSXReader(path) as reader:
+        rows = list(reader.iter_rows(0, columns={0, 2}))
+    assert rows[:2] == [{0: "a", 2: "c"}, {0: 1, 2: 3}]
+
+
+def test_sheets_by_name(tmp_path):
+    path = make_workbook(tmp_path / "f.xlsx", [["x"]], sheet_names=("Reds", "Whites"))
+    with XLSXReader(path) as reader:
+        assert reader.sheet_names == ["Reds", "Whites"]
+        assert list(reader.iter_rows("Whites")) == [{0: "other"}]
+        with pytest.raises(KeyError):
+            list(reader.iter_rows("Rosé"))
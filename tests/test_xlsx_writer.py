@@ -0,0 +1,42 @@
+# tests/test_xlsx_writer.py
+from openpyxl import load_workbook
+from corkscrew.models import RecordBatch
+from corkscrew.pipeline import write_records_csv
+from corkscrew.typed import typed_columns
+from corkscrew.xlsx_writer import sheet_name, write_master_xlsx
+
+
+def write_csv(tmp_path, merchant_id, wines):
+    batch = RecordBatch(merchant_id, f"{merchant_id} wines", "https://example.com/list.csv", "2026-03-01",
+                        {"wine_name": wines, "price": ["12.50"] * len(wines)})
+    batch.typed = typed_columns(batch, "UK")
+    return merchant_id, write_records_csv(batch, tmp_path / merchant_id / "2026-03-01.csv")
+
+
+def test_master_workbook_has_summary_and_splits_long_merchants(tmp_path):
+    sources = [write_csv(tmp_path, "big", [f"wine {i}" for i in range(5)]), write_csv(tmp_path, "small", ["Petrus"])]
+    written = write_master_xlsx(sources, tmp_path / "master.xlsx", max_rows=3)
+
+    assert [m.sheets for m in written] == [["big", "big (2)", "big (3)"], ["small"]]
+    wb = load_workbook(tmp_path / "master.xlsx", read_only=True)
+    assert wb.sheetnames == ["Summary", "big", "big (2)", "big (3)", "small"]
+    summary = list(wb["Summary"].iter_rows(values_only=True))
+    assert summary[1] == ("big", "big wines", 5, "2026-03-01", "big, big (2), big (3)")
+    assert summary[-1][:3] == ("Total", None, 6)
+
+    parts = [list(wb[name].iter_rows(values_only=True)) for name in ("big", "big (2)", "big (3)")]
+    assert [len(rows) for rows in parts] == [3, 3, 2]  # header + up to 2 rows each
+    header = parts[0][0]
+    assert all(rows[0] == header for rows in parts)
+    first = dict(zip(header, parts[0][1]))
+    assert first["wine_name"] == "wine 0" and first["price_minor"] == 1250
+
+
+def test_sheet_names_are_valid_and_unique():
+    used = {"summary"}
+    assert sheet_name("Summary", 1, used) == "Summary~2"
+    assert sheet_name("a/b:c", 1, used) == "a_b_c"
+    long = "x" * 40
+    assert sheet_name(long, 1, used) == "x" * 31
+    assert sheet_name(long, 2, used) == "x" * 27 + " (2)"
+    assert sheet_name(long, 1, used) == "x" * 29 + "~2"